@@ -0,0 +1,197 @@
+"""
+Retention for raw ObjectView rows.
+
+Months older than ``ANALYTICS_RAW_RETENTION_MONTHS`` are rolled up into DailyObjectViews;
+once that commits, exported to a compressed archive file (Parquet when pyarrow is
+installed, gzipped NDJSON otherwise), then recorded as an ArchivedPeriod and dropped from
+the live table (see partitions.drop_period) in one transaction. ``iter_views`` reads
+archives and the live table together for jobs that need long history.
+"""
+import gzip
+import io
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import TransactionManagementError, transaction
+from django.db.models import Count, Q, UUIDField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ObjectView, DailyObjectViews, ArchivedPeriod
+from .partitions import drop_period, month_period, month_start
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    _have_pyarrow = True
+except ImportError:
+    _have_pyarrow = False
+
+RAW_RETENTION_MONTHS = getattr(settings, "ANALYTICS_RAW_RETENTION_MONTHS", 6)
+ARCHIVE_PREFIX = getattr(settings, "ANALYTICS_ARCHIVE_PREFIX", "analytics/archive")
+
+COLUMNS = ("id", "user_id", "ip_address", "content_type_id", "object_id", "timestamp")
+
+
+def expired_periods(now=None, retention_months=RAW_RETENTION_MONTHS):
+    """Months with live rows that fall entirely before the retention horizon."""
+    horizon = month_start(now or timezone.now())
+    for _ in range(retention_months):
+        horizon = month_start(horizon - timedelta(days=1))
+    oldest = ObjectView.objects.filter(timestamp__lt=horizon).order_by("timestamp").values_list(
+        "timestamp", flat=True).first()
+    periods = []
+    while oldest is not None and oldest < horizon:
+        period = month_period(oldest)
+        periods.append(period)
+        oldest = period.end
+    return periods
+
+
+def _rows(period):
+    return ObjectView.objects.filter(timestamp__gte=period.start, timestamp__lt=period.end)
+
+
+def rollup_daily(period):
+    """Fold a period's raw views into DailyObjectViews (views, signed-in and anonymous)."""
+    grouped = (
+        _rows(period)
+        .annotate(day=TruncDate("timestamp"))
+        .values("content_type_id", "object_id", "day")
+        .annotate(views=Count("id"), signed_in=Count("id", filter=Q(user__isnull=False)))
+    )
+    rows = [
+        DailyObjectViews(content_type_id=row["content_type_id"], object_id=row["object_id"], day=row["day"],
+                         views=row["views"], anonymous_views=row["views"] - row["signed_in"])
+        for row in grouped.iterator()
+    ]
+    DailyObjectViews.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["content_type", "object_id", "day"],
+        update_fields=["views", "anonymous_views"],
+    )
+    return len(rows)
+
+
+def _export_ndjson(rows):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as fh:
+        for row in rows:
+            row["timestamp"] = row["timestamp"].isoformat()
+            fh.write(json.dumps(row).encode() + b"\n")
+    return buffer.getvalue()
+
+
+def _export_parquet(rows):
+    table = pa.Table.from_pylist(rows) if rows else pa.table({c: [] for c in COLUMNS})
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+def export_period(period):
+    """Write a period's raw rows to the archive storage; returns (path, format, rows)."""
+    fmt = ArchivedPeriod.Format.PARQUET if _have_pyarrow else ArchivedPeriod.Format.NDJSON
+    rows = _rows(period).order_by("timestamp").values(*COLUMNS)
+    count = rows.count()
+    data = _export_parquet(rows.iterator()) if fmt == ArchivedPeriod.Format.PARQUET else _export_ndjson(rows.iterator())
+    path = f"{ARCHIVE_PREFIX}/{ObjectView._meta.db_table}/{period.label}.{fmt}"
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    return default_storage.save(path, ContentFile(data)), fmt, count
+
+
+def _store_and_drop(period):
+    """Write the export, then record and drop the month; the file is removed if that fails."""
+    path, fmt, count = export_period(period)
+    try:
+        with transaction.atomic():
+            ArchivedPeriod.objects.update_or_create(
+                table=ObjectView._meta.db_table, start=period.start,
+                defaults={"end": period.end, "path": path, "format": fmt, "rows": count},
+            )
+            drop_period(ObjectView, period)
+    except Exception:
+        default_storage.delete(path)
+        raise
+    return {"rows": count, "path": path}
+
+
+def archive_period(period):
+    """
+    Roll up, export and drop one month of raw views.
+
+    The rollup commits first and the export is written after it, so no transaction is held
+    open on storage and a failed rollup leaves no file behind. The month is only dropped once
+    its file exists; a failure at any step leaves the raw rows in place for the next run.
+    Must not be called inside a transaction, which would hold the rollup (and the export
+    after it) until the caller commits.
+    """
+    if transaction.get_connection().in_atomic_block:
+        raise TransactionManagementError("archive_period() must not be called inside an atomic block")
+    result = {"period": period.label}
+    with transaction.atomic():
+        result["daily_rows"] = rollup_daily(period)
+    result.update(_store_and_drop(period))
+    return result
+
+
+def apply_retention(now=None, retention_months=RAW_RETENTION_MONTHS):
+    return [archive_period(p) for p in expired_periods(now, retention_months)]
+
+
+def _legacy_object_id(content_type_id, object_id):
+    """Archives written before object_id became str(pk) hold UUID keys as int(uuid)."""
+    object_id = str(object_id)
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+    if model is not None and isinstance(model._meta.pk, UUIDField) and object_id.isdigit():
+        return str(uuid.UUID(int=int(object_id)))
+    return object_id
+
+
+def _read_archive(archived):
+    with default_storage.open(archived.path, "rb") as fh:
+        if archived.format == ArchivedPeriod.Format.PARQUET:
+            for row in pq.read_table(fh).to_pylist():
+                row["object_id"] = _legacy_object_id(row["content_type_id"], row["object_id"])
+                yield row
+        else:
+            with gzip.GzipFile(fileobj=fh) as lines:
+                for line in lines:
+                    row = json.loads(line)
+                    row["object_id"] = _legacy_object_id(row["content_type_id"], row["object_id"])
+                    row["timestamp"] = parse_datetime(row["timestamp"])
+                    yield row
+
+
+def iter_views(since, until=None, content_type=None):
+    """
+    Yield raw view dicts (COLUMNS) with since <= timestamp < until, oldest archives first,
+    then the live table. Archived months are read only when `since` reaches back to them.
+    """
+    archived = ArchivedPeriod.objects.filter(table=ObjectView._meta.db_table, end__gt=since).order_by("start")
+    if until is not None:
+        archived = archived.filter(start__lt=until)
+    for period in archived:
+        for row in _read_archive(period):
+            if row["timestamp"] < since or (until is not None and row["timestamp"] >= until):
+                continue
+            if content_type is not None and row["content_type_id"] != content_type.pk:
+                continue
+            yield row
+
+    live = ObjectView.objects.filter(timestamp__gte=since)
+    if until is not None:
+        live = live.filter(timestamp__lt=until)
+    if content_type is not None:
+        live = live.filter(content_type=content_type)
+    yield from live.order_by("timestamp").values(*COLUMNS).iterator()
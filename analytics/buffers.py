@@ -0,0 +1,142 @@
+"""
+Buffered view ingestion for AbstractAnalytics.record_view.
+
+With ``ANALYTICS_BUFFERED_VIEWS`` enabled (and Redis available) a page view costs one
+Redis round-trip: a script claims the (content type, object, viewer) cooldown key with
+``SET NX EX`` (the cache ``add()`` semantics) and, only if it was free, appends the event
+to a list. ``tasks.flush_view_buffer`` drains the list in batches, bulk-creates the
+ObjectView rows and applies the view_count deltas with one grouped UPDATE per model.
+"""
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# Try to get a raw Redis connection via django-redis if available for list ops.
+try:
+    from django_redis import get_redis_connection
+
+    _have_redis = True
+except Exception:
+    _have_redis = False
+
+BUFFERED_VIEWS = getattr(settings, "ANALYTICS_BUFFERED_VIEWS", False)
+VIEW_COOLDOWN_SECONDS = getattr(settings, "ANALYTICS_VIEW_COOLDOWN_SECONDS", 10 * 60)
+FLUSH_BATCH_SIZE = getattr(settings, "ANALYTICS_VIEW_FLUSH_BATCH_SIZE", 5000)
+FLUSH_MAX_BATCHES = getattr(settings, "ANALYTICS_VIEW_FLUSH_MAX_BATCHES", 20)
+
+BUFFER_KEY = "analytics:views:buffer"
+
+# KEYS[1] cooldown key, KEYS[2] buffer; ARGV[1] cooldown seconds, ARGV[2] event
+_CLAIM_AND_PUSH = """
+if redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[1]) then
+    redis.call('RPUSH', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+def enabled():
+    return BUFFERED_VIEWS and _have_redis
+
+
+def _redis():
+    return get_redis_connection("default")
+
+
+def cooldown_key(content_type_id, object_id, user, ip_address):
+    viewer = f"u{user.pk}" if user is not None else f"ip{ip_address}"
+    return f"analytics:views:seen:{content_type_id}:{object_id}:{viewer}"
+
+
+def claim_view(content_type_id, object_id, user, ip_address):
+    """True the first time this viewer is seen on the object within the cooldown."""
+    return cache.add(cooldown_key(content_type_id, object_id, user, ip_address), 1, VIEW_COOLDOWN_SECONDS)
+
+
+def view_object_id(obj):
+    """The ObjectView.object_id value for `obj`: its str(pk)."""
+    return str(obj.pk)
+
+
+def record(obj, user, ip_address):
+    """Claim the cooldown and buffer the view in one round-trip; True if the view counts."""
+    content_type_id = ContentType.objects.get_for_model(obj).pk
+    object_id = view_object_id(obj)
+    event = json.dumps({
+        "content_type_id": content_type_id,
+        "object_id": object_id,
+        "user_id": user.pk if user is not None else None,
+        "ip_address": ip_address,
+        "at": timezone.now().isoformat(),
+    })
+    key = cooldown_key(content_type_id, object_id, user, ip_address)
+    return bool(_redis().eval(_CLAIM_AND_PUSH, 2, key, BUFFER_KEY, VIEW_COOLDOWN_SECONDS, event))
+
+
+def _take(batch_size):
+    pipe = _redis().pipeline(transaction=True)
+    pipe.lrange(BUFFER_KEY, 0, batch_size - 1)
+    pipe.ltrim(BUFFER_KEY, batch_size, -1)
+    events, _ = pipe.execute()
+    return [json.loads(e) for e in events]
+
+
+def apply_view_counts(deltas):
+    """{model: Counter({pk: delta})} -> one UPDATE ... CASE per model."""
+    updated = 0
+    for model, counts in deltas.items():
+        if not counts:
+            continue
+        delta = models.Case(
+            *[models.When(pk=pk, then=models.Value(n)) for pk, n in counts.items()],
+            default=models.Value(0),
+            output_field=models.PositiveIntegerField(),
+        )
+        updated += model._default_manager.filter(pk__in=list(counts)).update(view_count=models.F("view_count") + delta)
+    return updated
+
+
+def _write(events):
+    from .models import ObjectView, view_object_pk
+
+    deltas = defaultdict(Counter)
+    for e in events:
+        model = ContentType.objects.get_for_id(e["content_type_id"]).model_class()
+        if model is not None:
+            deltas[model][view_object_pk(model, e["object_id"])] += 1
+
+    # rows carry the time of the request, so the hourly rollups bucket them correctly
+    flushed_at = timezone.now()
+    with transaction.atomic():
+        ObjectView.objects.bulk_create([
+            ObjectView(
+                content_type_id=e["content_type_id"],
+                object_id=e["object_id"],
+                user_id=e["user_id"],
+                ip_address=e["ip_address"],
+                timestamp=parse_datetime(e["at"]) if e.get("at") else flushed_at,
+            )
+            for e in events
+        ])
+        apply_view_counts(deltas)
+    return len(events)
+
+
+def flush(batch_size=FLUSH_BATCH_SIZE, max_batches=FLUSH_MAX_BATCHES):
+    """Drain buffered views; returns the number of events written."""
+    if not enabled():
+        return 0
+    written = 0
+    for _ in range(max_batches):
+        events = _take(batch_size)
+        if not events:
+            break
+        written += _write(events)
+    return written
@@ -0,0 +1,124 @@
+"""
+Creator dashboard queries.
+
+Everything is read from the daily rollups (EpisodeDailyActivity / PodcastDailyActivity,
+built nightly by tasks.rollup_daily_activity) and the daily listener sketches, so the
+cost of a series depends on the length of the range, never on how popular the show is.
+Long ranges are downsampled to weeks or months; unique listeners for a week or month
+are the union of its daily sketches, not a sum of daily uniques.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .hll import HyperLogLog
+from .models import EpisodeDailyActivity, PodcastDailyActivity, UniqueSketch
+
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+
+# longest range (in days) served at each granularity when none is requested
+AUTO_GRANULARITY = ((92, DAY), (732, WEEK))
+
+SOURCES = {
+    "episode": (EpisodeDailyActivity, "episode"),
+    "podcast": (PodcastDailyActivity, "podcast"),
+}
+COUNTERS = ("plays", "completions", "views")
+
+
+def _summed(rows):
+    # annotations can't reuse the model's field names
+    return rows.annotate(**{f"total_{c}": Sum(c) for c in COUNTERS})
+
+
+def _unsum(row):
+    return {c: row[f"total_{c}"] for c in COUNTERS}
+
+
+def auto_granularity(start, end):
+    days = (end - start).days + 1
+    for limit, granularity in AUTO_GRANULARITY:
+        if days <= limit:
+            return granularity
+    return MONTH
+
+
+def period_start(day, granularity):
+    if granularity == WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def _periods(start, end, granularity):
+    current, periods = period_start(start, granularity), []
+    while current <= end:
+        periods.append(current)
+        if granularity == MONTH:
+            current = (current + timedelta(days=32)).replace(day=1)
+        else:
+            current += timedelta(days=7 if granularity == WEEK else 1)
+    return periods
+
+
+def _totals(counters):
+    plays = counters.get("plays") or 0
+    completions = counters.get("completions") or 0
+    return {
+        "plays": plays,
+        "completions": completions,
+        "completion_rate": completions / plays if plays else 0.0,
+        "views": counters.get("views") or 0,
+    }
+
+
+def _point(period, counters, listeners):
+    return {"period": period, **_totals(counters), "unique_listeners": listeners}
+
+
+def activity_series(obj, start, end, granularity=None):
+    """
+    Time series for an Episode or Podcast between two dates (inclusive): one point per
+    day, week or month (auto-selected from the range length when not given), with
+    plays, completions, completion_rate, views and unique_listeners. Two queries.
+    """
+    granularity = granularity or auto_granularity(start, end)
+    daily_model, field = SOURCES[obj._meta.model_name]
+    rows = daily_model.objects.filter(**{field: obj}, day__gte=start, day__lte=end)
+
+    if granularity == DAY:
+        counters = {row["day"]: row for row in rows.values("day", *COUNTERS, "unique_listeners")}
+        return [
+            _point(day, counters.get(day, {}), counters.get(day, {}).get("unique_listeners", 0))
+            for day in _periods(start, end, DAY)
+        ]
+
+    trunc = TruncWeek("day") if granularity == WEEK else TruncMonth("day")
+    counters = {row["period"]: _unsum(row) for row in _summed(rows.annotate(period=trunc).values("period"))}
+    sketches = defaultdict(HyperLogLog)
+    daily_sketches = UniqueSketch.objects.for_object(obj, UniqueSketch.Metric.LISTENERS).filter(
+        day__gte=start, day__lte=end).values_list("day", "sketch")
+    for day, data in daily_sketches:
+        sketches[period_start(day, granularity)].merge(HyperLogLog.from_bytes(data))
+    return [
+        _point(period, counters.get(period, {}), sketches[period].count() if period in sketches else 0)
+        for period in _periods(start, end, granularity)
+    ]
+
+
+def episode_breakdown(podcast, start, end):
+    """Per-episode totals for a podcast over a date range, most played first (one query)."""
+    rows = _summed(
+        EpisodeDailyActivity.objects
+        .filter(episode__podcast=podcast, day__gte=start, day__lte=end)
+        .values("episode_id", "episode__title")
+    ).order_by("-total_plays")
+    return [
+        {"episode_id": row["episode_id"], "title": row["episode__title"], **_totals(_unsum(row))}
+        for row in rows
+    ]
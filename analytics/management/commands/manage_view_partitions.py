@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.archive import RAW_RETENTION_MONTHS, apply_retention, expired_periods
+from apps.analytics.models import ObjectView
+from apps.analytics.partitions import ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = "Create upcoming ObjectView partitions and archive months past the raw retention window"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=2, help="Months of partitions to create ahead")
+        parser.add_argument("--retention-months", type=int, default=RAW_RETENTION_MONTHS)
+        parser.add_argument("--dry-run", action="store_true", help="Only list the months that would be archived")
+
+    def handle(self, *args, **options):
+        if is_partitioned(ObjectView):
+            created = ensure_partitions(ObjectView, months_ahead=options["ahead"])
+            self.stdout.write(f"Ensured {len(created)} monthly partitions")
+        else:
+            self.stdout.write("ObjectView is not natively partitioned; months are handled as timestamp ranges")
+
+        if options["dry_run"]:
+            for period in expired_periods(retention_months=options["retention_months"]):
+                self.stdout.write(f"Would archive {period.label}")
+            return
+
+        for result in apply_retention(retention_months=options["retention_months"]):
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {result['period']}: {result['rows']} rows -> {result['path']} "
+                f"({result['daily_rows']} daily aggregates)"
+            ))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('podcasts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('position', models.DateTimeField()),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EpisodeHourlyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the hour')),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('episode', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_activity', to='podcasts.episode')),
+            ],
+            options={
+                'verbose_name_plural': 'Episode Hourly Activity',
+                'indexes': [models.Index(fields=['bucket', 'episode'], name='analytics_ep_hour_bucket_idx')],
+                'unique_together': {('episode', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PodcastHourlyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the hour')),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('podcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_activity', to='podcasts.podcast')),
+            ],
+            options={
+                'verbose_name_plural': 'Podcast Hourly Activity',
+                'indexes': [models.Index(fields=['bucket', 'podcast'], name='analytics_pod_hour_bucket_idx')],
+                'unique_together': {('podcast', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_hourly_activity'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UniqueSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(max_length=64)),
+                ('metric', models.CharField(choices=[('viewers', 'Viewers'), ('listeners', 'Listeners')], max_length=16)),
+                ('day', models.DateField()),
+                ('sketch', models.BinaryField(help_text='HyperLogLog.to_bytes()')),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'unique_together': {('content_type', 'object_id', 'metric', 'day')},
+            },
+        ),
+    ]
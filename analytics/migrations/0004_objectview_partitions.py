@@ -0,0 +1,107 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.analytics.partitions import months_between, next_month
+
+
+def partition_objectview(apps, schema_editor):
+    """
+    Postgres only: rebuild analytics_objectview as a table partitioned by RANGE ("timestamp").
+    The primary key becomes (id, timestamp), as Postgres requires the partition key in it;
+    ids stay unique since they still come from one identity sequence.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    ObjectView = apps.get_model('analytics', 'ObjectView')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    qn = schema_editor.quote_name
+    table = ObjectView._meta.db_table
+    legacy = f'{table}_unpartitioned'
+
+    schema_editor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}')
+    schema_editor.execute(
+        f'CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+        f'PARTITION BY RANGE ("timestamp")'
+    )
+    schema_editor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + "_pkey_ts")} PRIMARY KEY (id, "timestamp")')
+    schema_editor.execute(
+        f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + "_content_type_fk")} FOREIGN KEY (content_type_id) '
+        f'REFERENCES {qn(ContentType._meta.db_table)} (id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    schema_editor.execute(
+        f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + "_user_fk")} FOREIGN KEY (user_id) '
+        f'REFERENCES {qn(User._meta.db_table)} (id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    # same index names as in 0001, now partitioned indexes
+    schema_editor.execute('DROP INDEX IF EXISTS analytics_o_user_id_b54e33_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS analytics_o_content_ad4cf6_idx')
+    schema_editor.execute(f'CREATE INDEX analytics_o_user_id_b54e33_idx ON {qn(table)} (user_id, content_type_id)')
+    schema_editor.execute(
+        f'CREATE INDEX analytics_o_content_ad4cf6_idx ON {qn(table)} (content_type_id, object_id, ip_address, "timestamp")'
+    )
+    schema_editor.execute(f'CREATE TABLE {qn(table + "_default")} PARTITION OF {qn(table)} DEFAULT')
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("timestamp"), NOW() FROM {qn(legacy)}')
+        oldest, now = cursor.fetchone()
+    for period in months_between(oldest or now, next_month(next_month(next_month(now)))):
+        schema_editor.execute(
+            f'CREATE TABLE {qn(f"{table}_p{period.label}")} PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)',
+            [period.start.isoformat(), period.end.isoformat()],
+        )
+
+    schema_editor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}')
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {qn(table)}), 0) + 1, false)"
+    )
+    schema_editor.execute(f'DROP TABLE {qn(legacy)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_unique_sketch'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyObjectViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(max_length=64)),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('anonymous_views', models.PositiveIntegerField(default=0)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Object Views',
+                'indexes': [models.Index(fields=['day', 'content_type'], name='analytics_daily_views_day_idx')],
+                'unique_together': {('content_type', 'object_id', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=128)),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('path', models.CharField(help_text='Path in the default storage', max_length=512)),
+                ('format', models.CharField(choices=[('parquet', 'Parquet'), ('ndjson.gz', 'Gzipped NDJSON')], max_length=16)),
+                ('rows', models.PositiveBigIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['table', 'start'],
+                'unique_together': {('table', 'start')},
+            },
+        ),
+        migrations.RunPython(partition_objectview, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_objectview_partitions'),
+        ('podcasts', '0002_denormalized_durations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EpisodeDailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_listeners', models.PositiveIntegerField(default=0, help_text='HyperLogLog estimate')),
+                ('episode', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to='podcasts.episode')),
+            ],
+            options={
+                'verbose_name_plural': 'Episode Daily Activity',
+                'unique_together': {('episode', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PodcastDailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_listeners', models.PositiveIntegerField(default=0, help_text='HyperLogLog estimate')),
+                ('podcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to='podcasts.podcast')),
+            ],
+            options={
+                'verbose_name_plural': 'Podcast Daily Activity',
+                'unique_together': {('podcast', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_daily_activity'),
+        ('podcasts', '0002_denormalized_durations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EpisodeRetention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('buckets', models.PositiveSmallIntegerField()),
+                ('histogram', models.BinaryField(help_text='uint32 counts per bucket, little-endian')),
+                ('listeners', models.PositiveIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('episode', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='retention', to='podcasts.episode')),
+            ],
+            options={
+                'verbose_name_plural': 'Episode Retention',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_episode_retention'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='objectview',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
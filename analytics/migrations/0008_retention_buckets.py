@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-19 22:10
+
+import struct
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Greatest, Least
+
+BUCKETS = getattr(settings, 'ANALYTICS_RETENTION_BUCKETS', 100)
+
+
+def backfill_buckets(apps, schema_editor):
+    """Store each row's retention slice and recount the histograms from them (see retention.py)."""
+    Episode = apps.get_model('podcasts', 'Episode')
+    PlayBack = apps.get_model('podcasts', 'PlayBack')
+    EpisodeRetention = apps.get_model('analytics', 'EpisodeRetention')
+
+    last = BUCKETS - 1
+    duration = Subquery(Episode.objects.filter(pk=OuterRef('episode_id')).values('duration_seconds')[:1])
+    PlayBack.objects.filter(episode__duration_seconds__gt=0).update(retention_bucket=Case(
+        When(is_completed=True, then=Value(last)),
+        default=Least(Greatest(F('current_timestamp'), Value(0)) * BUCKETS / duration, Value(last)),
+        output_field=models.PositiveSmallIntegerField(),
+    ))
+
+    histograms = defaultdict(lambda: [0] * BUCKETS)
+    counts = (
+        PlayBack.objects
+        .filter(retention_bucket__isnull=False)
+        .order_by()
+        .values('episode_id', 'retention_bucket')
+        .annotate(n=Count('id'))
+    )
+    for row in counts.iterator():
+        histograms[row['episode_id']][row['retention_bucket']] = row['n']
+
+    EpisodeRetention.objects.all().delete()
+    EpisodeRetention.objects.bulk_create(
+        [
+            EpisodeRetention(episode_id=pk, buckets=BUCKETS, histogram=struct.pack('<%dI' % BUCKETS, *counts),
+                             listeners=sum(counts))
+            for pk, counts in histograms.items()
+        ],
+        batch_size=500,
+    )
+
+
+def clear_buckets(apps, schema_editor):
+    apps.get_model('podcasts', 'PlayBack').objects.update(retention_bucket=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_objectview_timestamp_default'),
+        ('podcasts', '0006_playback_retention_bucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_buckets, clear_buckets),
+    ]
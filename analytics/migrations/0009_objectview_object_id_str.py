@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-19 22:35
+
+import uuid
+
+from django.db import migrations, models
+
+
+def _uuid_content_types(apps):
+    """Content type ids of ObjectView targets whose primary key is a UUID."""
+    ObjectView = apps.get_model('analytics', 'ObjectView')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    used = ObjectView.objects.order_by().values_list('content_type_id', flat=True).distinct()
+    for ct in ContentType.objects.filter(pk__in=list(used)):
+        try:
+            model = apps.get_model(ct.app_label, ct.model)
+        except LookupError:
+            continue
+        if isinstance(model._meta.pk, models.UUIDField):
+            yield ct.pk
+
+
+def _rewrite(apps, convert):
+    ObjectView = apps.get_model('analytics', 'ObjectView')
+    for content_type_id in list(_uuid_content_types(apps)):
+        rows = ObjectView.objects.filter(content_type_id=content_type_id)
+        for object_id in list(rows.order_by().values_list('object_id', flat=True).distinct()):
+            new = convert(object_id)
+            if new != object_id:
+                rows.filter(object_id=object_id).update(object_id=new)
+
+
+def uuid_keys_to_str(apps, schema_editor):
+    """UUID keys were stored as int(uuid); store str(uuid) like every other str(pk)."""
+    _rewrite(apps, lambda object_id: str(uuid.UUID(int=int(object_id))) if object_id.isdigit() else object_id)
+
+
+def uuid_keys_to_int(apps, schema_editor):
+    _rewrite(apps, lambda object_id: object_id if object_id.isdigit() else str(uuid.UUID(object_id).int))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_retention_buckets'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='objectview',
+            name='object_id',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.RunPython(uuid_keys_to_str, uuid_keys_to_int),
+    ]
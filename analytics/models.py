@@ -1,14 +1,16 @@
 import uuid
-from datetime import timedelta
 
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
 from core.compat import get_user_model
 from utils.utils import get_client_ip
+from . import buffers
+from .hll import HyperLogLog
 
 User = get_user_model()
 
@@ -28,12 +30,13 @@ class ObjectView(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
     # What did they view? (Generic Relation)
+    # str(pk), like UniqueSketch and DailyObjectViews, so integer and UUID keys both fit
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.PositiveIntegerField()
+    object_id = models.CharField(max_length=64)
     content_object = GenericForeignKey('content_type', 'object_id')
 
-    # When?
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # When? (set by the caller for buffered views, which are written after the request)
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = "Object View"
@@ -50,6 +53,201 @@ class ObjectView(models.Model):
         return f"{self.user if self.user else self.ip_address} viewed {self.content_object}"
 
 
+def view_object_pk(model, object_id):
+    """
+    Map an ObjectView.object_id (the object's str(pk)) back to the primary key of `model`.
+    """
+    return model._meta.pk.to_python(object_id)
+
+
+# 2. Hourly Rollups
+# Incrementally maintained from PlayBack and ObjectView by `rollup_hourly_activity`,
+# so trending windows sum a handful of buckets instead of scanning raw events.
+class RollupCursor(models.Model):
+    name = models.CharField(max_length=64, unique=True)
+    position = models.DateTimeField()
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class AbstractHourlyActivity(models.Model):
+    bucket = models.DateTimeField(help_text="Start of the hour")
+    plays = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class EpisodeHourlyActivity(AbstractHourlyActivity):
+    episode = models.ForeignKey("podcasts.Episode", on_delete=models.CASCADE, related_name="hourly_activity")
+
+    class Meta:
+        verbose_name_plural = "Episode Hourly Activity"
+        unique_together = ("episode", "bucket")
+        indexes = [
+            # range scan by window, grouped by episode
+            models.Index(fields=["bucket", "episode"], name="analytics_ep_hour_bucket_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.episode_id} @ {self.bucket:%Y-%m-%d %H}h"
+
+
+class PodcastHourlyActivity(AbstractHourlyActivity):
+    podcast = models.ForeignKey("podcasts.Podcast", on_delete=models.CASCADE, related_name="hourly_activity")
+
+    class Meta:
+        verbose_name_plural = "Podcast Hourly Activity"
+        unique_together = ("podcast", "bucket")
+        indexes = [
+            models.Index(fields=["bucket", "podcast"], name="analytics_pod_hour_bucket_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.podcast_id} @ {self.bucket:%Y-%m-%d %H}h"
+
+
+class AbstractDailyActivity(models.Model):
+    day = models.DateField()
+    plays = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    views = models.PositiveIntegerField(default=0)
+    unique_listeners = models.PositiveIntegerField(default=0, help_text="HyperLogLog estimate")
+
+    class Meta:
+        abstract = True
+
+    @property
+    def completion_rate(self):
+        return self.completions / self.plays if self.plays else 0.0
+
+
+# Daily rows folded from the hourly rollups (and sketches) by `rollup_daily_activity`;
+# the creator dashboards read only these (see creator.py).
+class EpisodeDailyActivity(AbstractDailyActivity):
+    episode = models.ForeignKey("podcasts.Episode", on_delete=models.CASCADE, related_name="daily_activity")
+
+    class Meta:
+        verbose_name_plural = "Episode Daily Activity"
+        unique_together = ("episode", "day")
+
+    def __str__(self):
+        return f"{self.episode_id} @ {self.day}"
+
+
+class PodcastDailyActivity(AbstractDailyActivity):
+    podcast = models.ForeignKey("podcasts.Podcast", on_delete=models.CASCADE, related_name="daily_activity")
+
+    class Meta:
+        verbose_name_plural = "Podcast Daily Activity"
+        unique_together = ("podcast", "day")
+
+    def __str__(self):
+        return f"{self.podcast_id} @ {self.day}"
+
+
+class EpisodeRetention(models.Model):
+    """Where listeners stopped, as a histogram over equal slices of the episode (see retention.py)."""
+    episode = models.OneToOneField("podcasts.Episode", on_delete=models.CASCADE, related_name="retention")
+    buckets = models.PositiveSmallIntegerField()
+    histogram = models.BinaryField(help_text="uint32 counts per bucket, little-endian")
+    listeners = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Episode Retention"
+
+    def __str__(self):
+        return f"retention {self.episode_id} ({self.listeners} listeners)"
+
+
+# 3. Distinct-audience sketches
+# One HyperLogLog per object, metric and day (filled by `rollup_hourly_activity`);
+# any date range is the union of its daily sketches.
+class UniqueSketchQuerySet(models.QuerySet):
+
+    def for_object(self, obj, metric):
+        return self.filter(
+            content_type=ContentType.objects.get_for_model(obj), object_id=str(obj.pk), metric=metric
+        )
+
+    def estimate(self, start=None, end=None):
+        """Approximate distinct users/IPs over the days in [start, end]."""
+        qs = self
+        if start is not None:
+            qs = qs.filter(day__gte=start)
+        if end is not None:
+            qs = qs.filter(day__lte=end)
+        return HyperLogLog.union(HyperLogLog.from_bytes(data) for data in qs.values_list("sketch", flat=True)).count()
+
+
+class UniqueSketch(models.Model):
+    class Metric(models.TextChoices):
+        VIEWERS = "viewers", _("Viewers")
+        LISTENERS = "listeners", _("Listeners")
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=64)
+    metric = models.CharField(max_length=16, choices=Metric.choices)
+    day = models.DateField()
+    sketch = models.BinaryField(help_text="HyperLogLog.to_bytes()")
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = UniqueSketchQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ("content_type", "object_id", "metric", "day")
+
+    def __str__(self):
+        return f"{self.metric} {self.content_type_id}:{self.object_id} @ {self.day}"
+
+
+# 4. Retention
+# Raw ObjectView months past the retention window are rolled up here and archived
+# to files (see archive.py), then dropped from the live table.
+class DailyObjectViews(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=64)
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    anonymous_views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily Object Views"
+        unique_together = ("content_type", "object_id", "day")
+        indexes = [
+            models.Index(fields=["day", "content_type"], name="analytics_daily_views_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type_id}:{self.object_id} @ {self.day}: {self.views}"
+
+
+class ArchivedPeriod(models.Model):
+    class Format(models.TextChoices):
+        PARQUET = "parquet", _("Parquet")
+        NDJSON = "ndjson.gz", _("Gzipped NDJSON")
+
+    table = models.CharField(max_length=128)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    path = models.CharField(max_length=512, help_text="Path in the default storage")
+    format = models.CharField(max_length=16, choices=Format.choices)
+    rows = models.PositiveBigIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("table", "start")
+        ordering = ["table", "start"]
+
+    def __str__(self):
+        return f"{self.table} {self.start:%Y-%m} ({self.rows} rows)"
+
+
 class AnalyticsQueryset(models.QuerySet):
     ...
 
@@ -100,46 +298,35 @@ class AbstractAnalytics(models.Model):
     def record_view(self, request):
         """
         Smart view recording:
-        1. Checks if this user/IP has viewed this item recently (e.g., last 10 mins).
-        2. If not, creates a log entry and increments the counter.
+        1. Claims a 10 minute cooldown for this user/IP in the cache (one add()).
+        2. If it was free, logs the view and increments the counter; with buffered views
+           enabled both happen later in bulk (see buffers.py).
         """
         user = request.user if request.user.is_authenticated else None
         ip = get_client_ip(request)
 
-        # Define a "cooldown" period (e.g., 10 minutes)
-        # We don't want to count every single refresh as a new view for ML or Popularity
-        cooldown_time = timezone.now() - timedelta(minutes=10)
+        if buffers.enabled():
+            counted = buffers.record(self, user, ip)
+        else:
+            content_type = ContentType.objects.get_for_model(self)
+            counted = buffers.claim_view(content_type.pk, buffers.view_object_id(self), user, ip)
+            if counted:
+                # 1. Create the Log (For ML)
+                ObjectView.objects.create(user=user, ip_address=ip, content_object=self)
+                # 2. Increment the Counter (For Popularity Sorting); F() avoids race conditions
+                type(self)._default_manager.filter(pk=self.pk).update(view_count=models.F('view_count') + 1)
 
-        # Check if a view exists in the cooldown period
-        existing_view = ObjectView.objects.filter(
-            content_type=ContentType.objects.get_for_model(self),
-            object_id=self.id,
-            timestamp__gte=cooldown_time
-        )
+        if counted:
+            # the stored counter may lag until the next flush; keep this instance in step
+            self.view_count += 1
+        return counted
 
-        if user:
-            is_duplicate = existing_view.filter(user=user).exists()
-        else:
-            is_duplicate = existing_view.filter(ip_address=ip).exists()
-
-        if not is_duplicate:
-            # 1. Create the Log (For ML)
-            ObjectView.objects.create(
-                user=user,
-                ip_address=ip,
-                content_object=self
-            )
-
-            # 2. Increment the Counter (For Popularity Sorting)
-            # using F() expression avoids race conditions
-            self.view_count = models.F('view_count') + 1
-            self.save(update_fields=['view_count'])
-
-            # Refresh to get the integer value back from the DB expression
-            self.refresh_from_db()
-            return True
-
-        return False
+    def unique_viewers(self, start=None, end=None) -> int:
+        """Approximate distinct viewers between two dates (inclusive, ~1% error)."""
+        return UniqueSketch.objects.for_object(self, UniqueSketch.Metric.VIEWERS).estimate(start, end)
+
+    def unique_listeners(self, start=None, end=None) -> int:
+        return UniqueSketch.objects.for_object(self, UniqueSketch.Metric.LISTENERS).estimate(start, end)
 
     def user_has_subscribed(self, user) -> bool:
         if not user or not user.is_authenticated:
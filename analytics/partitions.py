@@ -0,0 +1,118 @@
+"""
+Monthly time partitions for ObjectView.
+
+On Postgres the table is declaratively partitioned by RANGE ("timestamp") (see
+migration 0004) with one partition per month plus a DEFAULT partition; partitions are
+created ahead of time and dropped whole once archived. Other backends emulate this
+with one table: a period is simply its timestamp range, creating it is a no-op and
+dropping it deletes the range in batches.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+DELETE_BATCH_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class Period:
+    start: datetime
+    end: datetime
+
+    @property
+    def label(self):
+        return f"{self.start:%Y%m}"
+
+
+def month_start(dt):
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(dt):
+    return month_start(month_start(dt) + timedelta(days=32))
+
+
+def month_period(dt):
+    start = month_start(dt)
+    return Period(start, next_month(start))
+
+
+def months_between(start, end):
+    """Monthly periods covering [start, end)."""
+    periods, cursor = [], month_start(start)
+    while cursor < end:
+        periods.append(Period(cursor, next_month(cursor)))
+        cursor = next_month(cursor)
+    return periods
+
+
+def _table(model):
+    return model._meta.db_table
+
+
+def partition_name(model, period):
+    return f"{_table(model)}_p{period.label}"
+
+
+def is_partitioned(model):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [_table(model)],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partition(model, period, schema_editor=None):
+    """CREATE TABLE ... PARTITION OF for `period` (no-op without native partitioning)."""
+    if schema_editor is None and not is_partitioned(model):
+        return False
+    qn = (schema_editor.connection if schema_editor else connection).ops.quote_name
+    sql = (
+        f"CREATE TABLE IF NOT EXISTS {qn(partition_name(model, period))} "
+        f"PARTITION OF {qn(_table(model))} FOR VALUES FROM (%s) TO (%s)"
+    )
+    params = [period.start.isoformat(), period.end.isoformat()]
+    if schema_editor:
+        schema_editor.execute(sql, params)
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+    return True
+
+
+def ensure_partitions(model, months_ahead=2, now=None):
+    """Make sure the current month and the next `months_ahead` have partitions."""
+    period, created = month_period(now or timezone.now()), []
+    for _ in range(months_ahead + 1):
+        if create_partition(model, period):
+            created.append(period)
+        period = Period(period.end, next_month(period.end))
+    return created
+
+
+def _partition_exists(model, period):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [partition_name(model, period)])
+        return cursor.fetchone()[0] is not None
+
+
+def drop_period(model, period):
+    """Remove every row of `period`: DETACH + DROP the partition, or batched range deletes."""
+    if is_partitioned(model) and _partition_exists(model, period):
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {qn(_table(model))} DETACH PARTITION {qn(partition_name(model, period))}")
+            cursor.execute(f"DROP TABLE {qn(partition_name(model, period))}")
+        return
+    # emulated periods (and rows that landed in the DEFAULT partition)
+    rows = model.objects.filter(timestamp__gte=period.start, timestamp__lt=period.end)
+    while True:
+        ids = list(rows.values_list("pk", flat=True)[:DELETE_BATCH_SIZE])
+        if not ids:
+            break
+        model.objects.filter(pk__in=ids).delete()
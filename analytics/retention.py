@@ -0,0 +1,143 @@
+"""
+Listening-retention curves.
+
+Each PlayBack row says where one listener stopped (``current_timestamp``, or the end
+when ``is_completed``). Rows are binned by ``current_timestamp / duration`` into
+RETENTION_BUCKETS equal slices per episode, and the counts are stored as a small uint32
+array (EpisodeRetention). The curve is the share of listeners still there at each slice:
+a reverse cumulative sum.
+
+The histograms are maintained incrementally: each row remembers the slice it is counted in
+(``PlayBack.retention_bucket``), and ``fold`` streams only rows changed since the last run
+(tasks.refresh_retention_curves) through NumPy, moving each from its old slice to its new
+one. Deleted rows stay counted, and rows are not re-binned when an episode's duration or
+RETENTION_BUCKETS changes; ``rebuild`` recounts episodes from scratch for that.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EpisodeRetention
+
+RETENTION_BUCKETS = getattr(settings, "ANALYTICS_RETENTION_BUCKETS", 100)
+CHUNK_SIZE = getattr(settings, "ANALYTICS_RETENTION_CHUNK_SIZE", 20_000)
+
+_DTYPE = np.dtype("<u4")
+
+
+def bin_positions(positions, durations, completed, buckets=RETENTION_BUCKETS):
+    """Bucket index (0..buckets-1) of each stop position; completed plays land in the last bucket."""
+    positions = np.asarray(positions, dtype=np.float64)
+    durations = np.asarray(durations, dtype=np.float64)
+    fractions = np.where(np.asarray(completed, dtype=bool), 1.0, np.clip(positions / durations, 0.0, 1.0))
+    return np.minimum((fractions * buckets).astype(np.int64), buckets - 1)
+
+
+def _merge(episodes, deltas, buckets):
+    """Add per-episode `deltas` (rows indexed by `episodes`) onto the stored histograms."""
+    existing = {
+        row.episode_id: row
+        for row in EpisodeRetention.objects.select_for_update().filter(episode_id__in=list(episodes))
+    }
+    now = timezone.now()
+    to_create, to_update = [], []
+    for pk, i in episodes.items():
+        counts = deltas[i]
+        row = existing.get(pk)
+        if row is None:
+            row = EpisodeRetention(episode_id=pk, buckets=buckets)
+            to_create.append(row)
+        else:
+            counts = counts + np.frombuffer(bytes(row.histogram), dtype=_DTYPE)
+            to_update.append(row)
+        counts = np.maximum(counts, 0)
+        row.histogram = counts.astype(_DTYPE).tobytes()
+        row.listeners = int(counts.sum())
+        row.updated = now
+    EpisodeRetention.objects.bulk_create(to_create, batch_size=500)
+    EpisodeRetention.objects.bulk_update(to_update, ["histogram", "listeners", "updated"], batch_size=500)
+
+
+def _fold_chunk(chunk, buckets):
+    from apps.posts.podcasts.models import PlayBack
+
+    pks, episode_ids, positions, completed, durations, previous = zip(*chunk)
+    new = bin_positions(positions, durations, completed, buckets)
+    old = np.fromiter((-1 if b is None else b for b in previous), dtype=np.int64, count=len(chunk))
+    moved = np.flatnonzero(new != old)
+    if not len(moved):
+        return set()
+
+    episodes = {}
+    rows = np.fromiter((episodes.setdefault(episode_ids[i], len(episodes)) for i in moved),
+                       dtype=np.int64, count=len(moved))
+    deltas = np.zeros((len(episodes), buckets), dtype=np.int64)
+    np.add.at(deltas, (rows, new[moved]), 1)
+    counted = old[moved] >= 0
+    np.subtract.at(deltas, (rows[counted], old[moved][counted]), 1)
+
+    PlayBack.objects.bulk_update(
+        [PlayBack(pk=pks[i], retention_bucket=int(new[i])) for i in moved], ["retention_bucket"], batch_size=1000)
+    _merge(episodes, deltas, buckets)
+    return set(episodes)
+
+
+def fold(playbacks, buckets=RETENTION_BUCKETS, chunk_size=CHUNK_SIZE):
+    """
+    Move the PlayBack rows of `playbacks` (a queryset) into their current slice; call inside
+    a transaction. Returns the number of episodes whose histogram changed.
+    """
+    rows = (
+        playbacks
+        .filter(episode__duration_seconds__gt=0)
+        .order_by()
+        .values_list("pk", "episode_id", "current_timestamp", "is_completed", "episode__duration_seconds",
+                     "retention_bucket")
+        .iterator(chunk_size=chunk_size)
+    )
+    changed, chunk = set(), []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            changed |= _fold_chunk(chunk, buckets)
+            chunk = []
+    if chunk:
+        changed |= _fold_chunk(chunk, buckets)
+    return len(changed)
+
+
+def rebuild(episode_ids, buckets=RETENTION_BUCKETS):
+    """Recount the histograms of `episode_ids` from all their PlayBack rows."""
+    from apps.posts.podcasts.models import PlayBack
+
+    episode_ids = list(episode_ids)
+    with transaction.atomic():
+        EpisodeRetention.objects.filter(episode_id__in=episode_ids).delete()
+        PlayBack.objects.filter(episode_id__in=episode_ids).update(retention_bucket=None)
+        return fold(PlayBack.objects.filter(episode_id__in=episode_ids), buckets)
+
+
+def curve_from_histogram(counts):
+    """Fraction of listeners who got at least as far as the start of each bucket."""
+    counts = np.asarray(counts, dtype=np.int64)
+    total = counts.sum()
+    if not total:
+        return np.zeros(len(counts))
+    return counts[::-1].cumsum()[::-1] / total
+
+
+def retention_curve(episode):
+    """
+    [{"position": 0.0..1.0, "seconds": ..., "retained": 0.0..1.0}] for an episode
+    (one query); empty until the retention job has seen a play.
+    """
+    row = EpisodeRetention.objects.filter(episode=episode).first()
+    if row is None:
+        return []
+    counts = np.frombuffer(bytes(row.histogram), dtype=_DTYPE)
+    duration = episode.duration_seconds
+    return [
+        {"position": i / row.buckets, "seconds": round(duration * i / row.buckets), "retained": float(share)}
+        for i, share in enumerate(curve_from_histogram(counts))
+    ]
@@ -0,0 +1,103 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .hll import HyperLogLog
+from .models import RollupCursor, UniqueSketch
+
+COUNTERS = ("plays", "completions", "views")
+
+# Rows land after the time they carry: buffered views and heartbeats keep the request time
+# but are written at the next flush, and any row commits a little after its timestamp.
+# Windows stop this far behind now so nothing is written behind a cursor; keep it well
+# above the buffer flush interval.
+SETTLE_SECONDS = getattr(settings, "ANALYTICS_ROLLUP_SETTLE_SECONDS", 5 * 60)
+
+
+def floor_hour(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def hours_ago(hours, now=None):
+    """Start of the bucket covering `now - hours`."""
+    return floor_hour((now or timezone.now()) - timedelta(hours=hours))
+
+
+def settled(now=None):
+    """End of the window a rollup may fold: every row stamped before it has been written."""
+    return (now or timezone.now()) - timedelta(seconds=SETTLE_SECONDS)
+
+
+def counter_map():
+    """{(object_pk, bucket): Counter(plays=..., completions=..., views=...)}"""
+    return defaultdict(Counter)
+
+
+def lock_cursor(name, default):
+    """
+    Fetch (or create) a rollup cursor, locked for the surrounding transaction
+    so two workers can never fold the same window twice.
+    """
+    RollupCursor.objects.get_or_create(name=name, defaults={"position": default})
+    return RollupCursor.objects.select_for_update().get(name=name)
+
+
+def merge_counters(model, key_field, counters):
+    """
+    Add `counters` onto existing rollup rows, creating missing buckets.
+    Returns the number of rows written.
+    """
+    if not counters:
+        return 0
+    object_ids = {pk for pk, _ in counters}
+    buckets = {bucket for _, bucket in counters}
+    existing = {
+        (getattr(row, key_field), row.bucket): row
+        for row in model.objects.filter(bucket__in=buckets, **{f"{key_field}__in": object_ids})
+    }
+
+    to_create, to_update = [], []
+    for (pk, bucket), delta in counters.items():
+        row = existing.get((pk, bucket))
+        if row is None:
+            row = model(bucket=bucket, **{key_field: pk})
+            to_create.append(row)
+        else:
+            to_update.append(row)
+        for field in COUNTERS:
+            setattr(row, field, getattr(row, field) + delta[field])
+
+    model.objects.bulk_create(to_create, batch_size=1000)
+    model.objects.bulk_update(to_update, list(COUNTERS), batch_size=1000)
+    return len(to_create) + len(to_update)
+
+
+def merge_sketches(sketches):
+    """Union `sketches` into the stored daily sketches; returns the number of rows written."""
+    if not sketches:
+        return 0
+    existing = {
+        (row.content_type_id, row.object_id, row.metric, row.day): row
+        for row in UniqueSketch.objects.filter(
+            content_type_id__in={key[0] for key in sketches},
+            object_id__in={key[1] for key in sketches},
+            metric__in={key[2] for key in sketches},
+            day__in={key[3] for key in sketches},
+        )
+    }
+
+    to_create, to_update = [], []
+    for (content_type_id, object_id, metric, day), sketch in sketches.items():
+        row = existing.get((content_type_id, object_id, metric, day))
+        if row is None:
+            to_create.append(UniqueSketch(content_type_id=content_type_id, object_id=object_id, metric=metric,
+                                          day=day, sketch=sketch.to_bytes()))
+        else:
+            row.sketch = sketch.merge(HyperLogLog.from_bytes(row.sketch)).to_bytes()
+            to_update.append(row)
+
+    UniqueSketch.objects.bulk_create(to_create, batch_size=500)
+    UniqueSketch.objects.bulk_update(to_update, ["sketch"], batch_size=500)
+    return len(to_create) + len(to_update)
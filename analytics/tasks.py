@@ -0,0 +1,226 @@
+from datetime import timedelta
+from itertools import groupby
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from apps.posts.podcasts.models import Episode, Podcast, PlayBack
+from .hll import HyperLogLog
+from .models import (
+    ObjectView, EpisodeHourlyActivity, PodcastHourlyActivity, EpisodeDailyActivity, PodcastDailyActivity,
+    UniqueSketch, view_object_pk,
+)
+from . import buffers, retention
+from .rollups import counter_map, lock_cursor, merge_counters, merge_sketches, settled
+
+HOURLY_CURSOR = "hourly_activity"
+# how far back the very first run reaches; later runs only fold (cursor, settled()]
+HOURLY_BACKFILL_DAYS = getattr(settings, "ANALYTICS_HOURLY_BACKFILL_DAYS", 7)
+
+DAILY_CURSOR = "daily_activity"
+DAILY_BACKFILL_DAYS = getattr(settings, "ANALYTICS_DAILY_BACKFILL_DAYS", HOURLY_BACKFILL_DAYS)
+# closed days folded again on each run, to pick up hourly buckets that were folded late
+DAILY_REFOLD_DAYS = getattr(settings, "ANALYTICS_DAILY_REFOLD_DAYS", 1)
+
+RETENTION_CURSOR = "retention_curves"
+# unique-audience sketches (8 KiB each) held before they are merged into UniqueSketch
+SKETCH_BATCH_SIZE = 500
+
+
+def _views_by_hour(model, start, end):
+    ct = ContentType.objects.get_for_model(model)
+    rows = (
+        ObjectView.objects
+        .filter(content_type=ct, timestamp__gt=start, timestamp__lte=end)
+        .annotate(bucket=TruncHour("timestamp"))
+        .values("object_id", "bucket")
+        .annotate(views=Count("id"))
+    )
+    views = [(view_object_pk(model, r["object_id"]), r["bucket"], r["views"]) for r in rows]
+    # ObjectView has no FK, so drop rows pointing at deleted objects
+    alive = set(model.objects.filter(pk__in={pk for pk, _, _ in views}).values_list("pk", flat=True))
+    return [v for v in views if v[0] in alive]
+
+
+def _audience_member(user_id, ip_address):
+    return f"u{user_id}" if user_id is not None else f"ip{ip_address}"
+
+
+def _audiences(start, end):
+    """
+    ((content_type_id, object_id, metric, day), members) for the daily distinct viewers (any
+    ObjectView target) and listeners of (start, end]. Each query returns distinct
+    (object, day, viewer) rows in key order, so one group is read at a time.
+    """
+    views = (
+        ObjectView.objects
+        .filter(timestamp__gt=start, timestamp__lte=end)
+        .annotate(day=TruncDate("timestamp"))
+        .values_list("content_type_id", "object_id", "day", "user_id", "ip_address")
+        .order_by("content_type_id", "object_id", "day")
+        .distinct()
+    )
+    streams = [(UniqueSketch.Metric.VIEWERS, views)]
+
+    plays = PlayBack.objects.filter(last_played_at__gt=start, last_played_at__lte=end).annotate(
+        day=TruncDate("last_played_at"))
+    for model, field in ((Episode, "episode_id"), (Podcast, "episode__podcast_id")):
+        content_type_id = ContentType.objects.get_for_model(model).pk
+        listeners = (
+            plays
+            .annotate(content_type_id=Value(content_type_id), object_id=F(field))
+            .values_list("content_type_id", "object_id", "day", "user_id", "ip_address")
+            .order_by("object_id", "day")
+            .distinct()
+        )
+        streams.append((UniqueSketch.Metric.LISTENERS, listeners))
+
+    for metric, rows in streams:
+        grouped = groupby(rows.iterator(), key=lambda row: row[:3])
+        for (content_type_id, object_id, day), members in grouped:
+            key = (content_type_id, str(object_id), metric, day)
+            yield key, (_audience_member(user_id, ip_address) for *_, user_id, ip_address in members)
+
+
+def _merge_unique_sketches(start, end, batch_size=SKETCH_BATCH_SIZE):
+    """Union the daily audiences of (start, end] into UniqueSketch, holding at most `batch_size` sketches."""
+    written, batch = 0, {}
+    for key, members in _audiences(start, end):
+        batch[key] = HyperLogLog().update(members)
+        if len(batch) >= batch_size:
+            written += merge_sketches(batch)
+            batch = {}
+    return written + merge_sketches(batch)
+
+
+@shared_task
+def rollup_hourly_activity():
+    """
+    Fold PlayBack and ObjectView activity since the last run into per-hour counters
+    and the daily unique viewer/listener sketches.
+
+    PlayBack holds one row per listener and episode, updated by every heartbeat, so a play
+    is counted once per listening session, in the hour it started (session_started_at), and
+    a completion in the hour is_completed became true (completed_at).
+
+    The window ends at rollups.settled(), not now: views and heartbeats are buffered with
+    their request time, so rows newer than that may still be on their way to the table.
+    """
+    end = settled()
+    with transaction.atomic():
+        cursor = lock_cursor(HOURLY_CURSOR, default=end - timedelta(days=HOURLY_BACKFILL_DAYS))
+        start = cursor.position
+        if start >= end:
+            return {"episodes": 0, "podcasts": 0, "sketches": 0}
+
+        episodes, podcasts = counter_map(), counter_map()
+
+        for field, metric in (("session_started_at", "plays"), ("completed_at", "completions")):
+            rows = (
+                PlayBack.objects
+                .filter(**{f"{field}__gt": start, f"{field}__lte": end})
+                .annotate(bucket=TruncHour(field))
+                .values("episode_id", "episode__podcast_id", "bucket")
+                .annotate(total=Count("id"))
+            )
+            for row in rows:
+                episodes[(row["episode_id"], row["bucket"])][metric] += row["total"]
+                podcasts[(row["episode__podcast_id"], row["bucket"])][metric] += row["total"]
+
+        for model, counters in ((Episode, episodes), (Podcast, podcasts)):
+            for pk, bucket, views in _views_by_hour(model, start, end):
+                counters[(pk, bucket)]["views"] += views
+
+        written = {
+            "episodes": merge_counters(EpisodeHourlyActivity, "episode_id", episodes),
+            "podcasts": merge_counters(PodcastHourlyActivity, "podcast_id", podcasts),
+            "sketches": _merge_unique_sketches(start, end),
+        }
+        cursor.position = end
+        cursor.save(update_fields=["position", "updated"])
+    return written
+
+
+@shared_task
+def flush_view_buffer():
+    """Write buffered views (see buffers.py); schedule every few seconds from beat."""
+    return {"written": buffers.flush()}
+
+
+def _fold_days(hourly_model, daily_model, target, start_day, end_day):
+    """Rebuild daily rows for [start_day, end_day) from the hourly buckets and listener sketches."""
+    key = f"{target}_id"
+    rows = (
+        hourly_model.objects
+        .filter(bucket__date__gte=start_day, bucket__date__lt=end_day)
+        .annotate(day=TruncDate("bucket"))
+        .values(key, "day")
+        .annotate(plays=Sum("plays"), completions=Sum("completions"), views=Sum("views"))
+    )
+    model = hourly_model._meta.get_field(target).related_model
+    sketches = UniqueSketch.objects.filter(
+        content_type=ContentType.objects.get_for_model(model), metric=UniqueSketch.Metric.LISTENERS,
+        day__gte=start_day, day__lt=end_day,
+    ).values_list("object_id", "day", "sketch")
+    listeners = {(object_id, day): HyperLogLog.from_bytes(data).count() for object_id, day, data in sketches}
+
+    daily = [
+        daily_model(
+            day=row["day"], plays=row["plays"], completions=row["completions"], views=row["views"],
+            unique_listeners=listeners.get((str(row[key]), row["day"]), 0), **{key: row[key]},
+        )
+        for row in rows
+    ]
+    daily_model.objects.bulk_create(
+        daily,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=[target, "day"],
+        update_fields=["plays", "completions", "views", "unique_listeners"],
+    )
+    return len(daily)
+
+
+@shared_task
+def rollup_daily_activity():
+    """
+    Nightly: fold closed days of hourly activity into per-episode and per-podcast daily rows
+    (see creator.py). Days since the last run, plus DAILY_REFOLD_DAYS, are rebuilt in place.
+    """
+    now = timezone.now()
+    today = timezone.localdate(now)
+    with transaction.atomic():
+        cursor = lock_cursor(DAILY_CURSOR, default=now - timedelta(days=DAILY_BACKFILL_DAYS))
+        start_day = timezone.localdate(cursor.position) - timedelta(days=DAILY_REFOLD_DAYS)
+        if start_day >= today:
+            return {"episodes": 0, "podcasts": 0}
+        written = {
+            "episodes": _fold_days(EpisodeHourlyActivity, EpisodeDailyActivity, "episode", start_day, today),
+            "podcasts": _fold_days(PodcastHourlyActivity, PodcastDailyActivity, "podcast", start_day, today),
+        }
+        cursor.position = now
+        cursor.save(update_fields=["position", "updated"])
+    return written
+
+
+@shared_task
+def refresh_retention_curves():
+    """
+    Fold PlayBack rows changed since the last run into the retention histograms (see
+    retention.py); like the hourly rollup, the window ends at rollups.settled().
+    """
+    end = settled()
+    with transaction.atomic():
+        cursor = lock_cursor(RETENTION_CURSOR, default=end - timedelta(days=HOURLY_BACKFILL_DAYS))
+        if cursor.position >= end:
+            return {"episodes": 0}
+        written = retention.fold(
+            PlayBack.objects.filter(last_played_at__gt=cursor.position, last_played_at__lte=end))
+        cursor.position = end
+        cursor.save(update_fields=["position", "updated"])
+    return {"episodes": written}
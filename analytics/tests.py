@@ -0,0 +1,125 @@
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from apps.analytics.creator import WEEK, activity_series
+from apps.analytics.hll import HyperLogLog
+from apps.analytics.buffers import view_object_id
+from apps.analytics.models import EpisodeHourlyActivity, EpisodeRetention, ObjectView, PodcastDailyActivity
+from apps.analytics import retention
+from apps.analytics.retention import bin_positions, curve_from_histogram
+from apps.analytics.tasks import rollup_hourly_activity
+from apps.posts.podcasts.models import Episode, PlayBack, Podcast
+
+
+class HyperLogLogTests(SimpleTestCase):
+    def test_estimate_within_error_bound(self):
+        for n in (50, 5_000, 100_000):
+            sketch = HyperLogLog().update(f"u{i}" for i in range(n))
+            self.assertLess(abs(sketch.count() - n) / n, 0.04)
+
+    def test_daily_sketches_merge_into_range_union(self):
+        monday = HyperLogLog().update(range(0, 30_000))
+        tuesday = HyperLogLog().update(range(20_000, 50_000))
+        restored = HyperLogLog.from_bytes(tuesday.to_bytes())
+
+        week = HyperLogLog.union([monday, restored])
+        self.assertLess(abs(week.count() - 50_000) / 50_000, 0.04)
+
+
+class ActivitySeriesTests(TestCase):
+    def test_weekly_series_sums_days_and_fills_gaps(self):
+        podcast = Podcast.objects.create(title="Podcast")
+        monday = date(2026, 10, 5)
+        for offset in (0, 1, 2, 14):
+            PodcastDailyActivity.objects.create(
+                podcast=podcast, day=monday + timedelta(days=offset), plays=10, completions=5, views=3
+            )
+
+        series = activity_series(podcast, monday, monday + timedelta(days=20), granularity=WEEK)
+
+        self.assertEqual([point["period"] for point in series],
+                         [monday, monday + timedelta(days=7), monday + timedelta(days=14)])
+        self.assertEqual([point["plays"] for point in series], [30, 0, 10])
+        self.assertEqual(series[0]["completion_rate"], 0.5)
+
+
+class HourlyRollupTests(TestCase):
+    def _totals(self, field=None):
+        rows = EpisodeHourlyActivity.objects.filter(episode=self.episode)
+        if field:
+            return sum(getattr(row, field) for row in rows)
+        return sum(row.plays for row in rows), sum(row.completions for row in rows)
+
+    @mock.patch("apps.analytics.rollups.SETTLE_SECONDS", 0)
+    def test_heartbeats_count_one_play_per_session(self):
+        self.episode = Episode.objects.create(podcast=Podcast.objects.create(title="Podcast"), title="Episode")
+        for seconds in (10, 20, 30):
+            PlayBack.objects.update_progress(None, self.episode.pk, "10.0.0.1", seconds=seconds)
+        rollup_hourly_activity()
+        self.assertEqual(self._totals(), (1, 0))
+
+        # the same session keeps beating across runs, then completes (twice)
+        PlayBack.objects.update_progress(None, self.episode.pk, "10.0.0.1", seconds=40)
+        PlayBack.objects.update_progress(None, self.episode.pk, "10.0.0.1", seconds=50, is_completed=True)
+        PlayBack.objects.update_progress(None, self.episode.pk, "10.0.0.1", seconds=50, is_completed=True)
+        rollup_hourly_activity()
+        self.assertEqual(self._totals(), (1, 1))
+
+    @mock.patch("apps.analytics.rollups.SETTLE_SECONDS", 0)
+    def test_unique_audiences_are_sketched_per_object(self):
+        self.episode = Episode.objects.create(podcast=Podcast.objects.create(title="Podcast"), title="Episode")
+        for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.2"):
+            PlayBack.objects.update_progress(None, self.episode.pk, ip, seconds=10)
+            ObjectView.objects.create(content_type=ContentType.objects.get_for_model(Episode),
+                                      object_id=view_object_id(self.episode), ip_address=ip)
+        rollup_hourly_activity()
+
+        self.assertEqual(self.episode.unique_listeners(), 2)
+        self.assertEqual(self.episode.podcast.unique_listeners(), 2)
+        self.assertEqual(self.episode.unique_viewers(), 2)
+
+    def test_views_flushed_after_a_run_are_still_counted(self):
+        self.episode = Episode.objects.create(podcast=Podcast.objects.create(title="Podcast"), title="Episode")
+        now = timezone.now()
+        rollup_hourly_activity()
+
+        # a buffered view from just before the run, written by a flush that came after it
+        ObjectView.objects.create(content_type=ContentType.objects.get_for_model(Episode),
+                                  object_id=view_object_id(self.episode), timestamp=now - timedelta(seconds=5))
+        with mock.patch("django.utils.timezone.now", return_value=now + timedelta(minutes=10)):
+            rollup_hourly_activity()
+        self.assertEqual(self._totals("views"), 1)
+
+
+class RetentionCurveTests(SimpleTestCase):
+    def test_stop_positions_bin_into_a_decreasing_curve(self):
+        buckets = bin_positions([0, 30, 45, 90, 10], [100, 100, 100, 100, 100],
+                                [False, False, False, False, True], buckets=10)
+        self.assertEqual(list(buckets), [0, 3, 4, 9, 9])
+
+        curve = curve_from_histogram(np.bincount(buckets, minlength=10))
+        self.assertEqual(curve[0], 1.0)
+        self.assertAlmostEqual(curve[4], 0.6)
+        self.assertAlmostEqual(curve[9], 0.4)
+
+
+class RetentionFoldTests(TestCase):
+    def test_changed_rows_move_between_slices(self):
+        episode = Episode.objects.create(podcast=Podcast.objects.create(title="Podcast"), title="Episode",
+                                         duration_seconds=100)
+        first = PlayBack.objects.create(ip_address="10.0.0.1", episode=episode, current_timestamp=30)
+        PlayBack.objects.create(ip_address="10.0.0.2", episode=episode, current_timestamp=50)
+        retention.fold(PlayBack.objects.all(), buckets=10)
+
+        PlayBack.objects.filter(pk=first.pk).update(current_timestamp=90)
+        # only the changed row is folded again
+        self.assertEqual(retention.fold(PlayBack.objects.filter(pk=first.pk), buckets=10), 1)
+
+        histogram = np.frombuffer(bytes(EpisodeRetention.objects.get(episode=episode).histogram), dtype="<u4")
+        self.assertEqual(histogram.nonzero()[0].tolist(), [5, 9])
+        self.assertEqual(int(histogram.sum()), 2)
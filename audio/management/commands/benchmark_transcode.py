@@ -0,0 +1,78 @@
+"""
+manage.py benchmark_transcode <master> [--runs N]
+
+Recorded run (2026-10-19, 1 vCPU, ffmpeg 7.0.2; 30 min stereo 192 kbps mp3 master; presets
+low 64k/22.05 kHz, medium 128k/44.1 kHz, high 192k/44.1 kHz; best of 3):
+
+    per-stage     113.5 CPU-s   115.0 s wall
+    single-pass   111.8 CPU-s   113.8 s wall   (-1.4%)
+
+Decoding this master costs 4.3 CPU-s; the encoders dominate. Each output rendered on its own:
+HLS/AAC 54.3, high 26.2, medium 22.6, low 15.4, ASR WAV 5.6, preview 0.5 CPU-s. The single
+pass saves one process and one read of the master per output rather than CPU; cheaper HLS
+and variant encodes are where the time is.
+"""
+import os
+import resource
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.media.audio.utils import allowed_variants, plan_transcode, render_asr_wav, render_preview, run_transcode
+from apps.media.utils import AUDIO_PRESETS, create_hls_audio, detect_master_audio_info, transcode_to_variant
+
+
+def _children_cpu_seconds():
+    # ffmpeg / ffprobe run as child processes
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def per_stage(master, workdir):
+    """What process_audio used to do: two probes and one full decode per output."""
+    detect_master_audio_info(master)
+    info = detect_master_audio_info(master)
+    for q in allowed_variants(info):
+        transcode_to_variant(master, os.path.join(workdir, f"variant_{q}.mp3"), AUDIO_PRESETS[q])
+    hls_dir = os.path.join(workdir, "hls")
+    os.makedirs(hls_dir, exist_ok=True)
+    create_hls_audio(master, hls_dir, AUDIO_PRESETS["medium"], segment_time=10)
+    render_preview(master, os.path.join(workdir, "preview.mp3"))
+    render_asr_wav(master, os.path.join(workdir, "master_for_asr.wav"))
+
+
+def single_pass(master, workdir):
+    """One probe, one decode (see plan_transcode)."""
+    info = detect_master_audio_info(master)
+    if not run_transcode(plan_transcode(master, info, workdir)):
+        # run_transcode unsets the outputs when the pass fails; don't time the failure
+        raise CommandError("single-pass transcode failed; see the log")
+
+
+class Command(BaseCommand):
+    help = "Compare ffmpeg CPU-seconds per episode: per-stage decodes vs the single-pass transcode plan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("master", help="Path to a local master audio file")
+        parser.add_argument("--runs", type=int, default=3)
+
+    def handle(self, *args, **options):
+        master, runs = options["master"], max(1, options["runs"])
+        results = {}
+        for label, pipeline in (("per-stage", per_stage), ("single-pass", single_pass)):
+            samples = []
+            for _ in range(runs):
+                workdir = tempfile.mkdtemp(prefix="transcode-bench-")
+                try:
+                    before = _children_cpu_seconds()
+                    pipeline(master, workdir)
+                    samples.append(_children_cpu_seconds() - before)
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+            results[label] = min(samples)
+            self.stdout.write(f"{label}: {results[label]:.2f} CPU-s (best of {runs})")
+
+        if results["single-pass"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"single-pass uses {results['per-stage'] / results['single-pass']:.1f}x less CPU"))
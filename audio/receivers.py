@@ -1,6 +1,7 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
+from apps.posts.podcasts.models import Episode
 from .models import Audio
 from .tasks import process_audio
 
@@ -9,3 +10,11 @@ from .tasks import process_audio
 def audio_post_save(sender, instance, created, **kwargs):
     if created and instance.master and not instance.processed:
         process_audio.delay(str(instance.id))
+
+
+@receiver(post_save, sender=Audio)
+@receiver(post_delete, sender=Audio)
+def refresh_episode_duration(sender, instance, **kwargs):
+    # covers process_audio writing the probed duration onto the master
+    if instance.master:
+        Episode.objects.filter(pk=instance.episode_id).refresh_durations()
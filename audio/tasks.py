@@ -13,7 +13,8 @@ from django.core.cache import cache
 from apps.media.audio.models import Audio
 from apps.media.storage import generate_cloudfront_signed_cookies
 from apps.media.utils import detect_master_audio_info
-from .utils import generate_hls_stream, generate_preview_clip, generate_variants, generate_transcription
+from .utils import generate_hls_stream, generate_preview_clip, generate_variants, generate_transcription, \
+    plan_transcode, run_transcode
 
 logger = logging.getLogger(__name__)
 
@@ -114,19 +115,32 @@ def process_audio(
         audio.sample_rate = info.get("sample_rate")
         audio.codec = info.get("codec")
         audio.duration = int(info.get("duration", 0))
+        # post_save copies the duration onto the episode and its podcast totals (see receivers)
         audio.save(update_fields=["name", "bitrate", "sample_rate", "codec", "duration"])
 
+        # decode the master once, rendering every requested output; the stages below only upload
+        # (or render their own output if the single pass failed)
+        plan = plan_transcode(
+            master_local, info, tmpdir,
+            variants=generate_variants_flag,
+            hls=generate_hls_flag,
+            preview=generate_preview_flag,
+            asr=generate_transcription_flag,
+        )
+        run_transcode(plan)
+
         # Variants
         if generate_variants_flag:
-            generate_variants(master_local, episode, storage_base)
+            generate_variants(master_local, episode, storage_base, info=info, rendered=plan.variants or None)
 
         if generate_hls_flag:
             # create hls stream (uploads to storage and returns HLSStream)
-            generate_hls_stream(master_local, episode, storage_base, preset_key="medium", segment_time=10)
+            generate_hls_stream(master_local, episode, storage_base, preset_key=plan.hls_preset,
+                                segment_time=plan.segment_time, hls_dir=plan.hls_dir)
 
         # Preview
         if generate_preview_flag:
-            generate_preview_clip(master_local, episode, storage_base)
+            generate_preview_clip(master_local, episode, storage_base, clip_path=plan.preview_path)
 
         # Transcription (optional)
         if generate_transcription_flag:
@@ -141,6 +155,8 @@ def process_audio(
                     storage_base=storage_base,
                     generate_chapters=generate_chapters_flag,
                     generate_summary=generate_summary_flag,
+                    wav_path=plan.asr_wav_path,
+                    duration=info.get("duration"),
                 )
             except Exception as e:
                 logger.exception("Transcription generation failed", exc_info=e)
@@ -5,7 +5,11 @@ import tempfile as _tempfile
 from types import SimpleNamespace
 from unittest import mock
 
-from django.test import TestCase
+import ffmpeg
+from django.test import SimpleTestCase, TestCase
+
+from apps.media.audio.utils import plan_transcode, run_transcode, transcode_graph
+from apps.media.utils import AUDIO_PRESETS
 
 # === UPDATE THIS to point at the module containing process_audio ===
 MODULE_PATH = "apps.media.audio.tasks"  # <-- <--- change this to your real module path
@@ -105,7 +109,8 @@ class ProcessAudioTests(TestCase):
                         mock.patch(f"{MODULE_PATH}.generate_variants", return_value=[]) as gen_var_mock, \
                         mock.patch(f"{MODULE_PATH}.generate_hls_stream", return_value=None) as gen_hls_mock, \
                         mock.patch(f"{MODULE_PATH}.generate_preview_clip", return_value=None) as gen_preview_mock, \
-                        mock.patch(f"{MODULE_PATH}.generate_transcription", return_value=None) as gen_trans_mock:
+                        mock.patch(f"{MODULE_PATH}.generate_transcription", return_value=None) as gen_trans_mock, \
+                        mock.patch(f"{MODULE_PATH}.run_transcode") as run_transcode_mock:
                     # Run and capture logs at ERROR level and above
                     logger_name = module.__name__
                     with self.assertLogs(logger_name, level="ERROR") as log_cm:
@@ -130,6 +135,14 @@ class ProcessAudioTests(TestCase):
                     self.assertEqual(len(log_cm.output), 0,
                                      f"Expected no ERROR-level logs on success, got: {log_cm.output}")
 
+                    # one probe and one decode of the master, shared by every stage
+                    detect_info_mock.assert_called_once()
+                    run_transcode_mock.assert_called_once()
+                    plan = run_transcode_mock.call_args.args[0]
+                    self.assertEqual(gen_var_mock.call_args.kwargs["rendered"], plan.variants)
+                    self.assertEqual(gen_preview_mock.call_args.kwargs["clip_path"], plan.preview_path)
+                    self.assertEqual(gen_trans_mock.call_args.kwargs["wav_path"], plan.asr_wav_path)
+
     def test_process_audio_transcription_raises_is_logged_but_processing_continues(self):
         module = self.module
         created_tmpdirs = []
@@ -154,6 +167,7 @@ class ProcessAudioTests(TestCase):
                         mock.patch(f"{MODULE_PATH}.generate_variants", return_value=[]), \
                         mock.patch(f"{MODULE_PATH}.generate_hls_stream", return_value=None), \
                         mock.patch(f"{MODULE_PATH}.generate_preview_clip", return_value=None), \
+                        mock.patch(f"{MODULE_PATH}.run_transcode"), \
                         mock.patch(f"{MODULE_PATH}.generate_transcription",
                                    side_effect=RuntimeError("ASR provider crashed")):
                     # Because process_audio calls logger.exception on transcription failure,
@@ -204,3 +218,35 @@ class ProcessAudioTests(TestCase):
                                 "Expected tempfile to be created even for missing audio case")
                 for p in created_tmpdirs:
                     self.assertFalse(os.path.exists(p), f"Tempdir {p!r} should be removed even when audio missing")
+
+
+class TranscodePlanTests(SimpleTestCase):
+    def test_every_output_comes_from_one_decode(self):
+        info = {"bitrate_kbps": AUDIO_PRESETS["high"]["kbps"]}
+        plan = plan_transcode("/tmp/job/master", info, "/tmp/job")
+        args = transcode_graph(plan).compile()
+
+        self.assertEqual(args.count("-i"), 1)
+        self.assertEqual(list(plan.variants), ["low", "medium", "high"])
+        # three variants, the HLS rendition, the preview and the ASR wav
+        self.assertIn("asplit=6", args[args.index("-filter_complex") + 1])
+        for path in [*plan.variants.values(), plan.preview_path, plan.asr_wav_path]:
+            self.assertIn(path, args)
+
+    def test_skipped_stages_are_not_rendered(self):
+        plan = plan_transcode("/tmp/job/master", {"bitrate_kbps": 0}, "/tmp/job", hls=False, asr=False)
+        self.assertEqual(list(plan.variants), ["low"])
+        self.assertIsNone(plan.hls_dir)
+        self.assertIsNone(plan.asr_wav_path)
+        self.assertFalse(plan_transcode("/tmp/job/master", {}, "/tmp/job", variants=False, hls=False,
+                                        preview=False, asr=False))
+
+    def test_failed_single_pass_leaves_each_stage_to_render_its_own(self):
+        plan = plan_transcode("/tmp/job/master", {"bitrate_kbps": 0}, "/tmp/job", hls=False)
+        graph = mock.Mock()
+        graph.run.side_effect = ffmpeg.Error("ffmpeg", b"", b"master_for_asr.wav: Invalid argument")
+        with mock.patch("apps.media.audio.utils.transcode_graph", return_value=graph):
+            self.assertIs(run_transcode(plan), plan)
+        self.assertFalse(plan)
+        self.assertEqual(plan.variants, {})
+        self.assertIsNone(plan.asr_wav_path)
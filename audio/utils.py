@@ -3,6 +3,7 @@ import logging
 import shutil
 import tempfile
 import time
+from dataclasses import dataclass, field
 from typing import List
 
 import ffmpeg
@@ -25,6 +26,10 @@ from ...posts.podcasts.models import Summary
 
 logger = logging.getLogger(__name__)
 
+PREVIEW_SECONDS = 30
+PREVIEW_OUTPUT = {"acodec": "libmp3lame", "audio_bitrate": "64k", "ar": 22050, "ac": 2}
+ASR_WAV_OUTPUT = {"ac": 1, "ar": "16000", "format": "wav", "acodec": "pcm_s16le"}
+
 
 def _safe_storage_key(base: str, *parts: str) -> str:
     """
@@ -35,33 +40,145 @@ def _safe_storage_key(base: str, *parts: str) -> str:
     return "/".join([base, *safe_parts])
 
 
-def generate_variants(master_local_path: str, episode, storage_base: str) -> List[Audio]:
+def allowed_variants(info: dict) -> List[str]:
+    """Variant qualities worth producing for a master probed as `info` (never upscale the bitrate)."""
+    master_bitrate = info.get("bitrate_kbps") or 0
+    if master_bitrate >= AUDIO_PRESETS["high"]["kbps"]:
+        return ["low", "medium", "high"]
+    if master_bitrate >= AUDIO_PRESETS["medium"]["kbps"]:
+        return ["low", "medium"]
+    return ["low"]
+
+
+def render_preview(master_local_path: str, out_local: str, window_seconds: int = PREVIEW_SECONDS):
+    (
+        ffmpeg
+        .input(master_local_path, ss=0, t=window_seconds)
+        .output(out_local, **PREVIEW_OUTPUT)
+        .overwrite_output()
+        .run(quiet=True)
+    )
+
+
+def render_asr_wav(master_local_path: str, out_local: str):
+    ffmpeg.input(master_local_path).output(out_local, **ASR_WAV_OUTPUT).overwrite_output().run(quiet=True)
+
+
+@dataclass
+class TranscodePlan:
+    """
+    Local outputs rendered from one master: mp3 variants (quality -> path), an HLS rendition,
+    the preview clip and the 16 kHz WAV for ASR. Unset outputs are skipped.
+    """
+    master_path: str
+    variants: dict = field(default_factory=dict)
+    hls_dir: str | None = None
+    hls_preset: str = "medium"
+    segment_time: int = 10
+    preview_path: str | None = None
+    preview_seconds: int = PREVIEW_SECONDS
+    asr_wav_path: str | None = None
+
+    def __bool__(self):
+        return bool(self.variants or self.hls_dir or self.preview_path or self.asr_wav_path)
+
+
+def plan_transcode(master_local_path: str, info: dict, workdir: str, *, variants=True, hls=True, preview=True,
+                   asr=True, hls_preset: str = "medium", segment_time: int = 10) -> TranscodePlan:
+    """Decide what to render from the master (`info` is its probe) into `workdir`."""
+    plan = TranscodePlan(master_local_path, hls_preset=hls_preset, segment_time=segment_time)
+    if variants:
+        plan.variants = {q: os.path.join(workdir, f"variant_{q}.mp3") for q in allowed_variants(info)}
+    if hls:
+        if hls_preset not in AUDIO_PRESETS:
+            raise ValueError(f"unknown preset {hls_preset}")
+        plan.hls_dir = os.path.join(workdir, "hls")
+    if preview:
+        plan.preview_path = os.path.join(workdir, "preview.mp3")
+    if asr:
+        plan.asr_wav_path = os.path.join(workdir, "master_for_asr.wav")
+    return plan
+
+
+def transcode_graph(plan: TranscodePlan):
+    """
+    One ffmpeg invocation for the whole plan: the master is decoded once and `asplit` feeds
+    every encoder, instead of one full decode per output.
+    """
+    outputs = []  # (path, output kwargs, trim seconds)
+    for q, path in plan.variants.items():
+        preset = AUDIO_PRESETS[q]
+        outputs.append((path, {"acodec": "libmp3lame", "audio_bitrate": f"{preset['kbps']}k",
+                               "ar": preset["sample_rate"]}, None))
+    if plan.hls_dir:
+        preset = AUDIO_PRESETS[plan.hls_preset]
+        outputs.append((os.path.join(plan.hls_dir, "index.m3u8"), {
+            "format": "hls", "hls_time": plan.segment_time, "hls_playlist_type": "vod",
+            "hls_segment_filename": os.path.join(plan.hls_dir, "segment_%05d.ts"),
+            "acodec": "aac", "audio_bitrate": f"{preset['kbps']}k", "ar": preset["sample_rate"],
+        }, None))
+    if plan.preview_path:
+        outputs.append((plan.preview_path, PREVIEW_OUTPUT, plan.preview_seconds))
+    if plan.asr_wav_path:
+        outputs.append((plan.asr_wav_path, ASR_WAV_OUTPUT, None))
+
+    branches = ffmpeg.input(plan.master_path).audio.filter_multi_output("asplit", len(outputs))
+    streams = []
+    for i, (path, kwargs, trim) in enumerate(outputs):
+        branch = branches.stream(i)
+        if trim:
+            branch = branch.filter("atrim", duration=trim).filter("asetpts", "PTS-STARTPTS")
+        streams.append(branch.output(path, **kwargs))
+    return ffmpeg.merge_outputs(*streams).overwrite_output()
+
+
+def run_transcode(plan: TranscodePlan) -> TranscodePlan:
+    """
+    Render every output of `plan` in a single decode pass of the master.
+    One failing output fails the whole pass: the plan's outputs are then unset, so each stage
+    renders its own and fails on its own (a bad ASR WAV costs only the transcription).
+    """
+    if not plan:
+        return plan
+    if plan.hls_dir:
+        os.makedirs(plan.hls_dir, exist_ok=True)
+    try:
+        transcode_graph(plan).run(quiet=True)
+    except ffmpeg.Error:
+        logger.warning("single-pass transcode failed for %s; falling back to per-stage renders",
+                       plan.master_path, exc_info=True)
+        plan.variants, plan.hls_dir, plan.preview_path, plan.asr_wav_path = {}, None, None, None
+    return plan
+
+
+def generate_variants(master_local_path: str, episode, storage_base: str, info: dict | None = None,
+                      rendered: dict | None = None) -> List[Audio]:
     """
     Create low/medium/high mp3 variants from master and persist them as Audio rows.
+    `info` is the master's probe (probed here if omitted); `rendered` maps quality -> local mp3
+    already produced by run_transcode(), otherwise each variant is transcoded here.
     Returns the list of Audio variants created/updated.
     """
-    # probe to get bitrate (to decide which variants to produce)
-    info = detect_master_audio_info(master_local_path)
-    master_bitrate = info.get("bitrate_kbps") or 0
-
-    if master_bitrate >= AUDIO_PRESETS["high"]["kbps"]:
-        allowed = ["low", "medium", "high"]
-    elif master_bitrate >= AUDIO_PRESETS["medium"]["kbps"]:
-        allowed = ["low", "medium"]
+    if rendered is None:
+        # probe to get bitrate (to decide which variants to produce)
+        allowed = allowed_variants(info or detect_master_audio_info(master_local_path))
     else:
-        allowed = ["low"]
+        allowed = list(rendered)
 
     created_variants = []
     tmpdir = tempfile.mkdtemp(prefix="variants-")
     try:
         for q in allowed:
             preset = AUDIO_PRESETS[q]
-            out_local = os.path.join(tmpdir, f"variant_{q}.mp3")
-            try:
-                transcode_to_variant(master_local_path, out_local, preset)
-            except Exception:
-                logger.exception("transcode_to_variant failed for episode=%s quality=%s", episode.pk, q)
-                raise
+            if rendered is not None:
+                out_local = rendered[q]
+            else:
+                out_local = os.path.join(tmpdir, f"variant_{q}.mp3")
+                try:
+                    transcode_to_variant(master_local_path, out_local, preset)
+                except Exception:
+                    logger.exception("transcode_to_variant failed for episode=%s quality=%s", episode.pk, q)
+                    raise
 
             size = os.path.getsize(out_local)
             filename = f"episodes/{storage_base}/variants/{q}.mp3"  # key in storage
@@ -102,22 +219,24 @@ def generate_variants(master_local_path: str, episode, storage_base: str) -> Lis
     return created_variants
 
 
-def generate_hls_stream(master_local_path: str, episode, storage_base: str, preset_key: str = "medium", segment_time: int = 10) -> Audio:
+def generate_hls_stream(master_local_path: str, episode, storage_base: str, preset_key: str = "medium", segment_time: int = 10,
+                        hls_dir: str | None = None) -> Audio:
     """
     Create HLS (audio-only) locally then upload playlist + segments to storage.
+    `hls_dir` holds a rendition already produced by run_transcode(); otherwise it is created here.
     Creates or updates an HLSStream DB row and returns it.
     """
     tmpdir = tempfile.mkdtemp(prefix="hls-")
     try:
-        hls_dir = os.path.join(tmpdir, "hls")
-        os.makedirs(hls_dir, exist_ok=True)
-
         preset = AUDIO_PRESETS.get(preset_key)
         if preset is None:
             raise ValueError(f"unknown preset {preset_key}")
 
-        # create HLS files locally (index.m3u8 + segments)
-        create_hls_audio(master_local_path, hls_dir, preset, segment_time=segment_time)
+        if hls_dir is None:
+            hls_dir = os.path.join(tmpdir, "hls")
+            os.makedirs(hls_dir, exist_ok=True)
+            # create HLS files locally (index.m3u8 + segments)
+            create_hls_audio(master_local_path, hls_dir, preset, segment_time=segment_time)
 
         # upload all files under a stable prefix
         prefix = f"episodes/hls/{storage_base}/{preset_key}"
@@ -170,22 +289,20 @@ def generate_hls_stream(master_local_path: str, episode, storage_base: str, pres
         shutil.rmtree(tmpdir, ignore_errors=True)
 
 
-def generate_preview_clip(master_local_path: str, episode, storage_base: str, window_seconds: int = 30):
+def generate_preview_clip(master_local_path: str, episode, storage_base: str, window_seconds: int = PREVIEW_SECONDS,
+                          clip_path: str | None = None):
     """
     Simplified preview generator: takes the first non-silent window or start=0 fallback.
+    `clip_path` is a clip already produced by run_transcode(); otherwise it is cut here.
     Saves an Audio row with quality 'preview' and returns it.
     """
     tmpdir = tempfile.mkdtemp(prefix="preview-")
     try:
-        # simple approach: start at 0 (you can replace with VAD or loudness detection)
-        out_local = os.path.join(tmpdir, "preview.mp3")
-        (
-            ffmpeg
-            .input(master_local_path, ss=0, t=window_seconds)
-            .output(out_local, acodec="libmp3lame", audio_bitrate="64k", ar=22050, ac=2)
-            .overwrite_output()
-            .run(quiet=True)
-        )
+        out_local = clip_path
+        if out_local is None:
+            # simple approach: start at 0 (you can replace with VAD or loudness detection)
+            out_local = os.path.join(tmpdir, "preview.mp3")
+            render_preview(master_local_path, out_local, window_seconds)
 
         filename = f"episodes/{storage_base}/preview/preview.mp3"
         preview, _ = Audio.objects.update_or_create(
@@ -219,19 +336,23 @@ def generate_transcription(
         provider_options,
         generate_chapters,
         generate_summary,
+        wav_path=None,
+        duration=None,
 ):
+    """`wav_path` / `duration`: the ASR WAV from run_transcode() and the master's probed duration, if known."""
     provider_options = provider_options or {}
     start_time = time.monotonic()
-    # convert to wav for ASR
-    wav_path = os.path.join(tmpdir, "master_for_asr.wav")
-    ffmpeg.input(master_local).output(wav_path, ac=1, ar="16000", format="wav",
-                                      acodec="pcm_s16le").overwrite_output().run(quiet=True)
+    if wav_path is None:
+        # convert to wav for ASR
+        wav_path = os.path.join(tmpdir, "master_for_asr.wav")
+        render_asr_wav(master_local, wav_path)
 
-    try:
-        probe = ffmpeg.probe(wav_path)
-        duration = float(probe["format"].get("duration", 0))
-    except Exception:
-        duration = 0.0
+    if duration is None:
+        try:
+            probe = ffmpeg.probe(wav_path)
+            duration = float(probe["format"].get("duration", 0))
+        except Exception:
+            duration = 0.0
     AUDIO_DURATION_SECONDS.observe(duration)
 
     # optional quota check
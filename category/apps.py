@@ -10,3 +10,6 @@ class CategoryConfig(AppConfig):
 
     namespace = "category"
 
+    def ready(self):
+        from apps.category import receivers # noqa
+
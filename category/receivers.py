@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.category.registry import SOURCES, registry
+
+
+def invalidate_reference_registry(sender, **kwargs):
+    registry.invalidate()
+
+
+for label, _ in SOURCES.values():
+    # lazy "app_label.Model" senders: the models live in several apps
+    receiver(post_save, sender=label, dispatch_uid=f"registry:save:{label}")(invalidate_reference_registry)
+    receiver(post_delete, sender=label, dispatch_uid=f"registry:delete:{label}")(invalidate_reference_registry)
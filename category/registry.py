@@ -0,0 +1,135 @@
+"""
+Read-only, in-process registry of reference data.
+
+Categories (with their tier Plan), Plans, Features, Regions, Countries, Leagues and Teams
+are small and change rarely, but are read on hot paths (access checks, recommendation
+scoring, hubs). Each worker keeps one immutable snapshot of them, indexed by id and slug,
+loaded on first use. Saves and deletes (receivers.py) replace a single version key in the
+cache; workers compare it at most every REFERENCE_REGISTRY_CHECK_SECONDS and reload only
+when it moved. Instances in the registry are shared: treat them as read-only.
+"""
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = "reference:version"
+CHECK_SECONDS = getattr(settings, "REFERENCE_REGISTRY_CHECK_SECONDS", 5)
+
+# name -> (model label, select_related)
+SOURCES = {
+    "categories": ("category.Category", ("tier",)),
+    "plans": ("memberships.Plan", ()),
+    "features": ("memberships.Feature", ()),
+    "regions": ("region.Region", ()),
+    "countries": ("region.Country", ()),
+    "leagues": ("leagues.League", ()),
+    "teams": ("clubs.Team", ()),
+}
+
+
+@dataclass(frozen=True)
+class Table:
+    by_id: MappingProxyType
+    by_slug: MappingProxyType
+
+    @classmethod
+    def load(cls, model, select_related=()):
+        queryset = model._default_manager.all()
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        rows = list(queryset)
+        by_slug = {str(row.slug): row for row in rows if getattr(row, "slug", None)}
+        return cls(MappingProxyType({row.pk: row for row in rows}), MappingProxyType(by_slug))
+
+    def get(self, pk, default=None):
+        return self.by_id.get(pk, default)
+
+    def get_by_slug(self, slug, default=None):
+        return self.by_slug.get(slug, default)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __len__(self):
+        return len(self.by_id)
+
+
+class ReferenceRegistry:
+
+    def __init__(self, sources=SOURCES, check_seconds=CHECK_SECONDS):
+        self.sources = sources
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def _remote_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # first worker up (or the key was evicted): start a version everyone agrees on
+            cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_seconds:
+            return
+        version = self._remote_version()
+        with self._lock:
+            self._checked_at = now
+            if version != self._version:
+                # tables reload lazily, each on its next use
+                self._tables, self._version = {}, version
+
+    def table(self, name) -> Table:
+        self._sync()
+        tables = self._tables
+        if name not in tables:
+            label, select_related = self.sources[name]
+            table = Table.load(apps.get_model(label), select_related)
+            with self._lock:
+                # publish a new dict: readers holding the old one never see it change
+                self._tables = {**self._tables, name: table}
+            return table
+        return tables[name]
+
+    @property
+    def version(self):
+        """The shared reference-data version this worker is on; moves on every save or delete."""
+        self._sync()
+        if self._version is None:
+            with self._lock:
+                self._version, self._checked_at = self._remote_version(), time.monotonic()
+        return self._version
+
+    def get(self, name, pk):
+        """Row `pk` of table `name`. A miss reloads that table once: the row may be newer than this copy."""
+        row = self.table(name).get(pk)
+        if row is None:
+            with self._lock:
+                self._tables = {key: table for key, table in self._tables.items() if key != name}
+            row = self.table(name).get(pk)
+        return row
+
+    def __getattr__(self, name):
+        # registry.categories, registry.plans, ...
+        if name in self.__dict__.get("sources", ()):
+            return self.table(name)
+        raise AttributeError(name)
+
+    def invalidate(self):
+        """Move the shared version (every worker reloads) and drop this worker's copy now."""
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        with self._lock:
+            self._tables, self._version, self._checked_at = {}, None, 0.0
+
+
+registry = ReferenceRegistry()
@@ -1,30 +1,28 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
 from django.db import models
 from django.utils import timezone
 
-from .models import Entitlement, Subscription
+from .models import Entitlement
+from .snapshot import CATALOGUE_GEN_KEY, EMPTY, get_snapshot, get_user_highest_active_subscription  # noqa: F401
 
-# Try to get a raw Redis connection via django-redis if available for set ops.
-try:
-    from django_redis import get_redis_connection
+# upper bound: results also expire at the next availability boundary (see _ttl)
+CACHE_TTL_SECONDS = getattr(settings, "ACCESS_CACHE_TTL_SECONDS", 60 * 60)
 
-    _have_redis = True
-except Exception:
-    _have_redis = False
 
-CACHE_TTL_SECONDS = getattr(settings, "ACCESS_CACHE_TTL_SECONDS", 30)
-USER_CACHE_SET_PREFIX = getattr(settings, "USER_ACCESS_KEY_SET_PREFIX", "user_access_keys")  # redis set name prefix
+def get_user_plans(user, snapshot=None):
+    """The plans a user holds (PlanGrants): active subscription plan first, then plan-targeted entitlements."""
+    return list((snapshot or get_snapshot(user)).plans)
 
 
-def get_user_highest_active_subscription(user):
-    # if not user or not getattr(user, "is_authenticated", False):
-    #     return None
-    # uses SubscriptionManager.active_for_user
-    return (Subscription.objects.active_for_user(user).
-            select_related("membership__plan").
-            order_by('-membership__plan__tier').first())
+def entitled_object_ids(user, model, snapshot=None):
+    """Object ids (as stored, strings) of `model` instances the user holds an active entitlement to."""
+    return (snapshot or get_snapshot(user)).entitled_ids(model)
 
 
 def has_entitlement(user, content_obj):
@@ -52,167 +50,167 @@ class AccessService:
     def __init__(self, cache_backend=cache, ttl=CACHE_TTL_SECONDS):
         self.cache = cache_backend
         self.ttl = ttl
-        # redis connection if available
-        self._redis = get_redis_connection("default") if _have_redis else None
 
-    # canonical cache key pattern: access:user:<pk|anon>:<app_label.model>:<obj_pk>
+    # Cached results are keyed by a generation number for the plan catalogue, per user and
+    # per object:
+    #   access:c<catalogue gen>:user:<pk|anon>:g<user gen>:<app_label.model>:<obj_pk>:g<obj gen>
+    # Invalidation bumps a generation (one INCR); entries under the old number are never
+    # read again and simply expire, so no per-user key sets are kept.
     @staticmethod
-    def _cache_key(user, obj):
-        user_key = f"user:{user.pk}" if (user and getattr(user, "is_authenticated", False)) else "user:anon"
-        return f"access:{user_key}:{obj._meta.label_lower}:{obj.pk}"
+    def _user_token(user):
+        return f"user:{user.pk}" if (user and getattr(user, "is_authenticated", False)) else "user:anon"
+
+    @classmethod
+    def _user_gen_key(cls, user):
+        return f"access:gen:{cls._user_token(user)}"
 
     @staticmethod
-    def _user_set_key(user):
-        return f"{USER_CACHE_SET_PREFIX}:{user.pk}"
-
-    def _register_cache_key_for_user(self, user, key):
-        if not user or not getattr(user, "is_authenticated", False):
-            # do not register anon keys
-            return
-        if self._redis:
-            try:
-                self._redis.sadd(self._user_set_key(user), key)
-            except Exception:
-                pass
-        else:
-            # Fallback: keep a small list in Django cache (less ideal, but works)
-            list_key = f"{self._user_set_key(user)}:list"
-            existing = self.cache.get(list_key) or []
-            if key not in existing:
-                existing.append(key)
-                # keep for a short time longer than entries TTL
-                self.cache.set(list_key, existing, timeout=self.ttl * 3)
-
-    def _get_keys_for_user(self, user):
-        if not user or not getattr(user, "is_authenticated", False):
-            return []
-        if self._redis:
-            try:
-                keys = self._redis.smembers(self._user_set_key(user))
-                # smembers returns bytes -> decode to str
-                return [k.decode() if isinstance(k, bytes) else k for k in keys]
-            except Exception:
-                return []
-        else:
-            list_key = f"{self._user_set_key(user)}:list"
-            return self.cache.get(list_key) or []
-
-    def _clear_keys_for_user(self, user):
-        keys = self._get_keys_for_user(user)
-        for k in keys:
-            try:
-                self.cache.delete(k)
-            except Exception:
-                pass
-        # also delete the index (set/list)
-        if self._redis:
-            try:
-                self._redis.delete(self._user_set_key(user))
-            except Exception:
-                pass
-        else:
-            list_key = f"{self._user_set_key(user)}:list"
-            self.cache.delete(list_key)
+    def _obj_gen_key(label, pk):
+        return f"access:gen:obj:{label}:{pk}"
+
+    def _generations(self, gen_keys):
+        """{gen_key: generation}; missing generations are started from the clock, never from 0,
+        so one evicted from the cache can't bring back results cached under its old numbers."""
+        gens = self.cache.get_many(gen_keys)
+        start = time.time_ns() // 1000
+        for key in gen_keys:
+            if key not in gens:
+                # add() so that concurrent starters agree on one number
+                gens[key] = start if self.cache.add(key, start, timeout=None) else self.cache.get(key, start)
+        return gens
+
+    def _bump(self, gen_key):
+        try:
+            self.cache.incr(gen_key)
+        except ValueError:
+            # not started yet (or evicted): anything cached under it predates this number
+            self.cache.set(gen_key, time.time_ns() // 1000, timeout=None)
+
+    def _cache_keys(self, user, objs):
+        """{cache key: obj}, reading the catalogue's, user's and objects' generations in one get_many."""
+        user_gen_key = self._user_gen_key(user)
+        obj_gen_keys = [self._obj_gen_key(obj._meta.label_lower, obj.pk) for obj in objs]
+        gens = self._generations([CATALOGUE_GEN_KEY, user_gen_key, *dict.fromkeys(obj_gen_keys)])
+        prefix = f"access:c{gens[CATALOGUE_GEN_KEY]}:{self._user_token(user)}:g{gens[user_gen_key]}"
+        return {
+            f"{prefix}:{obj._meta.label_lower}:{obj.pk}:g{gens[gen_key]}": obj
+            for obj, gen_key in zip(objs, obj_gen_keys)
+        }
+
+    def _cache_key(self, user, obj):
+        return next(iter(self._cache_keys(user, [obj])))
+
+    def _ttl(self, obj, snapshot, now):
+        """
+        Seconds a result for `obj` stays valid: until the next moment its availability can
+        flip for the user's plans (release / early-access windows) or an entitlement lapses,
+        capped at self.ttl. Anything else that changes it bumps a generation.
+        """
+        deadline = now + timedelta(seconds=self.ttl)
+        if snapshot.expires_at:
+            deadline = min(deadline, snapshot.expires_at)
+        if hasattr(obj, "next_access_boundary"):
+            boundary = obj.next_access_boundary(snapshot.plans, now)
+            if boundary:
+                deadline = min(deadline, boundary)
+        return max(1, int((deadline - now).total_seconds()))
 
     # Public API
-    def has_access(self, user, obj):
+    # `snapshot`: the user's EntitlementSnapshot when the caller has it (request.entitlements)
+    def has_access(self, user, obj, snapshot=None):
         key = self._cache_key(user, obj)
         val = self.cache.get(key)
         if val is not None:
             return bool(val)
 
-        result = self._compute_has_access(user, obj)
-        # register and set cache
+        now = timezone.now()
+        snapshot = self._access_context(user, snapshot)
+        result = self._evaluate(user, obj, snapshot, now)
         # store boolean (1/0)
-        self.cache.set(key, bool(result), timeout=self.ttl)
-        # register key for user so we can invalidate later
-        try:
-            self._register_cache_key_for_user(user, key)
-        except Exception:
-            pass
+        self.cache.set(key, bool(result), timeout=self._ttl(obj, snapshot, now))
         return result
 
+    def has_access_many(self, user, objs, snapshot=None):
+        """
+        Bulk has_access: {obj.pk: bool} for `objs`. Generations and cache hits come from one
+        get_many each; misses are evaluated in memory against the user's entitlement snapshot
+        and the objects' denormalized access requirements (Episode.required_tier, tier_ids,
+        early_available_at), then written back with one set_many per distinct TTL.
+        """
+        keys = self._cache_keys(user, list(objs))
+        cached = self.cache.get_many(list(keys))
+        results = {obj.pk: bool(cached[key]) for key, obj in keys.items() if key in cached}
+        misses = {key: obj for key, obj in keys.items() if key not in cached}
+        if not misses:
+            return results
+
+        now = timezone.now()
+        snapshot = self._access_context(user, snapshot)
+        by_ttl = defaultdict(dict)
+        for key, obj in misses.items():
+            result = self._evaluate(user, obj, snapshot, now)
+            by_ttl[self._ttl(obj, snapshot, now)][key] = result
+            results[obj.pk] = result
+        for ttl, entries in by_ttl.items():
+            self.cache.set_many(entries, timeout=ttl)
+        return results
+
     def invalidate_user_cache(self, user):
-        """Clear all cached access results for a given user (use in signals)."""
-        self._clear_keys_for_user(user)
+        """Drop all cached access results for a given user (use in signals): one INCR."""
+        self._bump(self._user_gen_key(user))
+
+    def invalidate_object(self, obj):
+        """Drop every user's cached result for `obj` (catalogue changes): one INCR."""
+        self.invalidate_objects(type(obj), [obj.pk])
+
+    def invalidate_objects(self, model, pks):
+        label = model._meta.label_lower
+        for pk in pks:
+            self._bump(self._obj_gen_key(label, pk))
+
+    def invalidate_catalogue(self):
+        """Drop every cached result and snapshot (a Plan or Feature changed): one INCR."""
+        self._bump(CATALOGUE_GEN_KEY)
 
-    # You can expose more fine-grained invalidation if needed
     def invalidate_user_obj(self, user, obj):
-        key = self._cache_key(user, obj)
-        self.cache.delete(key)
-        # Also remove it from the user's key set
-        if self._redis:
-            try:
-                self._redis.srem(self._user_set_key(user), key)
-            except Exception:
-                pass
-        else:
-            list_key = f"{self._user_set_key(user)}:list"
-            existing = self.cache.get(list_key) or []
-            if key in existing:
-                existing.remove(key)
-                self.cache.set(list_key, existing, timeout=self.ttl * 3)
+        self.cache.delete(self._cache_key(user, obj))
 
     # -------------------------
     # Core access evaluation
     # -------------------------
     @staticmethod
-    def _compute_has_access(user, obj):
+    def _access_context(user, snapshot=None):
+        """Everything about the user that access checks need: their EntitlementSnapshot."""
+        if getattr(user, "is_staff", False) or getattr(user, "is_superuser", False):
+            # admin bypass: nothing to load
+            return EMPTY
+        return snapshot or get_snapshot(user)
+
+    @staticmethod
+    def _evaluate(user, obj, snapshot, now):
         """
-        Implement the same ordered checks we designed earlier:
+        The ordered checks, against the user's EntitlementSnapshot:
           1. admin bypass
           2. Episode.availability for public/non-exclusive
           3. subscription plan fast-path (Episode.available_for(plan=...))
           4. plan-targeted entitlements -> treat as virtual plan
           5. object-level entitlements
-          6. category -> plan fallback
         """
-        now = timezone.now()
-
-        # Avoid circular imports at module top
-        from .models import Plan, Entitlement
-
         # 1. admin bypass
         if user and (getattr(user, "is_staff", False) or getattr(user, "is_superuser", False)):
             return True
 
         # 2. quick Episode public check
-        # if isinstance(obj, Episode):
-            # Episode.available_for(plan=None) returns True for public accessible episodes
         if obj.available_for(plan=None, now=now):
             return True
 
-        # 3. subscription fast-path
-        sub = get_user_highest_active_subscription(user)
-        plan = None
-        if sub:
-            plan = sub.membership.plan
-            # if isinstance(obj, Episode):
-            if obj.available_for(plan=plan, now=now):
-                return True
-            # else:
-            #     if plan.grants(*features):
-            #         return True
-
-        # 4. plan-targeted entitlements
-        plan_ct = ContentType.objects.get_for_model(Plan)
-        plan_ent_qs = Entitlement.objects.filter(
-            user=user, content_type=plan_ct, revoked=False
-        ).filter(models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=now))
-
-        for ent in plan_ent_qs.select_related("content_type"):
-            p = ent.content_object
-            if not p:
-                continue
-            #if isinstance(obj, Episode):
-            if obj.available_for(plan=p, now=now):
-                return True
-            # else:
-            #     if p.grants(*features):
-            #         return True
+        # 3./4. subscription plan, then plans granted by entitlements
+        if any(obj.available_for(plan=plan, now=now) for plan in snapshot.plans):
+            return True
 
         # 5. object-level entitlement
-        obj_ct = ContentType.objects.get_for_model(type(obj))
-        if has_entitlement(user, obj_ct):
-            return True
-        return False
+        return snapshot.is_entitled_to(obj)
+
+    @classmethod
+    def _compute_has_access(cls, user, obj, snapshot=None):
+        return cls._evaluate(user, obj, cls._access_context(user, snapshot), timezone.now())
@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from .snapshot import snapshot_for_request
+
+
+class EntitlementSnapshotMiddleware:
+    """Expose the user's entitlement snapshot as `request.entitlements` (resolved on first use)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.entitlements = SimpleLazyObject(lambda: snapshot_for_request(request))
+        return self.get_response(request)
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .access import AccessService
+from .models import Entitlement, Feature, Plan, Subscription
+from .snapshot import invalidate_snapshot
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_save, sender=Entitlement)
+@receiver(post_delete, sender=Entitlement)
+def invalidate_entitlement_snapshot_receiver(sender, instance, **kwargs):
+    user = getattr(instance, "user", None)
+    if not user:
+        return
+    invalidate_snapshot(user.pk)
+    # cached access results were computed from the old snapshot
+    AccessService.get_instance().invalidate_user_cache(user)
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+@receiver(post_save, sender=Feature)
+@receiver(post_delete, sender=Feature)
+def invalidate_catalogue_receiver(sender, instance, **kwargs):
+    # tiers and features are baked into every snapshot and cached result
+    AccessService.get_instance().invalidate_catalogue()
@@ -0,0 +1,200 @@
+"""
+Per-user entitlement snapshot.
+
+Everything access and download checks need to know about a user, in one small picklable
+object: the active subscription and its plan tier, every plan the user holds (subscription
+first, then plan-targeted entitlements) reduced to the facts available_for() reads, and the
+(content_type_id, object_id) pairs of object entitlements. Built in two queries: plans come
+from the reference registry and their features are read once per plan per reference-data
+version (plan_grant), not once per snapshot. Cached across requests until a Subscription or
+Entitlement of the user changes, a Plan or Feature changes (receivers.py) or the earliest
+entitlement expires, and memoized on the request (middleware.EntitlementSnapshotMiddleware).
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+
+from apps.category.registry import registry
+from .models import Entitlement, Feature, Plan, Subscription
+
+SNAPSHOT_TTL_SECONDS = getattr(settings, "ACCESS_SNAPSHOT_TTL_SECONDS", 60 * 15)
+# bumped on every Plan or Feature save/delete (receivers.py); snapshots and cached access
+# results built under another generation are never read again
+CATALOGUE_GEN_KEY = "access:gen:catalogue"
+
+
+def get_user_highest_active_subscription(user):
+    # uses SubscriptionManager.active_for_user
+    return (Subscription.objects.active_for_user(user).
+            select_related("membership__plan").
+            order_by('-membership__plan__tier').first())
+
+
+def active_entitlements(user, now):
+    return Entitlement.objects.filter(user=user, revoked=False).filter(
+        models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=now))
+
+
+@dataclass(frozen=True)
+class PlanGrant:
+    """What a held plan allows; stands in for a Plan in Episode.available_for()."""
+    pk: object
+    tier: int
+    features: frozenset = frozenset()
+    early_access_hours: int = 0
+
+    @classmethod
+    def from_plan(cls, plan):
+        kinds = (Feature.Kind.EXCLUSIVE, Feature.Kind.EARLY_ACCESS)
+        early = plan.get_feature(Feature.Kind.EARLY_ACCESS)
+        return cls(
+            pk=plan.pk,
+            tier=plan.tier,
+            features=frozenset(kind for kind in kinds if plan.grants(kind)),
+            early_access_hours=(early.early_access_hours or 0) if early else 0,
+        )
+
+    def grants(self, *kinds):
+        return all(kind in self.features for kind in kinds)
+
+    def get_feature(self, kind):
+        # the only feature detail read off a plan is early_access_hours
+        return self if kind in self.features else None
+
+
+@dataclass(frozen=True)
+class EntitlementSnapshot:
+    user_id: object = None
+    subscription_id: object = None
+    tier: int | None = None
+    can_download: bool = False
+    plans: tuple = ()
+    objects: frozenset = frozenset()
+    # earliest expiry among the entitlements above; the snapshot is stale from then on
+    expires_at: datetime | None = field(default=None, compare=False)
+
+    def grants(self, *kinds):
+        return any(plan.grants(*kinds) for plan in self.plans)
+
+    def is_entitled_to(self, obj):
+        return (ContentType.objects.get_for_model(type(obj)).pk, str(obj.pk)) in self.objects
+
+    def entitled_ids(self, model):
+        ct_id = ContentType.objects.get_for_model(model).pk
+        return [object_id for content_type_id, object_id in self.objects if content_type_id == ct_id]
+
+
+EMPTY = EntitlementSnapshot()
+
+# (registry version, {plan pk: PlanGrant}); replaced whole when the version moves
+_plan_grants = (None, {})
+
+
+def plan_grant(plan):
+    """PlanGrant for `plan`, built from its features once per reference-data version."""
+    global _plan_grants
+    version, grants = _plan_grants
+    if version != registry.version:
+        version, grants = registry.version, {}
+        _plan_grants = (version, grants)
+    grant = grants.get(plan.pk)
+    if grant is None:
+        grant = grants[plan.pk] = PlanGrant.from_plan(plan)
+    return grant
+
+
+def build_snapshot(user, now=None):
+    if not user or not getattr(user, "is_authenticated", False):
+        return EMPTY
+    now = now or timezone.now()
+
+    sub = get_user_highest_active_subscription(user)
+    rows = list(active_entitlements(user, now).values_list("content_type_id", "object_id", "expires_at"))
+    plan_ct = ContentType.objects.get_for_model(Plan).pk
+    to_plan_pk = Plan._meta.pk.to_python
+
+    plans = [sub.membership.plan] if sub else []
+    plans.extend(filter(None, (registry.get("plans", to_plan_pk(object_id))
+                               for ct_id, object_id, _ in rows if ct_id == plan_ct)))
+    expiries = [expires_at for _, _, expires_at in rows if expires_at]
+    return EntitlementSnapshot(
+        user_id=user.pk,
+        subscription_id=sub.pk if sub else None,
+        tier=sub.membership.plan.tier if sub else None,
+        can_download=bool(sub and getattr(sub.membership.plan, "can_download", False)),
+        plans=tuple(plan_grant(plan) for plan in plans),
+        objects=frozenset((ct_id, object_id) for ct_id, object_id, _ in rows if ct_id != plan_ct),
+        expires_at=min(expiries, default=None),
+    )
+
+
+def _snapshot_key(user_id):
+    return f"access:snapshot:{user_id}"
+
+
+def _cached(entry, catalogue, now):
+    """The snapshot in a cache entry, or None once the catalogue moved or an entitlement lapsed."""
+    if entry is None:
+        return None
+    built_under, snapshot = entry
+    if built_under != catalogue or (snapshot.expires_at and snapshot.expires_at <= now):
+        return None
+    return snapshot
+
+
+def _ttl(snapshot, now):
+    ttl = SNAPSHOT_TTL_SECONDS
+    if snapshot.expires_at:
+        ttl = max(1, min(ttl, int((snapshot.expires_at - now).total_seconds())))
+    return ttl
+
+
+def get_snapshot(user):
+    """The user's snapshot from the cache, built (and cached) on a miss."""
+    if not user or not getattr(user, "is_authenticated", False):
+        return EMPTY
+    key = _snapshot_key(user.pk)
+    found = cache.get_many([key, CATALOGUE_GEN_KEY])
+    now = timezone.now()
+    catalogue = found.get(CATALOGUE_GEN_KEY)
+    snapshot = _cached(found.get(key), catalogue, now)
+    if snapshot is None:
+        snapshot = build_snapshot(user, now)
+        cache.set(key, (catalogue, snapshot), _ttl(snapshot, now))
+    return snapshot
+
+
+def warm_snapshots(users):
+    """
+    Build and cache the snapshots of `users` that aren't cached yet: one get_many for all of
+    them, a build per cold user, one set_many per distinct TTL. Returns how many were built.
+    """
+    keys = {_snapshot_key(user.pk): user for user in users if getattr(user, "is_authenticated", False)}
+    found = cache.get_many([*keys, CATALOGUE_GEN_KEY])
+    now = timezone.now()
+    catalogue = found.get(CATALOGUE_GEN_KEY)
+    by_ttl = defaultdict(dict)
+    for key, user in keys.items():
+        if _cached(found.get(key), catalogue, now) is None:
+            snapshot = build_snapshot(user, now)
+            by_ttl[_ttl(snapshot, now)][key] = (catalogue, snapshot)
+    for ttl, entries in by_ttl.items():
+        cache.set_many(entries, ttl)
+    return sum(len(entries) for entries in by_ttl.values())
+
+
+def snapshot_for_request(request):
+    """The request user's snapshot, resolved at most once per request."""
+    if not hasattr(request, "_entitlement_snapshot"):
+        request._entitlement_snapshot = get_snapshot(getattr(request, "user", None))
+    return request._entitlement_snapshot
+
+
+def invalidate_snapshot(user_id):
+    cache.delete(_snapshot_key(user_id))
@@ -0,0 +1,98 @@
+"""
+Batch loading of generic relations (reactions, comments, thumbnails, images).
+
+The `filter_by_instance` managers cost a ContentType lookup and a query per instance, and
+prefetch_related() cannot follow them from a mixed list (a feed of Podcasts, Episodes and
+Posts). GenericRelationLoader collects (content_type, object_id) keys across any list of
+instances and answers them with one query per relation model:
+
+    loader = GenericRelationLoader(Comment)
+    loader.attach(feed, "comment_list")            # one query for the whole feed
+    prefetch_generic(feed, reactions=PostReaction, images=Image.objects.order_by("-timestamp"))
+
+Keys: reactions, comments and thumbnails store `object_id` as str(pk), so integer and UUID
+targets compare the same way; both sides of the match go through the relation's own
+object_id field (get_prep_value). A relation whose object_id is still an integer column
+cannot point at a UUID-keyed target: such targets load as [] without a query.
+"""
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import IntegerField, Q
+
+
+class GenericRelationLoader:
+
+    def __init__(self, source, ct_field="content_type", fk_field="object_id"):
+        """`source`: a model with a generic foreign key, or a queryset of it (filters/ordering kept)."""
+        queryset = source._default_manager.all() if isinstance(source, type) else source
+        opts = queryset.model._meta
+        self.queryset = queryset
+        self.ct_attname = opts.get_field(ct_field).attname
+        self.fk_field = fk_field
+        self._to_object_id = opts.get_field(fk_field).get_prep_value
+        self._integer_ids = isinstance(opts.get_field(fk_field), IntegerField)
+        self._pending = set()
+        self._results = {}
+
+    def key(self, obj):
+        """(content_type_id, object_id) for `obj`, as stored on the related rows; None if no row can point at it."""
+        if self._integer_ids and not isinstance(obj.pk, int):
+            return None
+        return ContentType.objects.get_for_model(obj).pk, self._to_object_id(obj.pk)
+
+    def prime(self, objs):
+        for obj in objs:
+            key = self.key(obj)
+            if key is not None and key not in self._results:
+                self._pending.add(key)
+        return self
+
+    def dispatch(self):
+        """Load every pending key in one query; a no-op when nothing is pending."""
+        if not self._pending:
+            return
+        by_content_type = defaultdict(list)
+        for content_type_id, object_id in self._pending:
+            by_content_type[content_type_id].append(object_id)
+            self._results[(content_type_id, object_id)] = []
+        condition = Q()
+        for content_type_id, object_ids in by_content_type.items():
+            condition |= Q(**{self.ct_attname: content_type_id, f"{self.fk_field}__in": object_ids})
+        self._pending.clear()
+        for row in self.queryset.filter(condition):
+            self._results[(getattr(row, self.ct_attname), getattr(row, self.fk_field))].append(row)
+
+    def load(self, obj):
+        """Related rows of `obj`, in queryset order (batched with anything already primed)."""
+        key = self.key(obj)
+        if key is None:
+            return []
+        if key not in self._results:
+            self._pending.add(key)
+            self.dispatch()
+        return self._results[key]
+
+    def load_many(self, objs):
+        objs = list(objs)
+        self.prime(objs).dispatch()
+        return [self._results.get(self.key(obj), []) for obj in objs]
+
+    def attach(self, objs, to_attr):
+        """Set `obj.<to_attr>` to the list of related rows on each of `objs`."""
+        objs = list(objs)
+        for obj, rows in zip(objs, self.load_many(objs)):
+            setattr(obj, to_attr, rows)
+        return objs
+
+
+def prefetch_generic(objs, **relations):
+    """
+    Attach generic relations to a (possibly mixed) list: one query per relation.
+
+    prefetch_generic(feed, reactions=PostReaction, comments=Comment.objects.filter(parent=None))
+    """
+    objs = list(objs)
+    for to_attr, source in relations.items():
+        GenericRelationLoader(source).attach(objs, to_attr)
+    return objs
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postreaction',
+            name='object_id',
+            field=models.CharField(max_length=64),
+        ),
+    ]
@@ -5,8 +5,9 @@ from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
-from django.db import models
-from django.db.models import QuerySet
+from django.db import connections, models
+from django.db.models import Count, F, OuterRef, Q, QuerySet, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -68,7 +69,8 @@ class PostReaction(models.Model):
         DISLIKE = "dislike", _("Dislike")
 
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name="reactions")
-    object_id = models.PositiveIntegerField()
+    # str(pk): targets have integer or UUID primary keys
+    object_id = models.CharField(max_length=64)
     content_object = GenericForeignKey("content_type", "object_id")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     reaction = models.CharField(max_length=20, choices=Reaction.choices, default=Reaction.LIKE)
@@ -80,7 +82,42 @@ class PostReaction(models.Model):
         return "{0} by {1}".format(self.reaction, self.user)
 
 
-class PostQueryset(models.QuerySet):
+class TopPerGroupMixin:
+
+    def top_per_group(self, group_field, n, order_by, groups=None):
+        """
+        The first `n` rows of each `group_field` value (ordered by `order_by`), in one query.
+
+        Uses ROW_NUMBER() OVER (PARTITION BY group_field ...) where the backend supports
+        window functions; otherwise ranks each row by counting the rows of its group ordered
+        before it (a correlated subquery: those backends reject LIMIT inside IN). `groups`
+        restricts the result to those group values. Rows come back grouped, in `order_by`
+        order within each group.
+        """
+        qs = self if groups is None else self.filter(**{f"{group_field}__in": groups})
+        order_by = [order_by] if isinstance(order_by, str) else list(order_by)
+        if connections[qs.db].features.supports_over_clause:
+            expressions = [F(f[1:]).desc() if f.startswith("-") else F(f).asc() for f in order_by]
+            return qs.annotate(
+                group_rank=Window(RowNumber(), partition_by=F(group_field), order_by=expressions)
+            ).filter(group_rank__lte=n).order_by(group_field, "group_rank")
+
+        keys = order_by if {"pk", "-pk"} & set(order_by) else [*order_by, "pk"]  # pk breaks ties
+        before = Q()
+        for i, key in enumerate(keys):
+            name, lookup = (key[1:], "gt") if key.startswith("-") else (key, "lt")
+            ties = {k.lstrip("-"): OuterRef(k.lstrip("-")) for k in keys[:i]}
+            before |= Q(**ties, **{f"{name}__{lookup}": OuterRef(name)})
+        ahead = (
+            qs.order_by().filter(before, **{group_field: OuterRef(group_field)})
+            .values(group_field).annotate(count=Count("pk")).values("count")
+        )
+        return qs.annotate(
+            group_rank=Coalesce(Subquery(ahead), 0) + 1
+        ).filter(group_rank__lte=n).order_by(group_field, *order_by)
+
+
+class PostQueryset(TopPerGroupMixin, models.QuerySet):
 
     def browsable(self):
         return self.filter(parent=None)
@@ -9,5 +9,8 @@ class PodcastsConfig(AppConfig):
 
     namespace = "podcasts"
 
-    # def ready(self):
-    #     from apps.posts.podcasts import receivers # noqa
+    def ready(self):
+        from apps.posts.podcasts import receivers # noqa
+        # memberships has no AppConfig in this package; its snapshot/access-cache receivers
+        # are connected here, next to the access checks that depend on them
+        from apps.memberships import receivers as membership_receivers # noqa
@@ -0,0 +1,160 @@
+"""
+Write-behind buffer for playback progress heartbeats.
+
+With ``PLAYBACK_WRITE_BEHIND`` enabled (and Redis available) each heartbeat is stored in
+a per-listener Redis hash (``episode_id -> latest progress``), so repeated pings only
+overwrite the previous value, and the listener is added to a dirty set. ``flush()``
+(run by ``tasks.flush_playback_buffer`` from beat) pops dirty listeners in batches,
+takes their hash with an atomic HGETALL + DEL and upserts the rows in bulk, never over a
+newer write. A heartbeat arriving mid-flush re-marks the listener dirty, so nothing is lost.
+
+Completions bypass the buffer. Reads never write: they apply the listener's ``peek()``
+entries to the rows they fetch (see ``PlayBackManager.for_listener``). Rows keep
+the heartbeat time in ``last_played_at``/``session_started_at``, so they land behind the
+time they carry; the analytics rollups stop short of that (``rollups.settled()``).
+"""
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# Try to get a raw Redis connection via django-redis if available for hash ops.
+try:
+    from django_redis import get_redis_connection
+
+    _have_redis = True
+except Exception:
+    _have_redis = False
+
+WRITE_BEHIND = getattr(settings, "PLAYBACK_WRITE_BEHIND", False)
+FLUSH_BATCH_SIZE = getattr(settings, "PLAYBACK_FLUSH_BATCH_SIZE", 500)
+FLUSH_MAX_BATCHES = getattr(settings, "PLAYBACK_FLUSH_MAX_BATCHES", 20)
+
+DIRTY_KEY = "playback:buffer:dirty"
+
+
+def enabled():
+    return WRITE_BEHIND and _have_redis
+
+
+def _redis():
+    return get_redis_connection("default")
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def listener_key(user, ip_address):
+    if user is not None:
+        return f"playback:buffer:u:{user.pk}"
+    return f"playback:buffer:ip:{ip_address}"
+
+
+def buffer_progress(user, episode_id, ip_address, seconds, now=None):
+    """Record a heartbeat; the last write per (listener, episode) wins."""
+    now = now or timezone.now()
+    key = listener_key(user, ip_address)
+    payload = json.dumps({
+        "user_id": user.pk if user is not None else None,
+        "ip_address": ip_address,
+        "episode_id": str(episode_id),
+        "seconds": seconds,
+        "at": now.isoformat(),
+    })
+    pipe = _redis().pipeline(transaction=True)
+    pipe.hset(key, str(episode_id), payload)
+    pipe.sadd(DIRTY_KEY, key)
+    pipe.execute()
+
+
+def discard(user, ip_address, episode_id):
+    """Drop a pending heartbeat, e.g. once a completion for the same episode was written."""
+    _redis().hdel(listener_key(user, ip_address), str(episode_id))
+
+
+def _take(keys):
+    """Atomically read and clear the hashes of `keys`; returns the buffered entries."""
+    pipe = _redis().pipeline(transaction=True)
+    for key in keys:
+        pipe.hgetall(key)
+        pipe.delete(key)
+    results = pipe.execute()
+    entries = []
+    for pending in results[::2]:
+        entries.extend(json.loads(_decode(v)) for v in pending.values())
+    return entries
+
+
+def _write(entries):
+    """
+    Upsert buffered entries. Existing rows are locked and only moved forward: a heartbeat
+    older than the row (e.g. a completion written while it sat in the buffer or mid-flush)
+    is dropped, and a flush never clears is_completed.
+    """
+    from .models import PlayBack
+
+    if not entries:
+        return 0
+    pending = {}
+    for e in entries:
+        user_id = str(e["user_id"]) if e["user_id"] is not None else None
+        pending[(user_id, None if user_id else e["ip_address"], str(e["episode_id"]))] = e
+
+    users = {user_id for user_id, _, _ in pending if user_id}
+    with transaction.atomic():
+        existing = PlayBack.objects.select_for_update().filter(
+            Q(user_id__in=users) | Q(user__isnull=True, ip_address__in={ip for _, ip, _ in pending if ip}),
+            episode_id__in={episode_id for _, _, episode_id in pending},
+        )
+        updated = []
+        for row in existing:
+            user_id = str(row.user_id) if row.user_id is not None else None
+            e = pending.pop((user_id, None if user_id else row.ip_address, str(row.episode_id)), None)
+            if e is None:
+                continue
+            at = parse_datetime(e["at"])
+            if row.last_played_at and row.last_played_at >= at:
+                continue  # the row was written after this heartbeat
+            row.ip_address = e["ip_address"]
+            row.apply_progress(e["seconds"], at)
+            updated.append(row)
+        PlayBack.objects.bulk_update(
+            updated, ["ip_address", "current_timestamp", "last_played_at", "session_started_at"])
+        created = []
+        for e in pending.values():
+            row = PlayBack(user_id=e["user_id"], ip_address=e["ip_address"], episode_id=e["episode_id"])
+            row.apply_progress(e["seconds"], parse_datetime(e["at"]), is_completed=False)
+            created.append(row)
+        # a row created concurrently (e.g. a completion) wins over the buffered heartbeat
+        PlayBack.objects.bulk_create(created, ignore_conflicts=True)
+
+    # bulk writes skip post_save, so invalidate recommendations here (once per user)
+    from apps.recommendation.cache import invalidate_user_recommendations
+
+    for user_id in users:
+        invalidate_user_recommendations(user_id)
+    return len(entries)
+
+
+def peek(user, ip_address):
+    """One listener's buffered entries by episode id, read without taking them."""
+    if not enabled():
+        return {}
+    return {_decode(k): json.loads(_decode(v)) for k, v in _redis().hgetall(listener_key(user, ip_address)).items()}
+
+
+def flush(batch_size=FLUSH_BATCH_SIZE, max_batches=FLUSH_MAX_BATCHES):
+    """Flush dirty listeners in batches; returns the number of rows written."""
+    if not enabled():
+        return 0
+    written = 0
+    for _ in range(max_batches):
+        keys = [_decode(k) for k in _redis().spop(DIRTY_KEY, batch_size) or []]
+        if not keys:
+            break
+        written += _write(_take(keys))
+    return written
@@ -0,0 +1,142 @@
+"""
+Per-user flags for list endpoints, answered in bulk.
+
+A list serializer that calls check_is_liked / get_my_reaction / in_queue /
+user_has_subscribed / is_downloadable_by on every row costs a query per row and flag.
+``serializer_context(request, objs)`` answers all of them for a page of Podcasts and
+Episodes up front, one query per flag type, and hands them to the serializer as
+``context["user_flags"]``:
+
+    flags = self.context["user_flags"]
+    flags.is_liked(obj), flags.my_reaction(obj), flags.in_queue(obj),
+    flags.has_subscribed(obj), flags.is_downloadable(obj)
+
+Objects outside the batch fall back to the per-object model methods; tests can forbid
+that with ``assert_no_per_object_flags()``.
+"""
+from collections import defaultdict
+from contextlib import contextmanager, ExitStack
+from dataclasses import dataclass, field
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+
+from apps.memberships.snapshot import EMPTY, get_snapshot, snapshot_for_request
+from apps.posts.models import PostReaction
+from .models import Episode, Podcast
+
+# (model, method) pairs that cost a query per object
+PER_OBJECT_METHODS = (
+    (Podcast, "check_is_liked"), (Podcast, "get_my_reaction"), (Podcast, "user_has_subscribed"),
+    (Episode, "check_is_liked"), (Episode, "get_my_reaction"), (Episode, "user_has_subscribed"),
+    (Episode, "in_queue"), (Episode, "is_downloadable_by"),
+)
+
+
+def _key(obj):
+    return type(obj), obj.pk
+
+
+@dataclass
+class UserFlags:
+    user: object = None
+    request: object = None
+    batched: set = field(default_factory=set)
+    reactions: dict = field(default_factory=dict)
+    queued: set = field(default_factory=set)
+    subscribed: set = field(default_factory=set)
+    snapshot: object = EMPTY
+
+    def _covers(self, obj):
+        return _key(obj) in self.batched
+
+    def is_liked(self, obj):
+        if not self._covers(obj):
+            return obj.check_is_liked(self.user)
+        return _key(obj) in self.reactions
+
+    def my_reaction(self, obj):
+        if not self._covers(obj):
+            return obj.get_my_reaction(self.user)
+        return self.reactions.get(_key(obj))
+
+    def in_queue(self, obj):
+        if not self._covers(obj):
+            return obj.in_queue(self.request)
+        return obj.pk in self.queued
+
+    def has_subscribed(self, obj):
+        if not self._covers(obj):
+            return obj.user_has_subscribed(self.user)
+        return _key(obj) in self.subscribed
+
+    def is_downloadable(self, obj):
+        return self.snapshot.can_download
+
+
+def build_user_flags(request, objs):
+    """UserFlags for `objs` (Podcasts and Episodes, mixed): one query per flag type."""
+    user = getattr(request, "user", None)
+    objs = list(objs)
+    flags = UserFlags(user=user, request=request, batched={_key(obj) for obj in objs})
+    if not objs or not user or not user.is_authenticated:
+        return flags
+
+    by_model = defaultdict(list)
+    for obj in objs:
+        by_model[type(obj)].append(obj)
+    content_types = ContentType.objects.get_for_models(*by_model)
+
+    # reactions (liked / my reaction): one query across content types; object_id is str(pk)
+    generic_ids = {}
+    condition = Q()
+    for model, instances in by_model.items():
+        ids = {str(obj.pk): obj.pk for obj in instances}
+        generic_ids[content_types[model].pk] = (model, ids)
+        condition |= Q(content_type=content_types[model], object_id__in=list(ids))
+    for reaction in PostReaction.objects.filter(condition, user=user).order_by("-pk"):
+        model, ids = generic_ids[reaction.content_type_id]
+        # lowest pk written last: the same reaction get_my_reaction()'s .first() returns
+        flags.reactions[(model, ids[reaction.object_id])] = reaction
+
+    # subscriptions: one query per model's subscribers table
+    for model, instances in by_model.items():
+        through = model.subscribers.through
+        fk = f"{model._meta.model_name}_id"
+        subscribed = through.objects.filter(
+            user=user, **{f"{fk}__in": [obj.pk for obj in instances]}).values_list(fk, flat=True)
+        flags.subscribed.update((model, pk) for pk in subscribed)
+
+    # queue: episodes only
+    queue = getattr(request, "queue", None)
+    if queue is not None and by_model.get(Episode):
+        flags.queued = set(queue.tracks.filter(
+            track_id__in=[obj.pk for obj in by_model[Episode]]).values_list("track_id", flat=True))
+
+    # downloads: the entitlement snapshot (cached across requests)
+    flags.snapshot = snapshot_for_request(request) if hasattr(request, "user") else get_snapshot(user)
+    return flags
+
+
+def serializer_context(request, objs, **extra):
+    """Serializer context for a page of `objs`: {"request", "user_flags", **extra}."""
+    return {"request": request, "user_flags": build_user_flags(request, objs), **extra}
+
+
+@contextmanager
+def assert_no_per_object_flags():
+    """
+    Test helper: fail on any per-object flag lookup (PER_OBJECT_METHODS) inside the block,
+    e.g. a serializer that ignores context["user_flags"] or an object missing from the batch.
+    """
+    from unittest import mock
+
+    def forbid(name):
+        def fail(*args, **kwargs):
+            raise AssertionError(f"per-object flag lookup: {name}(); build the page's flags with serializer_context()")
+        return fail
+
+    with ExitStack() as stack:
+        for model, method in PER_OBJECT_METHODS:
+            stack.enter_context(mock.patch.object(model, method, forbid(f"{model.__name__}.{method}")))
+        yield
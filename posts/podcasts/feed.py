@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.media.models import PlayList
+from . import queries
+from .models import Episode, Podcast
+
+FEED_SHELF_TTL = getattr(settings, "FEED_SHELF_TTL", 60)
+
+EPISODES = "episodes"
+PODCASTS = "podcasts"
+PLAYLISTS = "playlists"
+
+# shelf -> (kind, id loader); these are the same for every user, so their ids are cached globally
+GLOBAL_SHELVES = {
+    "trending_episodes": (EPISODES, lambda limit: queries.trending_episode_ids(limit=limit)),
+    "new_releases": (EPISODES, lambda limit: queries.new_release_ids(limit=limit)),
+    "editor_picks": (EPISODES, lambda limit: queries.editor_picked_episode_ids(limit=limit)),
+    "top_playlists": (PLAYLISTS, lambda limit: queries.top_playlists(limit=limit).values_list("pk", flat=True)),
+    "trending_podcasts": (PODCASTS, lambda limit: queries.trending_podcast_ids(limit=limit)),
+}
+PERSONAL_SHELVES = {
+    "recommended": EPISODES,
+}
+
+
+def _shelf_key(name, limit):
+    return f"feed:shelf:{name}:{limit}"
+
+
+def _global_shelf_ids(limit):
+    keys = {name: _shelf_key(name, limit) for name in GLOBAL_SHELVES}
+    cached = cache.get_many(list(keys.values()))
+    shelves, fresh = {}, {}
+    for name, key in keys.items():
+        if key in cached:
+            shelves[name] = cached[key]
+        else:
+            _, load = GLOBAL_SHELVES[name]
+            shelves[name] = fresh[key] = [str(pk) for pk in load(limit)]
+    if fresh:
+        cache.set_many(fresh, FEED_SHELF_TTL)
+    return shelves
+
+
+def _recommended_ids(user, limit):
+    if not user or not user.is_authenticated:
+        # anonymous users already get the trending and new-release shelves
+        return []
+    from apps.recommendation.services.queries import recommend_episode_ids_for_user_cached
+    return recommend_episode_ids_for_user_cached(user, limit=limit)
+
+
+def _hydrate(kind, ids):
+    if not ids:
+        return {}
+    if kind == EPISODES:
+        qs = Episode.objects.select_related("podcast").prefetch_related("categories")
+    elif kind == PODCASTS:
+        qs = Podcast.objects.prefetch_related("categories")
+    else:
+        qs = PlayList.objects.all()
+    to_pk = qs.model._meta.pk.to_python
+    return {str(pk): obj for pk, obj in qs.in_bulk([to_pk(pk) for pk in ids]).items()}
+
+
+def compose_home_feed(user, limit=12):
+    """
+    Assemble every home shelf in one pass: gather id lists (global shelves from the cache),
+    show each object at most once across the feed, then load all referenced episodes,
+    podcasts and playlists with one in_bulk per model.
+
+    Returns {shelf name: [instances]} in shelf order.
+    """
+    shelf_ids = _global_shelf_ids(limit)
+    shelf_ids["recommended"] = [str(pk) for pk in _recommended_ids(user, limit)]
+
+    kinds = {name: kind for name, (kind, _) in GLOBAL_SHELVES.items()}
+    kinds.update(PERSONAL_SHELVES)
+
+    seen = {EPISODES: set(), PODCASTS: set(), PLAYLISTS: set()}
+    for name, ids in shelf_ids.items():
+        unique = []
+        for pk in ids:
+            if pk not in seen[kinds[name]]:
+                seen[kinds[name]].add(pk)
+                unique.append(pk)
+        shelf_ids[name] = unique
+
+    objects = {kind: _hydrate(kind, ids) for kind, ids in seen.items()}
+    return {
+        name: [objects[kinds[name]][pk] for pk in ids if pk in objects[kinds[name]]]
+        for name, ids in shelf_ids.items()
+    }
@@ -0,0 +1,257 @@
+"""
+Real-time trending leaderboards kept in (Redis) sorted sets.
+
+Every counted play, completion and podcast view adds ``weight * 2 ** ((t - epoch) / half_life)``
+to the member's score, where ``epoch`` is the start of the board's current epoch. Older
+events are therefore worth exponentially less than newer ones without ever rescanning
+them; ranks read straight off ``ZREVRANGE``. Because increments grow with the offset from
+the epoch, ``rebase()`` periodically moves the epoch forward and scales every score down
+by the same factor (``ZUNIONSTORE ... WEIGHTS``), pruning members that decayed to nothing.
+"""
+import math
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+# Try to get a raw Redis connection via django-redis if available for sorted-set ops.
+try:
+    from django_redis import get_redis_connection
+
+    _have_redis = True
+except Exception:
+    _have_redis = False
+
+HALF_LIFE_HOURS = getattr(settings, "TRENDING_HALF_LIFE_HOURS", 24)
+PRUNE_BELOW = getattr(settings, "TRENDING_PRUNE_BELOW", 0.01)
+PLAY_SESSION_SECONDS = getattr(settings, "TRENDING_PLAY_SESSION_SECONDS", 30 * 60)
+COMPLETION_DEDUPE_SECONDS = getattr(settings, "TRENDING_COMPLETION_DEDUPE_SECONDS", 24 * 3600)
+
+SCOPED_TRENDING_SIZE = getattr(settings, "TRENDING_SCOPED_SIZE", 50)
+SCOPE_INDEX_KEY = "trending:scope:index"
+
+# same relative weights as the batch trending scores
+EPISODE_WEIGHTS = {"play": 1.5, "completion": 2.0}
+PODCAST_WEIGHTS = {"view": 1.0, "play": 2.5, "completion": 3.0}
+
+
+class LocalSortedSets:
+    """
+    Pure-Python stand-in for the handful of Redis commands used here (redis-py signatures).
+    Used in tests and when no Redis connection is configured; state is per process.
+    """
+
+    def __init__(self):
+        self._zsets = defaultdict(dict)
+        self._values = {}
+        self._lock = threading.RLock()
+
+    def get(self, name):
+        return self._values.get(name)
+
+    def set(self, name, value):
+        self._values[name] = str(value)
+
+    def delete(self, *names):
+        with self._lock:
+            for name in names:
+                self._zsets.pop(name, None)
+                self._values.pop(name, None)
+
+    def zincrby(self, name, amount, value):
+        with self._lock:
+            zset = self._zsets[name]
+            zset[value] = zset.get(value, 0.0) + amount
+            return zset[value]
+
+    def zscore(self, name, value):
+        return self._zsets.get(name, {}).get(value)
+
+    def zcard(self, name):
+        return len(self._zsets.get(name, {}))
+
+    def zrevrange(self, name, start, end, withscores=False):
+        with self._lock:
+            ranked = sorted(self._zsets.get(name, {}).items(), key=lambda kv: (-kv[1], kv[0]))
+        ranked = ranked[start:None if end == -1 else end + 1]
+        return ranked if withscores else [member for member, _ in ranked]
+
+    def zunionstore(self, dest, keys, aggregate=None):
+        with self._lock:
+            merged = defaultdict(float)
+            for key, weight in keys.items():
+                for member, score in self._zsets.get(key, {}).items():
+                    merged[member] += score * weight
+            self._zsets[dest] = dict(merged)
+            return len(merged)
+
+    def zremrangebyscore(self, name, min, max):
+        with self._lock:
+            zset = self._zsets.get(name, {})
+            low = float("-inf") if min == "-inf" else float(min)
+            high = float("inf") if max == "+inf" else float(max)
+            doomed = [member for member, score in zset.items() if low <= score <= high]
+            for member in doomed:
+                del zset[member]
+            return len(doomed)
+
+    def pipeline(self, transaction=True):
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    def __init__(self, backend):
+        self._backend = backend
+        self._calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        with self._backend._lock:
+            return [getattr(self._backend, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+
+
+_local_backend = LocalSortedSets()
+
+
+def get_backend():
+    if _have_redis and getattr(settings, "TRENDING_LEADERBOARD_BACKEND", "redis") == "redis":
+        return get_redis_connection("default")
+    return _local_backend
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class TrendingLeaderboard:
+
+    def __init__(self, name, half_life_hours=HALF_LIFE_HOURS, backend=None):
+        self.name = name
+        self.key = f"trending:board:{name}"
+        self.epoch_key = f"{self.key}:epoch"
+        self.half_life = half_life_hours * 3600.0
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else get_backend()
+
+    def _epoch(self, now):
+        epoch = self.backend.get(self.epoch_key)
+        if epoch is None:
+            epoch = now.timestamp()
+            self.backend.set(self.epoch_key, epoch)
+        return float(_decode(epoch))
+
+    def _offset(self, now):
+        """log2 of the multiplier for an event at `now` relative to the current epoch."""
+        return (now.timestamp() - self._epoch(now)) / self.half_life
+
+    def increment(self, member, weight=1.0, now=None):
+        now = now or timezone.now()
+        self.backend.zincrby(self.key, weight * math.pow(2.0, self._offset(now)), str(member))
+
+    def top(self, limit, now=None):
+        """[(member, score)] best first; scores are expressed in decayed units as of `now`."""
+        now = now or timezone.now()
+        scale = math.pow(2.0, -self._offset(now))
+        rows = self.backend.zrevrange(self.key, 0, limit - 1, withscores=True)
+        return [(_decode(member), score * scale) for member, score in rows]
+
+    def rebase(self, now=None):
+        """Move the epoch to `now`, scaling all scores into the new epoch and pruning dead members."""
+        now = now or timezone.now()
+        factor = math.pow(2.0, -self._offset(now))
+        pipe = self.backend.pipeline(transaction=True)
+        pipe.zunionstore(self.key, {self.key: factor})
+        pipe.zremrangebyscore(self.key, "-inf", PRUNE_BELOW)
+        pipe.set(self.epoch_key, now.timestamp())
+        pipe.execute()
+
+    def clear(self):
+        self.backend.delete(self.key, self.epoch_key)
+
+
+episode_leaderboard = TrendingLeaderboard("episodes")
+podcast_leaderboard = TrendingLeaderboard("podcasts")
+
+
+def _first_time(kind, listener, object_id, timeout, sliding=False):
+    # cache.add only succeeds for the first event in the window, so heartbeats aren't re-counted
+    key = f"trending:seen:{kind}:{listener}:{object_id}"
+    if cache.add(key, 1, timeout=timeout):
+        return True
+    if sliding:
+        # each event extends the window: a session ends after `timeout` seconds of silence
+        cache.touch(key, timeout)
+    return False
+
+
+def record_play(episode_id, listener, is_completed=False, podcast_id=None, now=None):
+    """
+    Count a listening session (and its completion) once on the episode and podcast boards.
+    A session lasts until PLAY_SESSION_SECONDS pass without a heartbeat, as in PlayBack.
+    """
+    events = []
+    if _first_time("play", listener, episode_id, PLAY_SESSION_SECONDS, sliding=True):
+        events.append("play")
+    if is_completed and _first_time("completion", listener, episode_id, COMPLETION_DEDUPE_SECONDS):
+        events.append("completion")
+    if not events:
+        return
+
+    if podcast_id is None:
+        from .models import Episode
+        podcast_id = Episode.objects.filter(pk=episode_id).values_list("podcast_id", flat=True).first()
+    for event in events:
+        episode_leaderboard.increment(episode_id, EPISODE_WEIGHTS[event], now=now)
+        if podcast_id is not None:
+            podcast_leaderboard.increment(podcast_id, PODCAST_WEIGHTS[event], now=now)
+
+
+def record_podcast_view(podcast_id, now=None):
+    podcast_leaderboard.increment(podcast_id, PODCAST_WEIGHTS["view"], now=now)
+
+
+def rebase_all(now=None):
+    for board in (episode_leaderboard, podcast_leaderboard):
+        board.rebase(now=now)
+
+
+# -------------------------
+# Scoped (per category / entity) trending lists
+# -------------------------
+# Precomputed by tasks.refresh_scoped_trending; categories are keyed by slug,
+# countries/competitions/teams by id.
+def scope_key(kind, scope, scope_id):
+    return f"trending:scope:{kind}:{scope}:{scope_id}"
+
+
+def scoped_trending_ids(kind, scope, scope_id):
+    """Ordered ids (strings) trending in one scope; a single cache lookup."""
+    return cache.get(scope_key(kind, scope, scope_id)) or []
+
+
+def store_scoped_trending(lists):
+    """
+    Replace all scoped lists with `lists` ({scope_key: [ids]}), writing only the
+    lists that changed and deleting scopes that no longer have any activity.
+    """
+    previous = cache.get(SCOPE_INDEX_KEY) or []
+    current = cache.get_many(list(lists))
+    changed = {key: ids for key, ids in lists.items() if current.get(key) != ids}
+    if changed:
+        cache.set_many(changed, timeout=None)
+    stale = set(previous) - set(lists)
+    if stale:
+        cache.delete_many(list(stale))
+    cache.set(SCOPE_INDEX_KEY, list(lists), timeout=None)
+    return {"written": len(changed), "deleted": len(stale)}
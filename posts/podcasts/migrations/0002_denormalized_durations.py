@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:04
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_durations(apps, schema_editor):
+    Audio = apps.get_model('audio', 'Audio')
+    Episode = apps.get_model('podcasts', 'Episode')
+    Podcast = apps.get_model('podcasts', 'Podcast')
+
+    master = Audio.objects.filter(episode=OuterRef('pk'), master=True).values('duration')[:1]
+    Episode.objects.update(duration_seconds=Coalesce(Subquery(master), 0))
+
+    episodes = Episode.objects.filter(podcast=OuterRef('pk')).order_by().values('podcast')
+    Podcast.objects.update(
+        total_duration_seconds=Coalesce(Subquery(episodes.annotate(total=Sum('duration_seconds')).values('total')), 0),
+        episode_count=Coalesce(Subquery(episodes.annotate(total=Count('pk')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audio', '0002_initial'),
+        ('podcasts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='duration_seconds',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='podcast',
+            name='total_duration_seconds',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='podcast',
+            name='episode_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_durations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:12
+
+import datetime
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_access_requirements(apps, schema_editor):
+    Episode = apps.get_model('podcasts', 'Episode')
+    Podcast = apps.get_model('podcasts', 'Podcast')
+
+    episode_tiers, podcast_tiers = defaultdict(dict), defaultdict(dict)
+    for episode_id, tier_id, rank in Episode.categories.through.objects.values_list(
+            'episode_id', 'category__tier_id', 'category__tier__tier'):
+        episode_tiers[episode_id][str(tier_id)] = rank
+    for podcast_id, tier_id, rank in Podcast.categories.through.objects.values_list(
+            'podcast_id', 'category__tier_id', 'category__tier__tier'):
+        podcast_tiers[podcast_id][str(tier_id)] = rank
+
+    episodes = list(Episode.objects.only('pk', 'podcast_id', 'public_release_date', 'early_access_hours'))
+    for episode in episodes:
+        tiers = {**podcast_tiers[episode.podcast_id], **episode_tiers[episode.pk]}
+        episode.tier_ids = sorted(tiers)
+        episode.required_tier = max(tiers.values(), default=None)
+        if episode.public_release_date:
+            episode.early_available_at = episode.public_release_date - datetime.timedelta(
+                hours=episode.early_access_hours or 0)
+    Episode.objects.bulk_update(episodes, ['required_tier', 'tier_ids', 'early_available_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0002_initial'),
+        ('memberships', '0001_initial'),
+        ('podcasts', '0002_denormalized_durations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='required_tier',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, help_text='Highest tier rank among the category plans', null=True),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='tier_ids',
+            field=models.JSONField(blank=True, default=list, help_text='Ids of the category plans'),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='early_available_at',
+            field=models.DateTimeField(blank=True, help_text='public_release_date minus early_access_hours', null=True),
+        ),
+        migrations.RunPython(backfill_access_requirements, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_sessions(apps, schema_editor):
+    PlayBack = apps.get_model('podcasts', 'PlayBack')
+    PlayBack.objects.update(session_started_at=F('last_played_at'))
+    PlayBack.objects.filter(is_completed=True).update(completed_at=F('last_played_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podcasts', '0003_episode_access_requirements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playback',
+            name='session_started_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='playback',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_sessions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 21:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podcasts', '0004_playback_sessions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='playback',
+            name='last_played_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
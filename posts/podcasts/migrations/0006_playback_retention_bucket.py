@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podcasts', '0005_playback_last_played_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playback',
+            name='retention_bucket',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
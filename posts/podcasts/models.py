@@ -1,22 +1,29 @@
 import datetime
 import random
 import uuid
+from collections import defaultdict
 from typing import TypeVar
 
-from django.db import models
-from django.db.models import Count, Q
+from django.db import connections, models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Greatest
 from django.db.models import QuerySet
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 import utils
 from apps.category.models import Category
+from apps.category.registry import registry
 from apps.fields.tagsfield import TagsField
 from apps.media.audio.models import Audio
 from apps.media.images.models import Image
-from apps.memberships.models import Subscription, Feature, Plan
+from apps.memberships.models import Feature, Plan
+from apps.memberships.snapshot import get_snapshot
+from apps.posts.loaders import GenericRelationLoader
 from apps.posts.models import BasePost, AbstractAnalytics, PostReaction, Comment, PostQueryset, \
-    PostManager
-from apps.posts.podcasts.utils import get_default_title
+    PostManager, TopPerGroupMixin
+from apps.posts.podcasts import buffers, leaderboards
+from apps.posts.podcasts.utils import get_default_title, encode_cursor, decode_cursor
 from core.compat import get_user_model
 from utils.utils import get_client_ip
 
@@ -104,9 +111,47 @@ class PodcastQuerySet(PostQueryset):
         ).order_by('-relevance', '-timestamp').distinct()[:limit]
 
     def popular_by_category(self, category_slug):
-        return self.filter(categories__slug=category_slug).annotate(
-            total_views=models.F("view_count")
-        ).order_by('-total_views', '-timestamp')
+        """Podcasts trending in the category (precomputed scoped list) first, then by lifetime views."""
+        qs = self.filter(categories__slug=category_slug).annotate(total_views=models.F("view_count"))
+        trending_ids = leaderboards.scoped_trending_ids("podcasts", "category", category_slug)
+        if not trending_ids:
+            return qs.order_by('-total_views', '-timestamp')
+        trend_rank = models.Case(
+            *[models.When(pk=pk, then=models.Value(rank)) for rank, pk in enumerate(trending_ids)],
+            default=models.Value(len(trending_ids)),
+            output_field=models.IntegerField(),
+        )
+        return qs.annotate(trend_rank=trend_rank).order_by('trend_rank', '-total_views', '-timestamp')
+
+    def with_latest_episodes(self, per_podcast=3):
+        """Prefetch each podcast's newest episodes into `latest_episodes` (one windowed query)."""
+        return self.prefetch_related(Prefetch(
+            "episodes",
+            queryset=Episode.objects.order_by("-timestamp", "-pk")[:per_podcast],
+            to_attr="latest_episodes",
+        ))
+
+    def with_duration(self):
+        """
+        Annotate `duration_seconds` / `episodes_total`: the podcast's own denormalized totals,
+        or for a parent (multi-season) podcast the sum over its seasons.
+        """
+        seasons = self.model.objects.filter(parent=OuterRef("pk")).order_by().values("parent")
+        season_duration = seasons.annotate(total=Sum("total_duration_seconds")).values("total")
+        season_episodes = seasons.annotate(total=Sum("episode_count")).values("total")
+        return self.annotate(
+            duration_seconds=Coalesce(Subquery(season_duration), 0) + F("total_duration_seconds"),
+            episodes_total=Coalesce(Subquery(season_episodes), 0) + F("episode_count"),
+        )
+
+    def refresh_totals(self):
+        """Recompute total_duration_seconds and episode_count from the episodes (one UPDATE)."""
+        episodes = Episode.objects.filter(podcast=OuterRef("pk")).order_by().values("podcast")
+        return self.update(
+            total_duration_seconds=Coalesce(
+                Subquery(episodes.annotate(total=Sum("duration_seconds")).values("total")), 0),
+            episode_count=Coalesce(Subquery(episodes.annotate(total=Count("pk")).values("total")), 0),
+        )
 
 
 class PodcastManager(PostManager):
@@ -126,11 +171,21 @@ class PodcastManager(PostManager):
     def popular_by_category(self, category_slug):
         return self.get_queryset().popular_by_category(category_slug=category_slug)
 
+    def with_latest_episodes(self, per_podcast=3):
+        return self.get_queryset().with_latest_episodes(per_podcast=per_podcast)
+
+    def with_duration(self):
+        return self.get_queryset().with_duration()
+
 
 class Podcast(AbstractAnalytics, BasePost):
     tags = TagsField(max_length=255, null=True, blank=True)
     categories = models.ManyToManyField(Category, related_name="podcasts", blank=True)
 
+    # denormalized from the episodes (see PodcastQuerySet.refresh_totals)
+    total_duration_seconds = models.PositiveIntegerField(default=0)
+    episode_count = models.PositiveIntegerField(default=0)
+
     objects = PodcastManager()
 
     def __str__(self):
@@ -149,26 +204,17 @@ class Podcast(AbstractAnalytics, BasePost):
         return self.get_children().none()
 
     def get_raw_duration(self):
-        episodes = self.get_episodes()
-        if not episodes.exists():
-            return 0
-        return sum(e.get_raw_duration() for e in episodes)
+        # with_duration() already covers seasons; otherwise only parents need a query
+        if hasattr(self, "duration_seconds"):
+            return self.duration_seconds
+        if self.is_parent:
+            seasons = self.get_children().aggregate(total=Sum("total_duration_seconds"))["total"] or 0
+            return seasons + self.total_duration_seconds
+        return self.total_duration_seconds
 
     @property
     def duration_string(self) -> str:
-        """
-        Calculates total duration.
-        Note: If 'duration' is a DB field on Episode, use aggregate(Sum('duration'))
-        for better performance. Keeping original logic structure here.
-        """
-        episodes = self.get_episodes()
-        if not episodes.exists():
-            return "00:00"
-
-        # Optimize: If possible, change this to database aggregation
-        total_seconds = sum(e.get_duration() for e in episodes)
-        # total_seconds = episodes.aggregate(Sum('duration'))['duration__sum']
-        return utils.format_duration(total_seconds)  # Replace with utils.format_duration(total_seconds)
+        return utils.format_duration(self.get_raw_duration())
 
     def get_image_url(self):
         """Safe accessor for image."""
@@ -190,14 +236,102 @@ class Podcast(AbstractAnalytics, BasePost):
     def get_comments(self):
         return Comment.objects.filter_by_instance(self)
 
+    def record_view(self, request):
+        counted = super().record_view(request)
+        if counted:
+            leaderboards.record_podcast_view(self.pk)
+        return counted
+
 
-class EpisodeQueryset(models.QuerySet):
+class EpisodeQueryset(TopPerGroupMixin, models.QuerySet):
+
+    def latest_per_podcast(self, podcast_ids=None, per_podcast=2):
+        """The newest `per_podcast` episodes of each podcast in one query, grouped by podcast."""
+        return self.top_per_group("podcast_id", per_podcast, ("-timestamp", "-pk"), groups=podcast_ids)
 
     def latest_in_category(self, category_slug):
         return self.filter(
             models.Q(categories__slug=category_slug) | models.Q(podcast__categories__slug=category_slug)
         ).order_by("-timestamp").distinct()
 
+    def refresh_durations(self):
+        """Copy the master audio duration onto the episodes and refresh their podcasts' totals."""
+        master = Audio.objects.filter(episode=OuterRef("pk"), master=True).values("duration")[:1]
+        podcast_ids = set(self.values_list("podcast_id", flat=True))
+        updated = self.update(duration_seconds=Coalesce(Subquery(master), 0))
+        Podcast.objects.filter(pk__in=podcast_ids).refresh_totals()
+        return updated
+
+    def refresh_access_requirements(self):
+        """Recompute required_tier / tier_ids from the episodes' and their podcasts' categories."""
+        episodes = list(self.order_by().only("pk", "podcast_id"))
+        if not episodes:
+            return 0
+        # only the category ids come from the database; tiers resolve through the registry
+        episode_tiers, podcast_tiers = defaultdict(dict), defaultdict(dict)
+        for episode_id, category_id in Episode.categories.through.objects.filter(
+                episode_id__in=[e.pk for e in episodes]).values_list("episode_id", "category_id"):
+            tier = registry.get("categories", category_id).tier
+            episode_tiers[episode_id][str(tier.pk)] = tier.tier
+        for podcast_id, category_id in Podcast.categories.through.objects.filter(
+                podcast_id__in={e.podcast_id for e in episodes}).values_list("podcast_id", "category_id"):
+            tier = registry.get("categories", category_id).tier
+            podcast_tiers[podcast_id][str(tier.pk)] = tier.tier
+
+        for episode in episodes:
+            tiers = {**podcast_tiers[episode.podcast_id], **episode_tiers[episode.pk]}
+            episode.tier_ids = sorted(tiers)
+            episode.required_tier = max(tiers.values(), default=None)
+        return Episode.objects.bulk_update(episodes, ["required_tier", "tier_ids"], batch_size=500)
+
+    def _plan_condition(self, plan, now):
+        """
+        Episode.available_for(plan=plan, now=now) as a Q: plan features are read in Python
+        (the plan is known), the per-episode rules run in SQL against the denormalized
+        required_tier / tier_ids, like available_for() itself.
+        """
+        # a category tier ranking above the plan (Plan.ranks_above), or the plan itself
+        has_perm = Q(required_tier__gt=plan.tier)
+        if connections[self.db].features.supports_json_field_contains:
+            has_perm |= Q(tier_ids__contains=[str(plan.pk)])
+        else:
+            # no JSON containment (SQLite, Oracle): the categories tier_ids was built from
+            tier_categories = Category.objects.filter(tier_id=plan.pk)
+            has_perm |= (Exists(tier_categories.filter(episodes=OuterRef("pk")))
+                         | Exists(tier_categories.filter(podcasts=OuterRef("podcast_id"))))
+
+        condition = has_perm & Q(public_release_date__lte=now)
+        if plan.grants(Feature.Kind.EXCLUSIVE):
+            # unreleased episodes
+            condition |= has_perm & Q(public_release_date__isnull=True)
+        if plan.grants(Feature.Kind.EARLY_ACCESS):
+            # release - max(episode hours, plan hours) <= now, split into one test per side
+            early_feat = plan.get_feature(Feature.Kind.EARLY_ACCESS)
+            plan_early = (early_feat.early_access_hours or 0) if early_feat else 0
+            condition |= (Q(public_release_date__lte=now + datetime.timedelta(hours=plan_early))
+                          | Q(early_available_at__lte=now))
+        return condition
+
+    def available_for_plan(self, plan, now=None):
+        """Episodes available to `plan` right now: Episode.available_for() as a queryset filter."""
+        return self.filter(self._plan_condition(plan, now or timezone.now()))
+
+    def accessible_to(self, user, now=None, snapshot=None):
+        """
+        Episodes `user` can play right now, as one filter: available_for_plan() for each plan
+        the user holds (subscription and plan entitlements) plus object-level entitlements,
+        read from the user's entitlement snapshot (pass request.entitlements when at hand).
+        Mirrors AccessService._evaluate, so pagination and counts can run in the database.
+        """
+        if user and (getattr(user, "is_staff", False) or getattr(user, "is_superuser", False)):
+            return self.all()
+        now = now or timezone.now()
+        snapshot = snapshot or get_snapshot(user)
+        condition = Q(pk__in=snapshot.entitled_ids(self.model))
+        for plan in snapshot.plans:
+            condition |= self._plan_condition(plan, now)
+        return self.filter(condition)
+
 
 class Episode(AbstractAnalytics):
     podcast = models.ForeignKey(Podcast, on_delete=models.CASCADE, related_name="episodes")
@@ -220,6 +354,18 @@ class Episode(AbstractAnalytics):
     # new denormalized / precomputed field for fast ranking
     trend_score = models.FloatField(default=0.0, db_index=True)
 
+    # master audio duration, denormalized (see EpisodeQueryset.refresh_durations)
+    duration_seconds = models.PositiveIntegerField(default=0)
+
+    # access requirements, denormalized from the episode's and podcast's categories
+    # (see EpisodeQueryset.refresh_access_requirements and receivers.py)
+    required_tier = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True,
+                                                     help_text='Highest tier rank among the category plans')
+    tier_ids = models.JSONField(default=list, blank=True, help_text='Ids of the category plans')
+    # set in save()
+    early_available_at = models.DateTimeField(null=True, blank=True,
+                                              help_text='public_release_date minus early_access_hours')
+
     # optional categories per episode (useful if you tag individual episodes)
     categories = models.ManyToManyField(Category, related_name="episodes", blank=True)
 
@@ -245,8 +391,20 @@ class Episode(AbstractAnalytics):
     def category_qs(self) -> QuerySet[Category]:
         return self.categories.union(self.podcast.categories.all()).distinct()
 
-    def get_highest_plan_in_categories(self) -> Plan:
-        return (self.category_qs.select_related("tier").order_by("-tier__tier").first()).tier
+    def category_tiers(self) -> list[Plan]:
+        """Plans of the episode's and its podcast's categories (access checks read tier_ids instead)."""
+        if "categories" in getattr(self, "_prefetched_objects_cache", {}):
+            categories = [*self.categories.all(), *self.podcast.categories.all()]
+        else:
+            # ids only; the categories and their plans come from the registry
+            ids = {*self.categories.values_list("pk", flat=True),
+                   *Podcast.categories.through.objects.filter(
+                       podcast_id=self.podcast_id).values_list("category_id", flat=True)}
+            categories = [registry.get("categories", pk) for pk in ids]
+        return [category.tier for category in categories]
+
+    def get_highest_plan_in_categories(self) -> Plan | None:
+        return max(self.category_tiers(), key=lambda tier: tier.tier, default=None)
 
     @property
     def audio(self):
@@ -268,7 +426,8 @@ class Episode(AbstractAnalytics):
         return Comment.objects.filter_by_instance(self)
 
     def get_image(self):
-        image = _get_random(self.images)
+        # continue_listening() attaches the primary image up front
+        image = self.primary_image if hasattr(self, "primary_image") else _get_random(self.images)
         if image:
             if hasattr(image, "url"):
                 return getattr(image, "url")
@@ -278,10 +437,10 @@ class Episode(AbstractAnalytics):
         return f"{self._meta.app_label}.{self.__class__.__name__}"
 
     def get_duration(self):
-        return float(self.audio.duration)
+        return float(self.duration_seconds)
 
     def get_raw_duration(self):
-        return round(self.audio.duration)
+        return self.duration_seconds
 
     @property
     def duration(self):
@@ -293,14 +452,17 @@ class Episode(AbstractAnalytics):
         if not self.title:
             self.title = get_default_title(self)
 
+        self.early_available_at = self.public_release_date and (
+                self.public_release_date - datetime.timedelta(hours=self.early_access_hours or 0))
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"public_release_date", "early_access_hours"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "early_available_at"}
+
         super().save(*args, **kwargs)
 
     @staticmethod
-    def is_downloadable_by(user):
-        sub = Subscription.objects.active_for_user(user).order_by('-plan__tier_level').first()
-        if not sub:
-            return False
-        return bool(sub.plan.can_download)
+    def is_downloadable_by(user, snapshot=None):
+        return (snapshot or get_snapshot(user)).can_download
 
     def available_for(self, *, plan: Plan = None, now=None):
         """
@@ -321,8 +483,9 @@ class Episode(AbstractAnalytics):
         if plan is None:
             return False
 
-        has_perm = any((bool(self.get_highest_plan_in_categories().ranks_above(plan)), self.category_qs.filter(
-            tier=plan).exists()))
+        # required_tier / tier_ids stand in for the category plans (no queries)
+        has_perm = ((self.required_tier is not None and self.required_tier > plan.tier)
+                    or str(plan.pk) in self.tier_ids)
 
         # If public_release_date isn't set -> not public unless plan grants full access
         if has_perm and (not self.public_release_date):
@@ -335,21 +498,45 @@ class Episode(AbstractAnalytics):
         if has_perm and (now >= self.public_release_date):
             return True
 
-        # Determine early access window: episode override takes precedence
-        episode_early = self.early_access_hours if (self.early_access_hours is not None) else 0
+        # Unreleased and not granted above: there is no early-access window to open
+        if not self.public_release_date:
+            return False
+
+        # Determine early access window: the longer of the episode's (early_available_at)
+        # and the plan's
         plan_early = 0
         early_feat = plan.get_feature(Feature.Kind.EARLY_ACCESS)
         if early_feat:
             plan_early = early_feat.early_access_hours or 0
-        early_hours = max(episode_early, plan_early)
-
-        available_at = self.public_release_date - datetime.timedelta(hours=early_hours)
+        available_at = min(self.early_available_at or self.public_release_date,
+                           self.public_release_date - datetime.timedelta(hours=plan_early))
 
         # If plan grants the exclusive/all feature, and now >= available_at --> access
         if plan.grants(Feature.Kind.EARLY_ACCESS) and now >= available_at:
             return True
         return False
 
+    def access_boundaries(self, plans=()):
+        """
+        Every moment available_for() can flip for any of `plans`: the release itself and the
+        early-access windows of the episode and of each plan (sorted, may be in the past).
+        """
+        if not self.public_release_date:
+            return []
+        boundaries = {self.public_release_date}
+        if self.early_available_at:
+            boundaries.add(self.early_available_at)
+        for plan in plans:
+            early_feat = plan.get_feature(Feature.Kind.EARLY_ACCESS)
+            if early_feat and early_feat.early_access_hours:
+                boundaries.add(self.public_release_date - datetime.timedelta(hours=early_feat.early_access_hours))
+        return sorted(boundaries)
+
+    def next_access_boundary(self, plans=(), now=None):
+        """The next access_boundaries() moment after `now`, or None once all have passed."""
+        now = now or timezone.now()
+        return next((boundary for boundary in self.access_boundaries(plans) if boundary > now), None)
+
     def get_audio_quality(self, quality):
         audio = self.audios.filter(quality=quality).first()
         if audio:
@@ -357,29 +544,129 @@ class Episode(AbstractAnalytics):
         return self.audios.order_by("bitrate").last().file.url
 
 
-class PlayBackManager(models.Manager):
-    def get_recently_played(self, request):
+class PlayBackQuerySet(models.QuerySet):
+    # the listener's pending heartbeats ({episode_id: entry}), applied to fetched rows (see for_listener)
+    _buffered = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._buffered = self._buffered
+        return clone
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super()._fetch_all()
+        if fetched and self._buffered:
+            for row in self._result_cache:
+                if isinstance(row, self.model):
+                    self._apply_buffered(row)
+
+    def _apply_buffered(self, row):
+        entry = self._buffered.get(str(row.episode_id))
+        if entry is None:
+            return
+        at = parse_datetime(entry["at"])
+        if row.last_played_at >= at:
+            return
+        row.apply_progress(entry["seconds"], at)
+        if hasattr(row, "percent_completed"):
+            duration = row.duration_seconds
+            row.remaining_seconds = max(duration - row.current_timestamp, 0)
+            row.percent_completed = row.current_timestamp * 100 / duration if duration > 0 else 0.0
+
+    def with_buffered(self, entries):
+        clone = self._chain()
+        clone._buffered = entries
+        return clone
+
+    def with_duration(self):
+        """Annotate episode duration, remaining seconds and percent completed from the denormalized fields."""
+        duration = F("episode__duration_seconds")
+        return self.annotate(
+            duration_seconds=duration,
+            remaining_seconds=Greatest(duration - F("current_timestamp"), 0),
+            # a float, so partial percents are not truncated by integer division in SQL
+            percent_completed=models.Case(
+                models.When(episode__duration_seconds__gt=0,
+                            then=Cast("current_timestamp", models.FloatField()) * 100 / duration),
+                default=0.0,
+                output_field=models.FloatField(),
+            ),
+        )
+
+
+class PlayBackManager(models.Manager.from_queryset(PlayBackQuerySet)):
+    def for_listener(self, request):
+        """
+        The request's listener rows. Pending buffered heartbeats are applied to the fetched
+        model instances (never written, and not seen by filters, ordering or .iterator());
+        an episode with only buffered heartbeats shows up after the next flush.
+        """
         qs = self.get_queryset()
         if request.user.is_authenticated:
-            qs = qs.filter(user=request.user)
-        else:
-            qs = qs.filter(ip_address=get_client_ip(request))
-        return qs.select_related("episode").order_by("-last_played_at")
+            return qs.filter(user=request.user).with_buffered(buffers.peek(request.user, None))
+        ip_address = get_client_ip(request)
+        return qs.filter(user__isnull=True, ip_address=ip_address).with_buffered(buffers.peek(None, ip_address))
+
+    def get_recently_played(self, request):
+        return self.for_listener(request).select_related("episode").with_duration().order_by("-last_played_at")
 
     def get_uncompleted(self, request, limit=10):
         return self.get_recently_played(request).filter(is_completed=False)[:limit]
 
-    def update_progress(self, user, episode_id, ip_address, seconds, is_completed=False):
-        progress, created = self.get_queryset().update_or_create(
-            user=user,
-            ip_address=ip_address,
-            episode_id=episode_id,
-            defaults={
-                'current_timestamp': seconds,
-                'is_completed': is_completed,
-                'last_played_at': timezone.now(),
-            }
+    def continue_listening(self, request, limit=10, cursor=None):
+        """
+        One page of unfinished episodes, newest first, keyset-paginated on (last_played_at, pk).
+
+        Rows carry `percent_completed` / `remaining_seconds` (computed in SQL), the episode and
+        its podcast, and `episode.primary_image`; a page costs two queries whatever its size.
+        `cursor` is the `next_cursor` of the previous page; raises ValueError if it is malformed.
+        """
+        qs = (
+            self.for_listener(request)
+            .filter(is_completed=False)
+            .select_related("episode__podcast")
+            .with_duration()
+            .order_by("-last_played_at", "-pk")
         )
+        if cursor:
+            played_at, pk = decode_cursor(cursor)
+            qs = qs.filter(Q(last_played_at__lt=played_at) | Q(last_played_at=played_at, pk__lt=pk))
+
+        rows = list(qs[:limit + 1])
+        page, has_more = rows[:limit], len(rows) > limit
+
+        images = GenericRelationLoader(Image.objects.order_by("-timestamp", "-pk"))
+        for row, episode_images in zip(page, images.load_many(row.episode for row in page)):
+            row.episode.primary_image = episode_images[0] if episode_images else None  # newest first
+
+        last = page[-1] if page else None
+        return {
+            "results": page,
+            "next_cursor": encode_cursor(last.last_played_at, last.pk) if has_more else None,
+        }
+
+    def update_progress(self, user, episode_id, ip_address, seconds, is_completed=False):
+        listener = user if user and user.is_authenticated else None
+        if buffers.enabled() and not is_completed:
+            # heartbeats go to the write-behind buffer (see buffers.py); completions are written now
+            buffers.buffer_progress(listener, episode_id, ip_address, seconds)
+            progress = self.model(user=listener, ip_address=ip_address, episode_id=episode_id,
+                                  current_timestamp=seconds, is_completed=False, last_played_at=timezone.now())
+        else:
+            if buffers.enabled():
+                buffers.discard(listener, ip_address, episode_id)
+            # one row per signed-in user whatever their address, per address for anonymous ones
+            lookup = {"user": listener} if listener else {"user__isnull": True, "ip_address": ip_address}
+            with transaction.atomic(using=self.db):
+                progress = self.select_for_update().filter(episode_id=episode_id, **lookup).first()
+                if progress is None:
+                    progress = self.model(user=listener, episode_id=episode_id)
+                progress.ip_address = ip_address
+                progress.apply_progress(seconds, timezone.now(), is_completed=is_completed)
+                progress.save()
+        leaderboards.record_play(episode_id, listener=listener.pk if listener else ip_address,
+                                 is_completed=is_completed)
         return progress
 
 
@@ -389,7 +676,13 @@ class PlayBack(models.Model):
     episode = models.ForeignKey(Episode, on_delete=models.CASCADE)
     current_timestamp = models.IntegerField(default=0, help_text="Seconds Played")
     is_completed = models.BooleanField(default=False)
-    last_played_at = models.DateTimeField(auto_now=True)
+    # set by apply_progress to the heartbeat time (not auto_now: buffered rows are written later)
+    last_played_at = models.DateTimeField(default=timezone.now)
+    # start of the current listening session and time of the last completion, for the rollups
+    session_started_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    completed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # the retention slice this row is counted in (see analytics/retention.py)
+    retention_bucket = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
 
     objects = PlayBackManager()
 
@@ -401,13 +694,32 @@ class PlayBack(models.Model):
     def __str__(self):
         return f"{self.user} - {self.episode.title} ({self.current_timestamp}s)"
 
+    def apply_progress(self, seconds, at, is_completed=None):
+        """
+        Move the row to a heartbeat at `at`. A heartbeat more than PLAY_SESSION_SECONDS after
+        the previous one starts a new session; `is_completed=None` keeps the completion state.
+        """
+        gap = datetime.timedelta(seconds=leaderboards.PLAY_SESSION_SECONDS)
+        if self.session_started_at is None or self.last_played_at is None or at - self.last_played_at > gap:
+            self.session_started_at = at
+        if is_completed and not self.is_completed:
+            self.completed_at = at
+        if is_completed is not None:
+            self.is_completed = is_completed
+        self.current_timestamp = seconds
+        self.last_played_at = at
+
     def get_percentage_completed(self):
-        if self.episode.get_duration() > 0:
-            return round((self.current_timestamp / self.episode.get_raw_duration()) * 100)
+        if hasattr(self, "percent_completed"):
+            return round(self.percent_completed)
+        if self.episode.duration_seconds > 0:
+            return round((self.current_timestamp / self.episode.duration_seconds) * 100)
         return 0
 
     def get_remaining_minutes(self):
-        return round(self.episode.get_raw_duration() - self.current_timestamp)
+        if hasattr(self, "remaining_seconds"):
+            return self.remaining_seconds
+        return round(self.episode.duration_seconds - self.current_timestamp)
 
 
 class Summary(models.Model):
@@ -1,48 +1,120 @@
+from collections import defaultdict
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.db.models import (
-    Count, F, FloatField, IntegerField, OuterRef, Subquery, Value, ExpressionWrapper
+    Count, F, FloatField, Value, ExpressionWrapper
 )
 from django.db.models import Q
 from django.db.models import Sum
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-from apps.analytics.models import ObjectView
+from apps.analytics.models import EpisodeHourlyActivity, PodcastHourlyActivity, view_object_pk
+from apps.analytics.rollups import hours_ago
 from apps.category.models import Category
 from apps.media.models import PlayList
 from apps.promotions.models import HandPickedPostList
-from .models import Episode, Podcast, PlayBack
+from . import leaderboards
+from .models import Episode, Podcast
+
+# read trending shelves from the streaming leaderboards instead of the hourly rollups
+REALTIME_TRENDING = getattr(settings, "TRENDING_REALTIME", False)
+
+
+def _rank(stats, queryset, limit, fill_order):
+    """
+    Hydrate ranked rollup rows (dicts with an "object_id" key) into model instances,
+    keeping their order and exposing the row values as attributes. When fewer than
+    `limit` objects had activity, fill up from `queryset` ordered by `fill_order`.
+    """
+    rows = list(stats[:limit])
+    ids = [r["object_id"] for r in rows]
+    objects = queryset.in_bulk(ids)
+    results = []
+    for row in rows:
+        obj = objects.get(row["object_id"])
+        if obj is None:
+            continue
+        for name, value in row.items():
+            if name != "object_id":
+                setattr(obj, name, value)
+        results.append(obj)
+    if len(results) < limit:
+        results.extend(queryset.exclude(pk__in=ids).order_by(*fill_order)[:limit - len(results)])
+    return results
+
 
-now = timezone.now()
+def _ranked_ids(stats, queryset, limit, fill_order):
+    """Same ranking as _rank, but only the primary keys (no rows are loaded)."""
+    ids = [r["object_id"] for r in stats[:limit]]
+    if len(ids) < limit:
+        ids.extend(queryset.exclude(pk__in=ids).order_by(*fill_order).values_list("pk", flat=True)[:limit - len(ids)])
+    return ids
 
 
-def trending_episodes(limit=24):
-    since_24h = now - timedelta(hours=24)
-    since_7d = now - timedelta(days=7)
+def _from_leaderboard(board, queryset, limit, now, fallback):
+    ranked = board.top(limit, now=now)
+    to_pk = queryset.model._meta.pk.to_python
+    objects = queryset.in_bulk([to_pk(pk) for pk, _ in ranked])
+    results = []
+    for pk, score in ranked:
+        obj = objects.get(to_pk(pk))
+        if obj is not None:
+            obj.trend_score_calc = score
+            results.append(obj)
+    if len(results) < limit:
+        seen = {obj.pk for obj in results}
+        results.extend([obj for obj in fallback(limit, now) if obj.pk not in seen][:limit - len(results)])
+    return results
 
-    plays_24q = PlayBack.objects.filter(
-        episode=OuterRef("pk"),
-        last_played_at__gte=since_24h,
-    ).values("episode").annotate(c=Count("id")).values("c")
 
-    plays_7dq = PlayBack.objects.filter(
-        episode=OuterRef("pk"),
-        last_played_at__gte=since_7d,
-    ).values("episode").annotate(c=Count("id")).values("c")
+def _ids_from_leaderboard(board, model, limit, now, fallback):
+    to_pk = model._meta.pk.to_python
+    ids = [to_pk(pk) for pk, _ in board.top(limit, now=now)]
+    if len(ids) < limit:
+        seen = set(ids)
+        ids.extend([pk for pk in fallback(limit, now) if pk not in seen][:limit - len(ids)])
+    return ids
 
-    completions_q = PlayBack.objects.filter(
-        episode=OuterRef("pk"),
-        is_completed=True,
-    ).values("episode").annotate(c=Count("id")).values("c")
 
-    qs = Episode.objects.select_related("podcast").annotate(
-        plays_24h=Coalesce(Subquery(plays_24q, output_field=IntegerField()), Value(0)),
-        plays_7d=Coalesce(Subquery(plays_7dq, output_field=IntegerField()), Value(0)),
-        completions=Coalesce(Subquery(completions_q, output_field=IntegerField()), Value(0)),
-        stored_trend=Coalesce(F("trend_score"), Value(0.0)),
-    )
+def trending_episodes(limit=24, now=None, realtime=None):
+    realtime = REALTIME_TRENDING if realtime is None else realtime
+    if realtime:
+        return _from_leaderboard(leaderboards.episode_leaderboard, Episode.objects.select_related("podcast"),
+                                 limit, now, fallback=_trending_episodes_from_rollups)
+    return _trending_episodes_from_rollups(limit, now)
+
+
+def trending_podcasts(limit=20, now=None, realtime=None):
+    realtime = REALTIME_TRENDING if realtime is None else realtime
+    if realtime:
+        return _from_leaderboard(leaderboards.podcast_leaderboard, Podcast.objects.all(),
+                                 limit, now, fallback=_trending_podcasts_from_rollups)
+    return _trending_podcasts_from_rollups(limit, now)
+
+
+def trending_episode_ids(limit=24, now=None, realtime=None):
+    realtime = REALTIME_TRENDING if realtime is None else realtime
+    if realtime:
+        return _ids_from_leaderboard(leaderboards.episode_leaderboard, Episode, limit, now,
+                                     fallback=_trending_episode_ids_from_rollups)
+    return _trending_episode_ids_from_rollups(limit, now)
+
+
+def trending_podcast_ids(limit=20, now=None, realtime=None):
+    realtime = REALTIME_TRENDING if realtime is None else realtime
+    if realtime:
+        return _ids_from_leaderboard(leaderboards.podcast_leaderboard, Podcast, limit, now,
+                                     fallback=_trending_podcast_ids_from_rollups)
+    return _trending_podcast_ids_from_rollups(limit, now)
+
+
+def _episode_trend_stats(now=None):
+    """Rank episodes by summing hourly activity buckets (see analytics.tasks.rollup_hourly_activity)."""
+    since_24h = hours_ago(24, now)
+    since_7d = hours_ago(24 * 7, now)
 
     score = ExpressionWrapper(
         F("plays_24h") * 4.0 +
@@ -53,38 +125,21 @@ def trending_episodes(limit=24):
     )
 
     return (
-        qs.annotate(trend_score_calc=score)
+        EpisodeHourlyActivity.objects
+        .filter(bucket__gte=since_7d)
+        .values(object_id=F("episode_id"), stored_trend=Coalesce(F("episode__trend_score"), Value(0.0)))
+        .annotate(
+            plays_24h=Coalesce(Sum("plays", filter=Q(bucket__gte=since_24h)), 0),
+            plays_7d=Sum("plays"),
+            completions=Sum("completions"),
+        )
+        .annotate(trend_score_calc=score)
         .order_by("-trend_score_calc", "-plays_24h", "-completions")
-        [:limit]
     )
 
 
-def trending_podcasts(limit=20):
-    since_7d = now - timedelta(days=7)
-
-    podcast_ct = ContentType.objects.get_for_model(Podcast)
-
-    views_7dq = ObjectView.objects.filter(
-        content_type=podcast_ct,
-        object_id=OuterRef("pk"),
-        timestamp__gte=since_7d,
-    ).values("object_id").annotate(c=Count("id")).values("c")
-
-    episode_plays_q = PlayBack.objects.filter(
-        episode__podcast=OuterRef("pk"),
-        last_played_at__gte=since_7d,
-    ).values("episode__podcast").annotate(c=Count("id")).values("c")
-
-    completions_q = PlayBack.objects.filter(
-        episode__podcast=OuterRef("pk"),
-        is_completed=True,
-    ).values("episode__podcast").annotate(c=Count("id")).values("c")
-
-    qs = Podcast.objects.annotate(
-        views_7d=Coalesce(Subquery(views_7dq, output_field=IntegerField()), Value(0)),
-        plays_7d=Coalesce(Subquery(episode_plays_q, output_field=IntegerField()), Value(0)),
-        completions=Coalesce(Subquery(completions_q, output_field=IntegerField()), Value(0)),
-    )
+def _podcast_trend_stats(now=None):
+    since_7d = hours_ago(24 * 7, now)
 
     score = ExpressionWrapper(
         F("views_7d") * 1.0 +
@@ -93,25 +148,71 @@ def trending_podcasts(limit=20):
         output_field=FloatField(),
     )
 
-    return qs.annotate(trend_score_calc=score).order_by("-trend_score_calc")[:limit]
+    return (
+        PodcastHourlyActivity.objects
+        .filter(bucket__gte=since_7d)
+        .values(object_id=F("podcast_id"))
+        .annotate(
+            views_7d=Sum("views"),
+            plays_7d=Sum("plays"),
+            completions=Sum("completions"),
+        )
+        .annotate(trend_score_calc=score)
+        .order_by("-trend_score_calc")
+    )
+
+
+EPISODE_TREND_FILL = ("-trend_score", "-timestamp")
+PODCAST_TREND_FILL = ("-view_count", "-timestamp")
+
+
+def _trending_episodes_from_rollups(limit, now=None):
+    return _rank(_episode_trend_stats(now), Episode.objects.select_related("podcast"), limit, EPISODE_TREND_FILL)
+
+
+def _trending_podcasts_from_rollups(limit, now=None):
+    return _rank(_podcast_trend_stats(now), Podcast.objects.all(), limit, PODCAST_TREND_FILL)
+
+
+def _trending_episode_ids_from_rollups(limit, now=None):
+    return _ranked_ids(_episode_trend_stats(now), Episode.objects.all(), limit, EPISODE_TREND_FILL)
+
+
+def _trending_podcast_ids_from_rollups(limit, now=None):
+    return _ranked_ids(_podcast_trend_stats(now), Podcast.objects.all(), limit, PODCAST_TREND_FILL)
 
 
 def new_releases(limit=24):
     return Episode.objects.select_related('podcast').order_by('-timestamp')[:limit]
 
 
-def editor_picked_episodes(limit=24):
-    # If you use HandPickedPostList which stores podcasts via OrderedPodcast:
-    lists = HandPickedPostList.objects.prefetch_related('podcasts')
-    results = []
-    for lst in lists:
+def new_release_ids(limit=24):
+    return list(Episode.objects.order_by('-timestamp').values_list('pk', flat=True)[:limit])
+
+
+def _editor_picked_podcast_ids():
+    podcast_ids = []
+    for lst in HandPickedPostList.objects.prefetch_related('podcasts'):
         podcasts = lst.get_ordered_podcasts() if hasattr(lst, 'get_ordered_podcasts') else lst.podcasts.all()
-        for p in podcasts:
-            eps = p.episodes.order_by('-timestamp')[:2]
-            results.extend(eps)
-            if len(results) >= limit:
-                return results[:limit]
-    return results[:limit]
+        podcast_ids.extend(p.pk for p in podcasts if p.pk not in podcast_ids)
+    return podcast_ids
+
+
+def editor_picked_episodes(limit=24, per_podcast=2):
+    # latest episodes of every hand-picked podcast in one query, kept in list order
+    podcast_ids = _editor_picked_podcast_ids()
+    by_podcast = defaultdict(list)
+    for episode in Episode.objects.select_related('podcast').latest_per_podcast(podcast_ids, per_podcast):
+        by_podcast[episode.podcast_id].append(episode)
+    return [e for pk in podcast_ids for e in by_podcast[pk]][:limit]
+
+
+def editor_picked_episode_ids(limit=24, per_podcast=2):
+    podcast_ids = _editor_picked_podcast_ids()
+    by_podcast = defaultdict(list)
+    for pk, podcast_id in Episode.objects.latest_per_podcast(podcast_ids, per_podcast).values_list('pk', 'podcast_id'):
+        by_podcast[podcast_id].append(pk)
+    return [pk for podcast_id in podcast_ids for pk in by_podcast[podcast_id]][:limit]
 
 
 def top_playlists(limit=20):
@@ -120,8 +221,28 @@ def top_playlists(limit=20):
 
 
 def popular_podcasts_by_category(category_slug, limit=12):
-    return Podcast.objects.filter(categories__slug=category_slug).annotate(total_views=F('view_count')).order_by(
-        '-total_views')[:limit]
+    # trending in the category first, then lifetime views
+    return Podcast.objects.popular_by_category(category_slug)[:limit]
+
+
+def _in_order(queryset, ids, limit):
+    to_pk = queryset.model._meta.pk.to_python
+    objects = queryset.in_bulk([to_pk(pk) for pk in ids[:limit]])
+    return [objects[to_pk(pk)] for pk in ids[:limit] if to_pk(pk) in objects]
+
+
+def trending_episodes_in_scope(scope, scope_id, limit=24):
+    """
+    Trending episodes for a hub: scope is "category" (scope_id = slug), "country",
+    "competition" or "team" (scope_id = pk). See tasks.refresh_scoped_trending.
+    """
+    ids = leaderboards.scoped_trending_ids("episodes", scope, scope_id)
+    return _in_order(Episode.objects.select_related("podcast"), ids, limit)
+
+
+def trending_podcasts_in_scope(scope, scope_id, limit=20):
+    ids = leaderboards.scoped_trending_ids("podcasts", scope, scope_id)
+    return _in_order(Podcast.objects.all(), ids, limit)
 
 
 def personalized_recommendations(user, limit=24):
@@ -132,10 +253,13 @@ def personalized_recommendations(user, limit=24):
         return trending + new
 
     # get recent user views
-    since_90d = now - timedelta(days=90)
-    viewed_episode_ids = user.object_views.filter(timestamp__gte=since_90d,
-                                                  content_type=ContentType.objects.get_for_model(Episode)).values_list(
-        'object_id', flat=True)
+    since_90d = timezone.now() - timedelta(days=90)
+    viewed_episode_ids = [
+        view_object_pk(Episode, object_id)
+        for object_id in user.object_views.filter(
+            timestamp__gte=since_90d, content_type=ContentType.objects.get_for_model(Episode)
+        ).order_by().values_list('object_id', flat=True).distinct()
+    ]
 
     # category affinity (from episodes or podcasts)
     cat_qs = Category.objects.filter(episodes__id__in=viewed_episode_ids).annotate(score=Count('episodes')).order_by(
@@ -1,8 +1,13 @@
-from django.db.models.signals import post_save
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 
-from .models import PlayBack
-from apps.recommendation.cache import invalidate_user_recommendations
+from .models import PlayBack, Episode, Podcast
+from apps.category.models import Category
+from apps.category.registry import registry
+from apps.memberships.access import AccessService
+from apps.memberships.models import Plan
+from apps.recommendation.cache import invalidate_user_recommendations, invalidate_cards, EPISODES, PODCASTS
 
 
 @receiver(post_save, sender=PlayBack)
@@ -13,6 +18,121 @@ def invalidate_user_recommendations_receiver(sender, instance, **kwargs):
     invalidate_user_recommendations(user.id)
 
 
+@receiver(post_save, sender=Episode)
+@receiver(post_delete, sender=Episode)
+def invalidate_episode_card_receiver(sender, instance, **kwargs):
+    invalidate_cards(EPISODES, instance.pk)
+
+
+@receiver(post_save, sender=Episode)
+@receiver(post_delete, sender=Episode)
+def refresh_podcast_totals_receiver(sender, instance, created=False, **kwargs):
+    # durations themselves move with the master audio (see audio.receivers)
+    if created or kwargs.get("signal") is post_delete:
+        Podcast.objects.filter(pk=instance.podcast_id).refresh_totals()
+    elif getattr(instance, "_podcast_moved", False):
+        # the episode's duration and count move from the old podcast to the new one
+        Podcast.objects.filter(pk__in=[instance._previous_podcast_id, instance.podcast_id]).refresh_totals()
+
+
+# Episode.required_tier / tier_ids follow the episode's and its podcast's categories
+
+def _categorised_episodes(category):
+    return Episode.objects.filter(Q(categories=category) | Q(podcast__categories=category)).distinct()
+
+
+def _tiered_episodes(plan):
+    return Episode.objects.filter(Q(categories__tier=plan) | Q(podcast__categories__tier=plan)).distinct()
+
+
+def _refresh_access(episodes):
+    # recompute the requirements, then retire the cached access results built on them
+    pks = list(episodes.values_list("pk", flat=True))
+    Episode.objects.filter(pk__in=pks).refresh_access_requirements()
+    AccessService.get_instance().invalidate_objects(Episode, pks)
+
+
+@receiver(pre_save, sender=Episode)
+def episode_podcast_moved_receiver(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or (update_fields is not None and not {"podcast", "podcast_id"} & update_fields):
+        instance._podcast_moved = False
+        return
+    previous = Episode.objects.filter(pk=instance.pk).values_list("podcast_id", flat=True).first()
+    instance._previous_podcast_id = previous
+    instance._podcast_moved = previous is not None and previous != instance.podcast_id
+
+
+@receiver(post_save, sender=Episode)
+def episode_access_requirements_receiver(sender, instance, created=False, **kwargs):
+    if created:
+        # a new episode inherits its podcast's categories
+        Episode.objects.filter(pk=instance.pk).refresh_access_requirements()
+    elif getattr(instance, "_podcast_moved", False):
+        # it now inherits the new podcast's categories instead
+        _refresh_access(Episode.objects.filter(pk=instance.pk))
+    else:
+        # release date / early-access hours may have moved
+        AccessService.get_instance().invalidate_object(instance)
+
+
+@receiver(m2m_changed, sender=Episode.categories.through)
+@receiver(m2m_changed, sender=Podcast.categories.through)
+def categories_changed_receiver(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        # the category side loses its rows before post_clear can see them
+        instance._cleared_episode_ids = list(_categorised_episodes(instance).values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse and action == "post_clear":
+        episodes = Episode.objects.filter(pk__in=getattr(instance, "_cleared_episode_ids", []))
+    elif reverse and sender is Episode.categories.through:
+        episodes = Episode.objects.filter(pk__in=pk_set)
+    elif reverse:
+        episodes = Episode.objects.filter(podcast__in=pk_set)
+    elif isinstance(instance, Episode):
+        episodes = Episode.objects.filter(pk=instance.pk)
+    else:
+        episodes = Episode.objects.filter(podcast=instance)
+    _refresh_access(episodes)
+
+
+@receiver(post_save, sender=Category)
+def category_tier_receiver(sender, instance, created=False, **kwargs):
+    # a new category has no episodes yet; an edited one may have moved tier
+    if not created:
+        # the refresh reads tiers from the registry, which may not have seen this save yet
+        registry.invalidate()
+        _refresh_access(_categorised_episodes(instance))
+
+
+@receiver(post_save, sender=Plan)
+def plan_tier_receiver(sender, instance, created=False, **kwargs):
+    # required_tier holds the rank of the category plans: it moves with Plan.tier
+    if not created:
+        registry.invalidate()
+        _refresh_access(_tiered_episodes(instance))
+
+
+@receiver(pre_delete, sender=Category)
+def category_pre_delete_receiver(sender, instance, **kwargs):
+    instance._cleared_episode_ids = list(_categorised_episodes(instance).values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def category_post_delete_receiver(sender, instance, **kwargs):
+    _refresh_access(Episode.objects.filter(pk__in=getattr(instance, "_cleared_episode_ids", [])))
+
+
+@receiver(post_save, sender=Podcast)
+@receiver(post_delete, sender=Podcast)
+def invalidate_podcast_card_receiver(sender, instance, **kwargs):
+    invalidate_cards(PODCASTS, instance.pk)
+    # episode cards embed podcast details, so they go stale with it
+    if kwargs.get("signal") is post_save:
+        invalidate_cards(EPISODES, *instance.episodes.values_list("pk", flat=True))
+
+
 # from profiles.models import Profile
 # @receiver(post_save, sender=Profile)
 # def on_subscription_change(sender, instance, **kwargs):
@@ -1,9 +1,32 @@
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
 from celery import shared_task, Task
-from django.db import transaction
-from django.db.models import Count, Q
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import timedelta
-from .models import Episode, PlayBack
+
+from apps.analytics.models import EpisodeHourlyActivity, PodcastHourlyActivity
+from apps.analytics.rollups import hours_ago, lock_cursor
+from apps.category.registry import registry
+from apps.memberships.access import AccessService
+from apps.memberships.snapshot import plan_grant, warm_snapshots
+from . import buffers, leaderboards
+from .models import Episode, Podcast, PlayBack, User
+
+# AbstractAnalytics relations that get their own trending lists, besides categories
+SCOPE_RELATIONS = {"country": "countries", "competition": "competitions", "team": "teams"}
+
+# access boundary warmup (see schedule_access_boundaries)
+BOUNDARY_CURSOR = "access_boundaries"
+BOUNDARY_HORIZON_MINUTES = getattr(settings, "ACCESS_BOUNDARY_HORIZON_MINUTES", 10)
+WARMUP_LISTENER_DAYS = getattr(settings, "ACCESS_WARMUP_LISTENER_DAYS", 30)
+# per podcast and boundary: each cold snapshot is two queries, built inside a beat task
+WARMUP_MAX_LISTENERS = getattr(settings, "ACCESS_WARMUP_MAX_LISTENERS", 500)
+
 
 class BaseTaskWithRetry(Task):
     autoretry_for = (Exception,)
@@ -12,40 +35,247 @@ class BaseTaskWithRetry(Task):
     acks_late = True
 
 
-@shared_task(bind=True, base=BaseTaskWithRetry)
-def recalc_episode_trending():
-    now = timezone.now()
-    since_24h = now - timedelta(hours=24)
-    since_7d = now - timedelta(days=7)
+# episode trend score = plays_24h * 4.0 + plays_7d * 1.5 + completions_7d * 2.0 (see queries.trending_episodes)
+def _trend_sql_params(now):
+    return hours_ago(24, now), hours_ago(24 * 7, now)
+
+
+def _recalc_trending_postgres(now):
+    """One set-based UPDATE ... FROM (aggregate) touching only rows whose score changes."""
+    since_24h, since_7d = _trend_sql_params(now)
+    episode_table = Episode._meta.db_table
+    activity_table = EpisodeHourlyActivity._meta.db_table
+    sql = f"""
+    WITH agg AS (
+        SELECT a.episode_id AS id,
+               SUM(CASE WHEN a.bucket >= %s THEN a.plays ELSE 0 END) * 4.0
+               + SUM(a.plays) * 1.5
+               + SUM(a.completions) * 2.0 AS score
+        FROM {activity_table} a
+        WHERE a.bucket >= %s
+        GROUP BY a.episode_id
+    ),
+    delta AS (
+        SELECT id, score FROM agg
+        UNION ALL
+        -- episodes that fell out of the window decay to zero
+        SELECT e.id, 0.0 FROM {episode_table} e
+        WHERE e.trend_score > 0 AND NOT EXISTS (SELECT 1 FROM agg WHERE agg.id = e.id)
+    ),
+    updated AS (
+        UPDATE {episode_table} e
+        SET trend_score = delta.score
+        FROM delta
+        WHERE e.id = delta.id AND e.trend_score <> delta.score
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM delta), (SELECT COUNT(*) FROM updated);
+    """
+    with connection.cursor() as cur:
+        cur.execute(sql, [since_24h, since_7d])
+        scanned, written = cur.fetchone()
+    return {"scanned": scanned, "written": written}
+
 
-    # Aggregate playback stats in one pass
+def _recalc_trending_batched(now, batch_size=1000):
+    """Portable fallback: same delta, applied with batched bulk_update of changed rows only."""
+    since_24h, since_7d = _trend_sql_params(now)
     aggregates = (
-        PlayBack.objects
-        .filter(last_played_at__gte=since_7d)
+        EpisodeHourlyActivity.objects
+        .filter(bucket__gte=since_7d)
         .values("episode_id")
         .annotate(
-            plays_7d=Count("id"),
-            plays_24h=Count("id", filter=Q(last_played_at__gte=since_24h)),
-            completions=Count("id", filter=Q(is_completed=True)),
+            plays_24h=Coalesce(Sum("plays", filter=Q(bucket__gte=since_24h)), 0),
+            plays_7d=Sum("plays"),
+            completions=Sum("completions"),
         )
     )
+    scores = {
+        a["episode_id"]: a["plays_24h"] * 4.0 + a["plays_7d"] * 1.5 + a["completions"] * 2.0
+        for a in aggregates
+    }
+    stale = Episode.objects.filter(trend_score__gt=0).exclude(pk__in=list(scores)).values_list("pk", flat=True)
+    candidates = list(scores) + list(stale)
+
+    written = 0
+    for i in range(0, len(candidates), batch_size):
+        batch = candidates[i:i + batch_size]
+        changed = []
+        for ep in Episode.objects.filter(pk__in=batch).only("id", "trend_score"):
+            score = scores.get(ep.id, 0.0)
+            if ep.trend_score != score:
+                ep.trend_score = score
+                changed.append(ep)
+        with transaction.atomic():
+            Episode.objects.bulk_update(changed, ["trend_score"])
+        written += len(changed)
+    return {"scanned": len(candidates), "written": written}
+
+
+@shared_task(bind=True, base=BaseTaskWithRetry)
+def recalc_episode_trending(self):
+    """
+    Refresh Episode.trend_score from the hourly rollups, writing only episodes with
+    activity in the window or that just fell out of it (and only if the score changed).
+    Returns rows scanned / written.
+    """
+    now = timezone.now()
+    if connection.vendor == "postgresql":
+        stats = _recalc_trending_postgres(now)
+    else:
+        stats = _recalc_trending_batched(now)
+
+    stats["scopes"] = refresh_scoped_trending(now=now)
+    return stats
+
+
+@shared_task
+def rebase_trending_leaderboards():
+    """Move the real-time leaderboards to a fresh epoch so their scores stay small."""
+    leaderboards.rebase_all()
 
-    agg_map = {a["episode_id"]: a for a in aggregates}
 
-    episodes = Episode.objects.only("id", "trend_score")
+def _scopes(model, ids):
+    """{pk: {(scope, scope_id), ...}} covering category slugs and SCOPE_RELATIONS for `ids`."""
+    scopes = defaultdict(set)
+    if not ids:
+        return scopes
+    relations = {"category": ("categories", "slug")}
+    relations.update({scope: (field, "pk") for scope, field in SCOPE_RELATIONS.items()})
+    for scope, (field_name, target_attr) in relations.items():
+        field = model._meta.get_field(field_name)
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        rows = field.remote_field.through.objects.filter(**{f"{source}_id__in": ids}).values_list(
+            f"{source}_id", f"{target}__{target_attr}")
+        for pk, scope_id in rows:
+            scopes[pk].add((scope, scope_id))
+    return scopes
 
-    updates = []
-    for ep in episodes:
-        stats = agg_map.get(ep.id, {})
-        score = (
-            stats.get("plays_24h", 0) * 4.0 +
-            stats.get("plays_7d", 0) * 1.5 +
-            stats.get("completions", 0) * 2.0
+
+def refresh_scoped_trending(now=None, size=leaderboards.SCOPED_TRENDING_SIZE):
+    """
+    One pass over the hourly rollups: score every active episode and podcast, fan each
+    out to the scopes of the episode and its podcast, and keep the top `size` per scope.
+    """
+    since_24h = hours_ago(24, now)
+    since_7d = hours_ago(24 * 7, now)
+
+    episode_rows = (
+        EpisodeHourlyActivity.objects
+        .filter(bucket__gte=since_7d)
+        .values("episode_id", "episode__podcast_id")
+        .annotate(
+            plays_24h=Coalesce(Sum("plays", filter=Q(bucket__gte=since_24h)), 0),
+            plays_7d=Sum("plays"),
+            completions=Sum("completions"),
         )
-        ep.trend_score = score
-        updates.append(ep)
+    )
+    episodes = {
+        r["episode_id"]: (r["episode__podcast_id"], r["plays_24h"] * 4.0 + r["plays_7d"] * 1.5 + r["completions"] * 2.0)
+        for r in episode_rows
+    }
+    podcast_rows = (
+        PodcastHourlyActivity.objects
+        .filter(bucket__gte=since_7d)
+        .values("podcast_id")
+        .annotate(views=Sum("views"), plays=Sum("plays"), completions=Sum("completions"))
+    )
+    podcasts = {r["podcast_id"]: r["views"] * 1.0 + r["plays"] * 2.5 + r["completions"] * 3.0 for r in podcast_rows}
+
+    episode_scopes = _scopes(Episode, list(episodes))
+    podcast_scopes = _scopes(Podcast, list(set(podcasts) | {podcast_id for podcast_id, _ in episodes.values()}))
+
+    ranked = defaultdict(list)
+    for pk, (podcast_id, score) in episodes.items():
+        for scope, scope_id in episode_scopes[pk] | podcast_scopes[podcast_id]:
+            ranked[leaderboards.scope_key("episodes", scope, scope_id)].append((score, pk))
+    for pk, score in podcasts.items():
+        for scope, scope_id in podcast_scopes[pk]:
+            ranked[leaderboards.scope_key("podcasts", scope, scope_id)].append((score, pk))
+
+    lists = {key: [str(pk) for _, pk in heapq.nlargest(size, entries)] for key, entries in ranked.items()}
+    return leaderboards.store_scoped_trending(lists)
+
+
+@shared_task
+def flush_playback_buffer():
+    """Write buffered playback heartbeats to PlayBack (schedule every few seconds from beat)."""
+    return {"written": buffers.flush()}
+
 
+def access_boundaries(start, end):
+    """
+    [(boundary, episode)] for every moment in (start, end] at which an episode's availability
+    flips for some plan: releases, episode early-access windows and each plan's window.
+    """
+    plans = [plan_grant(plan) for plan in registry.plans]
+    window = Q(public_release_date__gt=start, public_release_date__lte=end) | Q(
+        early_available_at__gt=start, early_available_at__lte=end)
+    for hours in {plan.early_access_hours for plan in plans if plan.early_access_hours}:
+        # plan windows open `hours` before the release
+        window |= Q(public_release_date__gt=start + timedelta(hours=hours),
+                    public_release_date__lte=end + timedelta(hours=hours))
+    return sorted(
+        ((boundary, episode)
+         for episode in Episode.objects.filter(window).only(
+            "pk", "podcast_id", "public_release_date", "early_access_hours", "early_available_at")
+         for boundary in episode.access_boundaries(plans) if start < boundary <= end),
+        key=lambda pair: pair[0],
+    )
+
+
+def _recent_listeners(podcast_id, now):
+    """Signed-in users who played the podcast lately: the likely crowd at its next drop."""
+    user_ids = (
+        PlayBack.objects
+        .filter(episode__podcast_id=podcast_id, user__isnull=False,
+                last_played_at__gte=now - timedelta(days=WARMUP_LISTENER_DAYS))
+        .values("user_id").annotate(last=Max("last_played_at")).order_by("-last")
+        .values_list("user_id", flat=True)[:WARMUP_MAX_LISTENERS]
+    )
+    return list(User.objects.filter(pk__in=list(user_ids)))
+
+
+@shared_task
+def schedule_access_boundaries():
+    """
+    Run every few minutes from beat. For each availability boundary in the next
+    ACCESS_BOUNDARY_HORIZON_MINUTES: build the entitlement snapshots of the podcast's recent
+    listeners now (the most recent WARMUP_MAX_LISTENERS, skipping snapshots already cached),
+    and schedule fire_access_boundary for the boundary itself. Access results already expire at
+    the boundary (AccessService._ttl); this keeps the drop from turning into a stampede of
+    snapshot builds.
+    """
+    now = timezone.now()
     with transaction.atomic():
-        Episode.objects.bulk_update(updates, ["trend_score"])
+        cursor = lock_cursor(BOUNDARY_CURSOR, default=now)
+        start, end = max(cursor.position, now), now + timedelta(minutes=BOUNDARY_HORIZON_MINUTES)
+        boundaries = access_boundaries(start, end)
+        cursor.position = end
+        cursor.save(update_fields=["position", "updated"])
+
+    warmed, built = set(), 0
+    for boundary, episode in boundaries:
+        if episode.podcast_id not in warmed:
+            warmed.add(episode.podcast_id)
+            built += warm_snapshots(_recent_listeners(episode.podcast_id, now))
+        fire_access_boundary.apply_async((episode.pk,), eta=boundary)
+    return {"boundaries": len(boundaries), "podcasts": len(warmed), "snapshots": built}
+
 
-    return len(updates)
+@shared_task
+def fire_access_boundary(episode_id):
+    """
+    At an availability boundary: retire every cached result for the episode (entries computed
+    with a plan the TTL didn't know about) and recompute them for its likely listeners.
+    """
+    episode = Episode.objects.filter(pk=episode_id).first()
+    if episode is None:
+        return {"warmed": 0}
+    service = AccessService.get_instance()
+    service.invalidate_object(episode)
+    listeners = _recent_listeners(episode.podcast_id, timezone.now())
+    warm_snapshots(listeners)
+    for user in listeners:
+        service.has_access_many(user, [episode])
+    return {"warmed": len(listeners)}
@@ -0,0 +1,243 @@
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.category.models import Category
+from apps.memberships.access import AccessService
+from apps.memberships.models import Entitlement, Feature, Plan
+from apps.memberships.snapshot import EntitlementSnapshot, PlanGrant, build_snapshot, get_snapshot
+from apps.posts.podcasts.models import Episode, Podcast
+
+
+class AccessibleToMatchesAvailableForTests(TestCase):
+    """
+    Property test: available_for_plan() selects exactly the episodes available_for() accepts,
+    and accessible_to(user) exactly those AccessService grants the user.
+    """
+    ROUNDS = 5
+
+    def _plan(self, rng, tier):
+        plan = Plan.objects.create(name=f"Tier {tier}", tier=tier)
+        kinds = {kind for kind in (Feature.Kind.EXCLUSIVE, Feature.Kind.EARLY_ACCESS) if rng.random() < 0.5}
+        early = SimpleNamespace(early_access_hours=rng.choice([None, 0, 6, 48]))
+        # feature rows are plan configuration; both code paths read them through these two methods
+        plan.grants = lambda *wanted: all(kind in kinds for kind in wanted)
+        plan.get_feature = lambda kind: early if kind in kinds else None
+        return plan
+
+    def test_randomized_catalogues(self):
+        for seed in range(self.ROUNDS):
+            with self.subTest(seed=seed):
+                rng = random.Random(seed)
+                now = datetime(2026, 6, 1, 12, tzinfo=dt_timezone.utc)
+                plans = [self._plan(rng, tier) for tier in range(1, 4)]
+                categories = [Category.objects.create(name=f"Category {i}", tier=rng.choice(plans)) for i in range(4)]
+                podcasts = [Podcast.objects.create(title=f"Podcast {i}") for i in range(3)]
+                for podcast in podcasts:
+                    podcast.categories.set(rng.sample(categories, rng.randint(0, 2)))
+                episodes = []
+                for i in range(25):
+                    episode = Episode.objects.create(
+                        podcast=rng.choice(podcasts),
+                        title=f"Episode {i}",
+                        public_release_date=rng.choice([None, now + timedelta(hours=rng.randint(-72, 72))]),
+                        exclusive=rng.random() < 0.5,
+                        early_access_hours=rng.choice([None, 0, 12, 96]),
+                    )
+                    episode.categories.set(rng.sample(categories, rng.randint(0, 2)))
+                    episodes.append(episode.pk)
+                # reload: the receivers wrote the access requirements to the rows
+                episodes = list(Episode.objects.filter(pk__in=episodes))
+
+                for plan in plans:
+                    expected = {e.pk for e in episodes if e.available_for(plan=plan, now=now)}
+                    actual = set(Episode.objects.available_for_plan(plan, now).values_list("pk", flat=True))
+                    self.assertEqual(actual, expected, f"plan tier {plan.tier}")
+
+                # users holding any mix of plans and episode entitlements, including neither
+                episode_ct = ContentType.objects.get_for_model(Episode).pk
+                for holder in range(4):
+                    held = rng.sample(plans, rng.randint(0, 2))
+                    entitled = rng.sample(episodes, rng.randint(0, 3))
+                    snapshot = EntitlementSnapshot(
+                        user_id=holder, plans=tuple(PlanGrant.from_plan(plan) for plan in held),
+                        objects=frozenset((episode_ct, str(e.pk)) for e in entitled))
+                    expected = {e.pk for e in episodes if AccessService._evaluate(None, e, snapshot, now)}
+                    actual = set(Episode.objects.accessible_to(None, now, snapshot=snapshot).values_list("pk", flat=True))
+                    self.assertEqual(actual, expected, f"tiers {[plan.tier for plan in held]}, {len(entitled)} entitled")
+
+                Episode.objects.all().delete()
+                Podcast.objects.all().delete()
+                Category.objects.all().delete()
+                Plan.objects.all().delete()
+
+
+class AccessibleToEntitlementTests(TestCase):
+    def test_episode_entitlement_alone_grants_access(self):
+        cache.clear()
+        User = get_user_model()
+        user = User._default_manager.create(**{User.USERNAME_FIELD: "fan@example.com"})
+        podcast = Podcast.objects.create(title="Podcast")
+        podcast.categories.add(Category.objects.create(name="Premium", tier=Plan.objects.create(name="Premium", tier=2)))
+        episodes = [Episode.objects.create(podcast=podcast, title=f"Episode {i}", exclusive=True) for i in range(2)]
+        Entitlement.objects.create(user=user, content_type=ContentType.objects.get_for_model(Episode),
+                                   object_id=str(episodes[0].pk))
+
+        service = AccessService(cache_backend=cache)
+        self.assertEqual([service.has_access(user, episode) for episode in episodes], [True, False])
+        self.assertEqual(list(Episode.objects.accessible_to(user)), episodes[:1])
+
+
+class AccessRequirementsTests(TestCase):
+    def test_requirements_follow_category_changes(self):
+        basic, premium = Plan.objects.create(name="Basic", tier=1), Plan.objects.create(name="Premium", tier=2)
+        category = Category.objects.create(name="Tactics", tier=basic)
+        podcast = Podcast.objects.create(title="Podcast")
+        podcast.categories.add(category)
+        episode = Episode.objects.create(podcast=podcast, title="Episode")
+
+        episode.refresh_from_db()
+        self.assertEqual((episode.required_tier, episode.tier_ids), (1, [str(basic.pk)]))
+
+        category.tier = premium
+        category.save()
+        episode.refresh_from_db()
+        self.assertEqual((episode.required_tier, episode.tier_ids), (2, [str(premium.pk)]))
+
+        podcast.categories.clear()
+        episode.refresh_from_db()
+        self.assertEqual((episode.required_tier, episode.tier_ids), (None, []))
+
+    def test_requirements_follow_podcast_moves_and_plan_tiers(self):
+        basic = Plan.objects.create(name="Basic", tier=1)
+        tactics = Podcast.objects.create(title="Tactics")
+        tactics.categories.add(Category.objects.create(name="Tactics", tier=basic))
+        episode = Episode.objects.create(podcast=Podcast.objects.create(title="Free"), title="Episode")
+
+        episode.podcast = tactics
+        episode.save()
+        episode.refresh_from_db()
+        self.assertEqual((episode.required_tier, episode.tier_ids), (1, [str(basic.pk)]))
+
+        basic.tier = 3
+        basic.save()
+        episode.refresh_from_db()
+        self.assertEqual((episode.required_tier, episode.tier_ids), (3, [str(basic.pk)]))
+
+
+class AccessBoundaryTests(SimpleTestCase):
+    def test_next_boundary_covers_episode_and_plan_windows(self):
+        release = datetime(2026, 6, 1, 12, tzinfo=dt_timezone.utc)
+        episode = Episode(public_release_date=release, early_access_hours=24,
+                          early_available_at=release - timedelta(hours=24))
+        fan = PlanGrant(pk=1, tier=1, features=frozenset({Feature.Kind.EARLY_ACCESS}), early_access_hours=48)
+
+        self.assertEqual(episode.access_boundaries([fan]),
+                         [release - timedelta(hours=48), release - timedelta(hours=24), release])
+        self.assertEqual(episode.next_access_boundary([fan], now=release - timedelta(hours=30)),
+                         release - timedelta(hours=24))
+        self.assertIsNone(episode.next_access_boundary([fan], now=release))
+
+
+class HasAccessManyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User._default_manager.create(**{User.USERNAME_FIELD: "fan@example.com"})
+        basic, premium = Plan.objects.create(name="Basic", tier=1), Plan.objects.create(name="Premium", tier=2)
+        Entitlement.objects.create(user=self.user, content_type=ContentType.objects.get_for_model(Plan),
+                                   object_id=str(basic.pk))
+        podcasts = [Podcast.objects.create(title=f"Podcast {i}") for i in range(3)]
+        podcasts[0].categories.add(Category.objects.create(name="Basic", tier=basic))
+        podcasts[1].categories.add(Category.objects.create(name="Premium", tier=premium))
+        released = timezone.now() - timedelta(days=1)
+        self.episodes = [
+            Episode.objects.create(podcast=podcast, title=f"{podcast.title} {n}", public_release_date=release)
+            for podcast in podcasts for n, release in enumerate((None, released))
+        ]
+        Entitlement.objects.create(user=self.user, content_type=ContentType.objects.get_for_model(Episode),
+                                   object_id=str(self.episodes[-1].pk))
+        # reload: the receivers wrote the access requirements to the rows
+        self.episodes = list(Episode.objects.filter(pk__in=[e.pk for e in self.episodes]))
+
+    def test_matches_has_access_in_memory(self):
+        service = AccessService(cache_backend=cache)
+        get_snapshot(self.user)
+        with self.assertNumQueries(0):
+            results = service.has_access_many(self.user, self.episodes)
+
+        cache.clear()
+        expected = {episode.pk: service.has_access(self.user, episode) for episode in self.episodes}
+        self.assertEqual(results, expected)
+        self.assertEqual(len(set(results.values())), 2)
+
+
+class AccessCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User._default_manager.create(**{User.USERNAME_FIELD: "fan@example.com"})
+        self.plan = Plan.objects.create(name="Basic", tier=1)
+        Entitlement.objects.create(user=self.user, content_type=ContentType.objects.get_for_model(Plan),
+                                   object_id=str(self.plan.pk))
+        self.podcast = Podcast.objects.create(title="Podcast")
+        self.episode = Episode.objects.create(podcast=self.podcast, title="Episode",
+                                              public_release_date=timezone.now() - timedelta(days=1))
+        self.service = AccessService(cache_backend=cache)
+
+    def has_access(self):
+        episode = Episode.objects.get(pk=self.episode.pk)
+        return self.service.has_access(self.user, episode)
+
+    def test_category_change_retires_the_episode_results(self):
+        self.assertFalse(self.has_access())
+        self.podcast.categories.add(Category.objects.create(name="Basic", tier=self.plan))
+        self.assertTrue(self.has_access())
+
+    def test_entitlement_change_retires_the_user_results(self):
+        self.assertFalse(self.service.has_access(self.user, self.episode))
+        entitlement = Entitlement.objects.create(
+            user=self.user, content_type=ContentType.objects.get_for_model(Episode), object_id=str(self.episode.pk))
+        self.assertTrue(self.service.has_access(self.user, self.episode))
+        entitlement.delete()
+        self.assertFalse(self.service.has_access(self.user, self.episode))
+
+
+class SnapshotTests(TestCase):
+    def test_plan_features_are_read_once_per_plan_not_per_snapshot(self):
+        User = get_user_model()
+        plan = Plan.objects.create(name="Fan", tier=1)
+        users = [User._default_manager.create(**{User.USERNAME_FIELD: f"fan{i}@example.com"}) for i in range(2)]
+        for user in users:
+            Entitlement.objects.create(user=user, content_type=ContentType.objects.get_for_model(Plan),
+                                       object_id=str(plan.pk))
+
+        with mock.patch.object(PlanGrant, "from_plan", wraps=PlanGrant.from_plan) as from_plan:
+            first = build_snapshot(users[0])
+            # subscription, entitlements; the plan row and its grant are shared
+            with self.assertNumQueries(2):
+                second = build_snapshot(users[1])
+        self.assertEqual(from_plan.call_count, 1)
+        self.assertEqual(first.plans, second.plans)
+        self.assertEqual([grant.pk for grant in second.plans], [plan.pk])
+
+    def test_plan_changes_retire_cached_snapshots(self):
+        User = get_user_model()
+        user = User._default_manager.create(**{User.USERNAME_FIELD: "fan@example.com"})
+        get_snapshot(user)
+        with self.assertNumQueries(0):
+            get_snapshot(user)
+
+        Plan.objects.create(name="Fan", tier=1)
+        with CaptureQueriesContext(connection) as queries:
+            get_snapshot(user)
+        self.assertTrue(queries.captured_queries)
@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.posts.podcasts.feed import compose_home_feed
+from apps.posts.podcasts.models import Episode, Podcast
+
+
+class HomeFeedQueryBudgetTests(TestCase):
+    # shelf id lists (cold cache) + one in_bulk (and prefetch) per model
+    COLD_BUDGET = 12
+    WARM_BUDGET = 5
+
+    def setUp(self):
+        cache.clear()
+        for i in range(3):
+            podcast = Podcast.objects.create(title=f"Podcast {i}")
+            for j in range(4):
+                Episode.objects.create(podcast=podcast, title=f"Episode {i}.{j}")
+
+    def test_feed_stays_within_query_budget(self):
+        with CaptureQueriesContext(connection) as cold:
+            feed = compose_home_feed(AnonymousUser())
+        self.assertLessEqual(len(cold), self.COLD_BUDGET)
+        self.assertTrue(feed["trending_episodes"])
+
+        with CaptureQueriesContext(connection) as warm:
+            compose_home_feed(AnonymousUser())
+        self.assertLessEqual(len(warm), self.WARM_BUDGET)
+
+    def test_episodes_appear_once_across_shelves(self):
+        feed = compose_home_feed(AnonymousUser())
+        episode_ids = [e.pk for name in ("trending_episodes", "new_releases", "editor_picks", "recommended")
+                       for e in feed[name]]
+        self.assertEqual(len(episode_ids), len(set(episode_ids)))
+
+
+class LatestPerPodcastTests(TestCase):
+    def setUp(self):
+        self.podcasts = [Podcast.objects.create(title=f"Podcast {i}") for i in range(3)]
+        self.episodes = {
+            p.pk: [Episode.objects.create(podcast=p, title=f"{p.title} {j}") for j in range(4)]
+            for p in self.podcasts
+        }
+
+    def test_newest_episodes_per_podcast_in_one_query(self):
+        ids = [p.pk for p in self.podcasts[:2]]
+        with self.assertNumQueries(1):
+            rows = list(Episode.objects.latest_per_podcast(ids, per_podcast=2))
+
+        for pk in ids:
+            newest = sorted(self.episodes[pk], key=lambda e: (e.timestamp, e.pk), reverse=True)[:2]
+            self.assertEqual([e.pk for e in rows if e.podcast_id == pk], [e.pk for e in newest])
+        self.assertEqual(len(rows), 4)
+
+    def test_fallback_without_window_functions_is_one_query(self):
+        ids = [p.pk for p in self.podcasts]
+        with self.assertNumQueries(1):
+            expected = [e.pk for e in Episode.objects.latest_per_podcast(ids, per_podcast=2)]
+        with mock.patch.object(connection.features, "supports_over_clause", False), self.assertNumQueries(1):
+            rows = [e.pk for e in Episode.objects.latest_per_podcast(ids, per_podcast=2)]
+        self.assertEqual(rows, expected)
+
+
+class PodcastTotalsTests(TestCase):
+    def test_episode_count_follows_episodes(self):
+        podcast = Podcast.objects.create(title="Podcast")
+        episodes = [Episode.objects.create(podcast=podcast, title=f"Episode {i}") for i in range(3)]
+        episodes[0].delete()
+
+        podcast.refresh_from_db()
+        self.assertEqual(podcast.episode_count, 2)
+        self.assertEqual(Podcast.objects.with_duration().get(pk=podcast.pk).duration_seconds, 0)
+
+    def test_moving_an_episode_refreshes_both_podcasts(self):
+        old, new = Podcast.objects.create(title="Old"), Podcast.objects.create(title="New")
+        episode = Episode.objects.create(podcast=old, title="Episode")
+        episode.podcast = new
+        episode.save()
+
+        old.refresh_from_db()
+        new.refresh_from_db()
+        self.assertEqual((old.episode_count, new.episode_count), (0, 1))
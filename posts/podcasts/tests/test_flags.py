@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import RequestFactory, TestCase
+
+from apps.memberships.snapshot import get_snapshot
+from apps.posts.models import PostReaction
+from apps.posts.podcasts.context import assert_no_per_object_flags, build_user_flags, serializer_context
+from apps.posts.podcasts.models import Episode, Podcast
+
+
+class UserFlagsTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User._default_manager.create(**{User.USERNAME_FIELD: "listener@example.com"})
+        self.podcast = Podcast.objects.create(title="Podcast")
+        self.episodes = [Episode.objects.create(podcast=self.podcast, title=f"Episode {i}") for i in range(3)]
+        for obj, reaction in ((self.podcast, "love"), (self.episodes[1], "like"), (self.episodes[1], "sad")):
+            PostReaction.objects.create(content_type=ContentType.objects.get_for_model(obj),
+                                        object_id=str(obj.pk), user=self.user, reaction=reaction)
+        self.episodes[2].subscribers.add(self.user)
+        self.request = RequestFactory().get("/")
+        self.request.user = self.user
+        get_snapshot(self.user)  # warm the entitlement snapshot
+
+    def test_one_query_per_flag_type_and_no_per_object_lookups(self):
+        objs = [self.podcast, *self.episodes]
+        # reactions, podcast subscribers, episode subscribers
+        with self.assertNumQueries(3):
+            flags = serializer_context(self.request, objs)["user_flags"]
+
+        with assert_no_per_object_flags():
+            self.assertEqual([flags.is_liked(obj) for obj in objs], [True, False, True, False])
+            self.assertEqual(flags.my_reaction(self.podcast).reaction, "love")
+            self.assertEqual([flags.has_subscribed(obj) for obj in objs], [False, False, False, True])
+            self.assertFalse(any(flags.in_queue(episode) for episode in self.episodes))
+
+    def test_batched_flags_match_the_per_object_methods(self):
+        objs = [self.podcast, *self.episodes]
+        flags = build_user_flags(self.request, objs)
+        self.assertEqual([flags.is_liked(obj) for obj in objs], [obj.check_is_liked(self.user) for obj in objs])
+        self.assertEqual([flags.my_reaction(obj) for obj in objs], [obj.get_my_reaction(self.user) for obj in objs])
+
+    def test_objects_outside_the_batch_are_reported(self):
+        flags = build_user_flags(self.request, self.episodes[:1])
+        with assert_no_per_object_flags(), self.assertRaises(AssertionError):
+            flags.is_liked(self.episodes[1])
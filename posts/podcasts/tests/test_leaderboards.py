@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase, TestCase
+
+from apps.posts.podcasts import leaderboards
+from apps.posts.podcasts.leaderboards import LocalSortedSets, TrendingLeaderboard
+from apps.posts.podcasts.models import Episode, Podcast, PlayBack
+
+
+class TrendingLeaderboardTests(SimpleTestCase):
+    def setUp(self):
+        self.start = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        self.board = TrendingLeaderboard("test", half_life_hours=24, backend=LocalSortedSets())
+
+    def test_newer_events_outrank_older_ones(self):
+        # two plays a day ago are worth exactly one play now
+        self.board.increment("old", now=self.start)
+        self.board.increment("old", now=self.start)
+        self.board.increment("new", 1.5, now=self.start + timedelta(hours=24))
+
+        top = self.board.top(2, now=self.start + timedelta(hours=24))
+        self.assertEqual([member for member, _ in top], ["new", "old"])
+        self.assertAlmostEqual(top[0][1], 1.5)
+        self.assertAlmostEqual(top[1][1], 1.0)
+
+    def test_rebase_keeps_decayed_scores_and_prunes(self):
+        self.board.increment("a", 4.0, now=self.start)
+        self.board.increment("b", 0.001, now=self.start)
+        later = self.start + timedelta(hours=48)
+
+        before = dict(self.board.top(10, now=later))
+        self.board.rebase(now=later)
+        after = dict(self.board.top(10, now=later))
+
+        self.assertAlmostEqual(after["a"], before["a"])
+        self.assertAlmostEqual(after["a"], 1.0)
+        self.assertNotIn("b", after)
+
+
+class RecordPlayTests(TestCase):
+    def test_anonymous_listeners_are_counted_by_ip(self):
+        episode = Episode.objects.create(podcast=Podcast.objects.create(title="Podcast"), title="Episode")
+        board = TrendingLeaderboard("test-plays", backend=LocalSortedSets())
+        with mock.patch.object(leaderboards, "episode_leaderboard", board):
+            for ip in ("10.0.0.1", "10.0.0.2"):
+                for seconds in (10, 20):
+                    PlayBack.objects.update_progress(AnonymousUser(), episode.pk, ip, seconds=seconds)
+
+        # two listeners, one play each
+        [(member, score)] = board.top(1)
+        self.assertEqual(str(member), str(episode.pk))
+        self.assertAlmostEqual(score, 2 * leaderboards.EPISODE_WEIGHTS["play"], places=3)
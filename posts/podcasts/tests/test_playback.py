@@ -0,0 +1,75 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.contenttypes.models import ContentType
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from apps.posts.podcasts import buffers
+from apps.posts.podcasts.models import Episode, Podcast, PlayBack
+
+
+class ContinueListeningTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1")
+        self.request.user = AnonymousUser()
+        podcast = Podcast.objects.create(title="Podcast")
+        for i in range(5):
+            episode = Episode.objects.create(podcast=podcast, title=f"Episode {i}")
+            PlayBack.objects.update_progress(None, episode.pk, "10.0.0.1", seconds=30 * i)
+        ContentType.objects.get_for_model(Episode)  # warm the content type cache
+
+    def test_pages_cost_the_same_queries_and_do_not_overlap(self):
+        with self.assertNumQueries(2):
+            first = PlayBack.objects.continue_listening(self.request, limit=3)
+        with self.assertNumQueries(2):
+            second = PlayBack.objects.continue_listening(self.request, limit=3, cursor=first["next_cursor"])
+
+        seen = [row.pk for row in first["results"] + second["results"]]
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        self.assertIsNone(second["next_cursor"])
+
+
+class PlayBackBufferTests(TestCase):
+    def test_flush_never_overwrites_a_newer_completion(self):
+        podcast = Podcast.objects.create(title="Podcast")
+        episode = Episode.objects.create(podcast=podcast, title="Episode")
+        completed = PlayBack.objects.create(ip_address="10.0.0.1", episode=episode, current_timestamp=600,
+                                            is_completed=True)
+        # a heartbeat taken by a flush just before the completion was written
+        buffers._write([{"user_id": None, "ip_address": "10.0.0.1", "episode_id": str(episode.pk),
+                         "seconds": 590, "at": (completed.last_played_at - timedelta(seconds=5)).isoformat()}])
+
+        completed.refresh_from_db()
+        self.assertTrue(completed.is_completed)
+        self.assertEqual(completed.current_timestamp, 600)
+        self.assertEqual(PlayBack.objects.count(), 1)
+
+    def test_flushed_rows_keep_the_heartbeat_time(self):
+        episode = Episode.objects.create(podcast=Podcast.objects.create(title="Podcast"), title="Episode")
+        at = timezone.now() - timedelta(minutes=2)
+        buffers._write([{"user_id": None, "ip_address": "10.0.0.1", "episode_id": str(episode.pk),
+                         "seconds": 30, "at": at.isoformat()}])
+
+        row = PlayBack.objects.get()
+        self.assertEqual(row.last_played_at, at)
+        self.assertEqual(row.session_started_at, at)
+
+    def test_reads_apply_pending_heartbeats_without_writing(self):
+        episode = Episode.objects.create(podcast=Podcast.objects.create(title="Podcast"), title="Episode",
+                                         duration_seconds=100)
+        row = PlayBack.objects.create(ip_address="10.0.0.1", episode=episode, current_timestamp=10,
+                                      last_played_at=timezone.now() - timedelta(minutes=1))
+        entry = {"user_id": None, "ip_address": "10.0.0.1", "episode_id": str(episode.pk),
+                 "seconds": 40, "at": timezone.now().isoformat()}
+        request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1")
+        request.user = AnonymousUser()
+
+        with mock.patch.object(buffers, "peek", return_value={str(episode.pk): entry}):
+            played = list(PlayBack.objects.get_recently_played(request))
+
+        self.assertEqual((played[0].current_timestamp, played[0].percent_completed), (40, 40.0))
+        row.refresh_from_db()
+        self.assertEqual(row.current_timestamp, 10)
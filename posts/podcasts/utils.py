@@ -1,4 +1,25 @@
+import base64
+
+from django.utils.dateparse import parse_datetime
+
+
 def get_default_title(instance):
     title = instance.podcast.title
     episode_number = (instance.podcast.get_episodes().count()) + 1
     return f"{title} - (Episode {episode_number})"
+
+
+def encode_cursor(timestamp, pk):
+    """Opaque keyset cursor for (timestamp, pk) pagination."""
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{pk}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        parsed, pk = parse_datetime(timestamp), int(pk)
+    except ValueError as exc:
+        raise ValueError("invalid cursor") from exc
+    if parsed is None:
+        raise ValueError("invalid cursor")
+    return parsed, pk
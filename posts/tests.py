@@ -1,3 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from django.test import TestCase
 
-# Create your tests here.
+from apps.analytics.models import ObjectView
+from apps.posts.loaders import GenericRelationLoader, prefetch_generic
+from apps.posts.models import PostReaction
+from apps.posts.podcasts.models import Episode, Podcast
+from apps.thumbnail.models import Thumbnail
+
+
+class GenericRelationLoaderTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User._default_manager.create(**{User.USERNAME_FIELD: "reader@example.com"})
+        self.podcast = Podcast.objects.create(title="Podcast")
+        self.episodes = [Episode.objects.create(podcast=self.podcast, title=f"Episode {i}") for i in range(2)]
+        self.feed = [self.podcast, *self.episodes]
+        for obj in self.feed:
+            ContentType.objects.get_for_model(obj)  # warm the content type cache
+
+    def _react(self, obj, reaction):
+        return PostReaction.objects.create(
+            content_type=ContentType.objects.get_for_model(obj), user=self.user, reaction=reaction,
+            object_id=str(obj.pk))
+
+    def test_mixed_feed_costs_one_query_per_relation(self):
+        love, like = self._react(self.podcast, "love"), self._react(self.episodes[1], "like")
+        Thumbnail.objects.create(content_type=ContentType.objects.get_for_model(Episode),
+                                 object_id=str(self.episodes[0].pk))
+
+        with self.assertNumQueries(2):
+            prefetch_generic(self.feed, reactions=PostReaction, thumbnails=Thumbnail)
+
+        self.assertEqual([obj.reactions for obj in self.feed], [[love], [], [like]])
+        self.assertEqual([len(obj.thumbnails) for obj in self.feed], [0, 1, 0])
+
+    def test_loads_are_cached_and_batched(self):
+        like = self._react(self.episodes[0], "like")
+        loader = GenericRelationLoader(PostReaction).prime(self.feed)
+        with self.assertNumQueries(1):
+            self.assertEqual(loader.load(self.episodes[0]), [like])
+            self.assertEqual(loader.load(self.podcast), [])
+
+    def test_matches_the_per_instance_managers(self):
+        self._react(self.episodes[0], "like")
+        self._react(self.episodes[0], "love")
+        loader = GenericRelationLoader(PostReaction.objects.order_by("pk"))
+        for obj in self.feed:
+            self.assertEqual(loader.load(obj), list(PostReaction.objects.filter_by_instance(obj).order_by("pk")))
+
+    def test_views_of_uuid_keyed_objects_are_found(self):
+        view = ObjectView.objects.create(user=self.user, content_object=self.episodes[1])
+        with self.assertNumQueries(1):
+            self.assertEqual(GenericRelationLoader(ObjectView).load_many(self.feed), [[], [], [view]])
@@ -4,6 +4,11 @@ from django.conf import settings
 
 # TTL (seconds)
 RECOMMEND_TTL = getattr(settings, "RECOMMEND_CACHE_TTL", 600)  # 10 minutes default
+CARD_TTL = getattr(settings, "RECOMMEND_CARD_CACHE_TTL", 60 * 60 * 6)  # cards are invalidated on save
+
+EPISODES = "episodes"
+PODCASTS = "podcasts"
+
 
 def _podcasts_key(user_id):
     return f"recommend:podcasts:{user_id}"
@@ -11,21 +16,72 @@ def _podcasts_key(user_id):
 def _episodes_key(user_id):
     return f"recommend:episodes:{user_id}"
 
+def _card_key(kind, pk):
+    return f"card:{kind}:{pk}"
+
 def get_cached_recommendations(user_id, kind="podcasts"):
+    """Return the cached, ordered list of object ids (as strings) or None on a miss."""
     key = _podcasts_key(user_id) if kind == "podcasts" else _episodes_key(user_id)
     payload = cache.get(key)
     if not payload:
         return None
     try:
-        return json.loads(payload)
+        ids = json.loads(payload)
     except Exception:
         return None
+    # entries written before ids-only payloads were serialized cards; treat them as a miss
+    if not all(isinstance(i, str) for i in ids):
+        return None
+    return ids
 
 def set_cached_recommendations(user_id, kind="podcasts", data=None, ttl=RECOMMEND_TTL):
+    """Cache an ordered list of object ids; the cards themselves live in the shared card cache."""
     key = _podcasts_key(user_id) if kind == "podcasts" else _episodes_key(user_id)
-    payload = json.dumps(data or [])
+    payload = json.dumps([str(pk) for pk in (data or [])])
     cache.set(key, payload, ttl)
 
 def invalidate_user_recommendations(user_id):
     cache.delete(_podcasts_key(user_id))
     cache.delete(_episodes_key(user_id))
+
+
+def _card_source(kind):
+    # imported lazily: serializers import the podcast models, which connect receivers importing this module
+    from api.rest.web.apps.podcasts.serializers import PodcastListSerializer, EpisodeListSerializer
+    from apps.posts.podcasts.models import Podcast, Episode
+
+    if kind == EPISODES:
+        return Episode.objects.select_related("podcast"), EpisodeListSerializer
+    return Podcast.objects.all(), PodcastListSerializer
+
+
+def get_cards(kind, ids):
+    """
+    Return serialized list cards for `ids` (in the given order), shared across all users.
+
+    Hits are read with a single get_many; misses are loaded with one in_bulk query,
+    serialized once and written back with set_many. Ids that no longer exist are dropped.
+    """
+    ids = [str(pk) for pk in ids]
+    if not ids:
+        return []
+    keys = {pk: _card_key(kind, pk) for pk in ids}
+    cached = cache.get_many(list(keys.values()))
+    cards = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in keys if pk not in cards]
+    if missing:
+        qs, serializer_class = _card_source(kind)
+        objs = list(qs.in_bulk(missing).values())
+        fresh = {}
+        for obj, data in zip(objs, serializer_class(objs, many=True).data):
+            cards[str(obj.pk)] = fresh[keys[str(obj.pk)]] = dict(data)
+        if fresh:
+            cache.set_many(fresh, CARD_TTL)
+
+    return [cards[pk] for pk in ids if pk in cards]
+
+
+def invalidate_cards(kind, *ids):
+    if ids:
+        cache.delete_many([_card_key(kind, pk) for pk in ids])
@@ -5,6 +5,7 @@ import joblib
 import numpy as np
 import pandas as pd
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from scipy.sparse import csr_matrix
@@ -20,6 +21,8 @@ except Exception:
     faiss = None
 
 # Django models
+from apps.analytics.archive import iter_views
+from apps.analytics.models import view_object_pk
 from apps.posts.podcasts.models import Episode, PlayBack
 
 # Output paths (tune to your project)
@@ -31,6 +34,7 @@ SVD_COMPONENTS = getattr(settings, "SVD_COMPONENTS", 64)
 
 LOOK_BACK_DAYS = getattr(settings, "SK_LOOK_BACK_DAYS", 365)
 MIN_USER_INTERACTIONS = getattr(settings, "MIN_USER_INTERACTIONS", 3)
+VIEW_SCORE = getattr(settings, "SK_VIEW_SCORE", 0.5)
 
 HYBRID_DIM = NMF_COMPONENTS + SVD_COMPONENTS
 
@@ -43,10 +47,15 @@ def _ensure_faiss():
 class Command(BaseCommand):
     help = "Train NMF (collaborative) and content (TF-IDF+SVD) models, build FAISS ANN index, and save artifacts."
 
+    def add_arguments(self, parser):
+        parser.add_argument("--look-back-days", type=int, default=LOOK_BACK_DAYS)
+        parser.add_argument("--include-views", action="store_true",
+                            help="Add episode page views as weak signals (reads archived months if needed)")
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.NOTICE("Building interaction dataframe..."))
         now = timezone.now()
-        since = now - timedelta(days=LOOK_BACK_DAYS)
+        since = now - timedelta(days=options["look_back_days"])
 
         # Extract PlayBacks within lookback window
         pbs = PlayBack.objects.filter(last_played_at__gte=since).select_related('episode', 'user', 'episode__podcast')
@@ -56,6 +65,12 @@ class Command(BaseCommand):
                 continue  # skip anonymous; adapt if you want to include IP-based anonymous
             score = 1.0 + (3.0 if pb.is_completed else 0.0)
             rows.append({'user_id': pb.user_id, 'episode_id': pb.episode_id, 'score': score})
+        if options["include_views"]:
+            # views older than the raw retention window come from the archive files
+            for view in iter_views(since, content_type=ContentType.objects.get_for_model(Episode)):
+                if view['user_id']:
+                    rows.append({'user_id': view['user_id'], 'episode_id': view_object_pk(Episode, view['object_id']),
+                                 'score': VIEW_SCORE})
         if not rows:
             self.stdout.write(self.style.ERROR("No playback rows found in look back window. Nothing to train."))
             return
@@ -5,8 +5,7 @@ import numpy as np
 from django.conf import settings
 from django.core.cache import cache
 
-from api.rest.web.apps.podcasts.serializers import EpisodeListSerializer
-from apps.posts.podcasts.models import Episode
+from apps.recommendation.cache import get_cards, EPISODES
 from .utils import get_user_vector_ann
 
 NMF_COMPONENTS = getattr(settings, "NMF_COMPONENTS", 64)
@@ -87,14 +86,9 @@ def get_ann_recommendation(request):
     if not request.user.is_authenticated:
         return None
     cache_key = f"ann:recommend:episodes:{request.user.id}"
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
-    ids = ann_recommend_for_user(request.user.id, top_k=12)
-    # fetch minimal episode info
-    eps = list(Episode.objects.filter(id__in=ids).values('id', 'title', 'slug', 'podcast_id'))
-    # preserve order
-    id_to_ep = {e['id']: e for e in eps}
-    ordered = EpisodeListSerializer([id_to_ep.get(i) for i in ids if id_to_ep.get(i) is not None], many=True).data
-    cache.set(cache_key, ordered, 300)  # 5min cache
-    return ordered
+    ids = cache.get(cache_key)
+    if ids is None:
+        ids = [str(i) for i in ann_recommend_for_user(request.user.id, top_k=12)]
+        cache.set(cache_key, ids, 300)  # 5min cache, ids only
+    # cards are shared across users and preserve the ANN ranking order
+    return get_cards(EPISODES, ids)
@@ -1,13 +1,14 @@
+from collections import defaultdict
+
 from django.db.models import Sum
 from django.db.models import Q
 from django.utils import timezone
 
-from api.rest.web.apps.podcasts.serializers import PodcastListSerializer, EpisodeListSerializer
 from apps.posts.podcasts.models import Podcast, Episode, PlayBack
 from apps.posts.podcasts.queries import trending_podcasts, trending_episodes
 
 from ..models import UserCategoryAffinity
-from ..cache import get_cached_recommendations, set_cached_recommendations
+from ..cache import get_cached_recommendations, set_cached_recommendations, get_cards, EPISODES, PODCASTS
 
 from .recommend import compute_user_category_affinity
 
@@ -26,7 +27,7 @@ def recommend_episodes_for_user(user, limit=30, lookback_days=90):
     # candidate pool: recent episodes in those categories, plus from subscribed podcasts
     qs = Episode.objects.filter(
         Q(categories__id__in=top_cat_ids) | Q(podcast__categories__id__in=top_cat_ids)
-    ).select_related('podcast').prefetch_related('categories').distinct()
+    ).select_related('podcast').distinct()
 
     # exclude episodes user already completed recently (optional)
     played_episode_ids = PlayBack.objects.filter(user=user).values_list('episode_id', flat=True)
@@ -34,10 +35,19 @@ def recommend_episodes_for_user(user, limit=30, lookback_days=90):
 
     # score episodes
     candidates = list(qs.order_by('-timestamp')[:100])  # a candidate pool you can tune
+    # scoring only needs category ids: read them off the m2m tables (two queries, no rows)
+    episode_cats, podcast_cats = defaultdict(list), defaultdict(list)
+    for ep_id, cat_id in Episode.categories.through.objects.filter(
+            episode_id__in=[ep.id for ep in candidates]).values_list('episode_id', 'category_id'):
+        episode_cats[ep_id].append(cat_id)
+    for pod_id, cat_id in Podcast.categories.through.objects.filter(
+            podcast_id__in={ep.podcast_id for ep in candidates}).values_list('podcast_id', 'category_id'):
+        podcast_cats[pod_id].append(cat_id)
+
     scored = []
     for ep in candidates:
-        cat_score = sum(affinity.get(cat.id, 0.0) for cat in ep.categories.all())
-        cat_score += sum(0.5 * affinity.get(cat.id, 0.0) for cat in ep.podcast.categories.all())
+        cat_score = sum(affinity.get(cat_id, 0.0) for cat_id in episode_cats[ep.id])
+        cat_score += sum(0.5 * affinity.get(cat_id, 0.0) for cat_id in podcast_cats[ep.podcast_id])
 
         # recency factor (days)
         age_days = (now - ep.timestamp).total_seconds() / (3600 * 24)
@@ -80,15 +90,19 @@ def recommend_podcasts_for_user(user, limit=20):
 def get_recommended_podcast_payload(user):
     cached = get_cached_recommendations(user.id, kind="podcasts")
     if cached is not None:
-        return cached
-    recs = recommend_podcasts_for_user(user)
-    payload = [ {"id": p.id, "title": p.title, "slug": p.slug, "image": p.image.url if p.image else None} for p in recs ]
-    set_cached_recommendations(user.id, kind="podcasts", data=payload)
-    return payload
+        return get_cards(PODCASTS, cached)
+    ids = [p.pk for p in recommend_podcasts_for_user(user)]
+    set_cached_recommendations(user.id, kind="podcasts", data=ids)
+    return get_cards(PODCASTS, ids)
 
 
 def recommend_podcasts_for_user_cached(user, limit=20):
     """Check cache; if miss compute using UserCategoryAffinity table and set cache."""
+    return get_cards(PODCASTS, recommend_podcast_ids_for_user_cached(user, limit=limit))
+
+
+def recommend_podcast_ids_for_user_cached(user, limit=20):
+    """Ordered podcast ids for `user`, cached per user (cards are hydrated separately)."""
     cached = get_cached_recommendations(user.id, kind="podcasts")
     if cached is not None:
         return cached
@@ -98,12 +112,10 @@ def recommend_podcasts_for_user_cached(user, limit=20):
     cat_ids = [a.category_id for a in affinities]
     if not cat_ids:
         # fallback: trending podcasts - implement or import
-        from apps.posts.podcasts.queries import trending_podcasts
-        pods = trending_podcasts(limit=limit)
-        # payload = [serialize_podcast(p) for p in pods]
-        payload = PodcastListSerializer(pods, many=True).data
-        set_cached_recommendations(user.id, kind="podcasts", data=payload)
-        return payload
+        from apps.posts.podcasts.queries import trending_podcast_ids
+        ids = trending_podcast_ids(limit=limit)
+        set_cached_recommendations(user.id, kind="podcasts", data=ids)
+        return [str(pk) for pk in ids]
 
     # candidates
     qs = Podcast.objects.filter(categories__id__in=cat_ids).distinct().prefetch_related("categories")[:200]
@@ -114,14 +126,18 @@ def recommend_podcasts_for_user_cached(user, limit=20):
         total = cat_score + (getattr(p, "view_count", 0) * 0.001) + (getattr(p, "trend_score", 0) * 0.5)
         scored.append((p, total))
     scored.sort(key=lambda x: x[1], reverse=True)
-    # payload = [serialize_podcast(p) for p, _ in scored[:limit]]
-    qs = [p for _, p in scored[:limit]]
-    payload = PodcastListSerializer(qs, many=True).data
-    set_cached_recommendations(user.id, kind="podcasts", data=payload)
-    return payload
+    # only ids are cached per user; cards are shared and hydrated from the card cache
+    ids = [str(p.pk) for p, _ in scored[:limit]]
+    set_cached_recommendations(user.id, kind="podcasts", data=ids)
+    return ids
 
 
 def recommend_episodes_for_user_cached(user, limit=30):
+    return get_cards(EPISODES, recommend_episode_ids_for_user_cached(user, limit=limit))
+
+
+def recommend_episode_ids_for_user_cached(user, limit=30):
+    """Ordered episode ids for `user`, cached per user (cards are hydrated separately)."""
     cached = get_cached_recommendations(user.id, kind="episodes")
     if cached is not None:
         return cached
@@ -129,12 +145,10 @@ def recommend_episodes_for_user_cached(user, limit=30):
     affinities = UserCategoryAffinity.objects.filter(user=user).order_by("-score")[:8]
     cat_ids = [a.category_id for a in affinities]
     if not cat_ids:
-        from apps.posts.podcasts.queries import trending_episodes
-        eps = trending_episodes(limit=limit)
-        # payload = [serialize_episode(e) for e in eps]
-        payload = EpisodeListSerializer(eps, many=True).data
-        set_cached_recommendations(user.id, kind="episodes", data=payload)
-        return payload
+        from apps.posts.podcasts.queries import trending_episode_ids
+        ids = trending_episode_ids(limit=limit)
+        set_cached_recommendations(user.id, kind="episodes", data=ids)
+        return [str(pk) for pk in ids]
 
     cat_map = {a.category_id: a.score for a in affinities}
     qs = Episode.objects.filter(categories__id__in=cat_ids).select_related("podcast").prefetch_related("categories") \
@@ -151,8 +165,6 @@ def recommend_episodes_for_user_cached(user, limit=30):
                     getattr(e, "view_count", 0) * 0.01)
         scored.append((e, total))
     scored.sort(key=lambda x: x[1], reverse=True)
-    # payload = [serialize_episode(e) for e, _ in scored[:limit]]
-    qs = [e for e, _ in scored[:limit]]
-    payload = EpisodeListSerializer(qs, many=True).data
-    set_cached_recommendations(user.id, kind="episodes", data=payload)
-    return payload
\ No newline at end of file
+    ids = [str(e.pk) for e, _ in scored[:limit]]
+    set_cached_recommendations(user.id, kind="episodes", data=ids)
+    return ids
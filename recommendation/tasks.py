@@ -110,7 +110,7 @@ def recalc_user_category_affinity_postgres(self, lookback_days: int = LOOKBACK_D
                 * EXP( - EXTRACT(EPOCH FROM (NOW() - ov.timestamp)) / %s )
             ) AS score
         FROM {objectview_table} ov
-        JOIN {podcast_categories_table} pc ON pc.podcast_id = ov.object_id
+        JOIN {podcast_categories_table} pc ON pc.podcast_id::text = ov.object_id
         WHERE ov.content_type_id = %s
           AND ov.timestamp >= NOW() - INTERVAL %s
         GROUP BY ov.user_id, pc.category_id
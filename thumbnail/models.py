@@ -39,7 +39,8 @@ class Thumbnail(models.Model):
         XS = "xs", _("XS")
 
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.PositiveIntegerField()
+    # str(pk): targets have integer or UUID primary keys
+    object_id = models.CharField(max_length=64)
     content_object = GenericForeignKey("content_type", "object_id")
     type = models.CharField(max_length=2, choices=Size.choices, default=Size.MD)
     width = models.IntegerField(null=True, blank=True)